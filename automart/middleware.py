@@ -0,0 +1,165 @@
+# automart/middleware.py
+"""
+Per-request query budgets and Server-Timing.
+
+Add "automart.middleware.QueryBudgetMiddleware" at the top of MIDDLEWARE
+and set REQUEST_PROFILING = True. Every response then carries
+
+    Server-Timing: db;dur=12.4;desc="14 queries", tpl;dur=30.1, total;dur=51.0
+
+(browser dev tools show it next to the request), and a request that runs
+more queries or takes longer than its budget is logged on the
+"automart.budget" logger with its repeated SQL grouped by fingerprint,
+which is what an N+1 looks like:
+
+    GET /marketplace/saved-searches/ (marketplace:saved_search_list) over budget ...
+        12x   3.1 ms  SELECT ... FROM "marketplace_savedsearch" WHERE ... = %s
+
+Budgets are (max queries, max total ms) per URL name, BUDGETS below
+updated with settings.REQUEST_BUDGETS; "*" covers unnamed views and None
+means unlimited. With REQUEST_PROFILING off the middleware removes itself
+at startup (MiddlewareNotUsed) and the template hook is never installed,
+so it costs nothing.
+"""
+import contextvars
+import logging
+import re
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger("automart.budget")
+
+BUDGETS = {
+    "*": (30, 500),
+    "home": (25, 400),
+    "car_detail": (20, 400),
+    "finance_offers": (12, 300),
+    "compare_page": (10, 200),
+    "cars_json": (5, 100),
+    "car_json": (5, 100),
+    "car_finance_json": (2, 50),
+    "reviews_json": (8, 150),
+    "cart": (6, 200),
+    "marketplace:browse_listings": (20, 400),
+    "marketplace:saved_search_list": (6, 200),
+}
+REPEATS_SHOWN = 5
+
+_current = contextvars.ContextVar("request_profile", default=None)
+
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r"\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)")
+
+
+def fingerprint(sql: str) -> str:
+    """SQL with literals and IN-lists collapsed, so repeats of one query compare equal."""
+    sql = _NUMBERS.sub("?", _STRINGS.sub("?", sql))
+    return " ".join(_LISTS.sub("(...)", sql).split())
+
+
+class _Profile:
+    def __init__(self):
+        self.queries = 0
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self.template_depth = 0
+        self.by_sql = defaultdict(lambda: [0, 0.0])    # fingerprint -> [count, ms]
+
+    def __call__(self, execute, sql, params, many, context):
+        """connection.execute_wrapper hook."""
+        t0 = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            ms = (time.perf_counter() - t0) * 1000
+            self.queries += 1
+            self.db_ms += ms
+            entry = self.by_sql[fingerprint(sql)]
+            entry[0] += 1
+            entry[1] += ms
+
+    def repeats(self):
+        rows = [(n, ms, sql) for sql, (n, ms) in self.by_sql.items() if n > 1]
+        return sorted(rows, key=lambda r: (-r[0], -r[1]))[:REPEATS_SHOWN]
+
+
+_templates_hooked = False
+
+
+def _hook_templates():
+    """Time the top-level Template.render of the Django backend (nested renders count once)."""
+    global _templates_hooked
+    if _templates_hooked:
+        return
+    from django.template.backends.django import Template
+
+    render = Template.render
+
+    def timed_render(self, *args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return render(self, *args, **kwargs)
+        profile.template_depth += 1
+        t0 = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            profile.template_depth -= 1
+            if not profile.template_depth:
+                profile.template_ms += (time.perf_counter() - t0) * 1000
+
+    Template.render = timed_render
+    _templates_hooked = True
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, "REQUEST_PROFILING", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.budgets = {**BUDGETS, **getattr(settings, "REQUEST_BUDGETS", {})}
+        _hook_templates()
+
+    def __call__(self, request):
+        profile = _Profile()
+        token = _current.set(profile)
+        t0 = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total_ms = (time.perf_counter() - t0) * 1000
+
+        response["Server-Timing"] = (
+            f'db;dur={profile.db_ms:.1f};desc="{profile.queries} queries", '
+            f"tpl;dur={profile.template_ms:.1f}, total;dur={total_ms:.1f}"
+        )
+        self._check_budget(request, profile, total_ms)
+        return response
+
+    def _check_budget(self, request, profile, total_ms):
+        match = getattr(request, "resolver_match", None)
+        name = match.view_name if match else None
+        max_queries, max_ms = self.budgets.get(name) or self.budgets["*"]
+        over = []
+        if max_queries is not None and profile.queries > max_queries:
+            over.append(f"{profile.queries} > {max_queries} queries")
+        if max_ms is not None and total_ms > max_ms:
+            over.append(f"{total_ms:.0f} > {max_ms} ms")
+        if not over:
+            return
+        lines = [f"    {n}x {ms:7.1f} ms  {sql[:300]}" for n, ms, sql in profile.repeats()]
+        logger.warning(
+            "%s %s (%s) over budget: %s [db %.1f ms, templates %.1f ms]%s",
+            request.method, request.get_full_path(), name or "-", ", ".join(over),
+            profile.db_ms, profile.template_ms, "".join("\n" + line for line in lines),
+        )
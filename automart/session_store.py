@@ -0,0 +1,102 @@
+# automart/session_store.py
+"""
+Cache-first session engine that coalesces database writes.
+
+    SESSION_ENGINE = "automart.session_store"
+    SESSION_DB_WRITE_INTERVAL = 60          # seconds, optional
+
+Like django.contrib.sessions.backends.cached_db it reads from the cache
+(SESSION_CACHE_ALIAS) and falls back to the django_session table, but a
+save does not always reach the table:
+
+* a save that leaves the data exactly as it was loaded is dropped;
+* a new session, and any change to a "_"-prefixed key (login, logout,
+  expiry), is written to the database at once;
+* everything else (wishlist/compare/cart ids, currency, theme) is written
+  to the cache and reaches the database at most once per
+  SESSION_DB_WRITE_INTERVAL per session, on the first save after the
+  interval has passed.
+
+So ten compare toggles in a row cost ten cache sets and one UPDATE. The
+price is a window: if the cache loses a session entry (eviction, restart
+of a non-persistent cache) before its next database write, the last
+SESSION_DB_WRITE_INTERVAL seconds of non-auth changes are lost. Auth
+state is never in that window. Use a shared cache (redis/memcached) in
+production; with locmem every worker has its own copy and the window
+becomes a correctness problem.
+"""
+import json
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+
+KEY_PREFIX = "automart.session_store"
+DEFAULT_DB_WRITE_INTERVAL = 60
+
+
+def _snapshot(data) -> str:
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def _private(data) -> dict:
+    return {k: v for k, v in data.items() if k.startswith("_")}
+
+
+class SessionStore(CachedDBStore):
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._synced_at = 0.0           # last time the database row matched the data
+        self._loaded_state = None       # _snapshot() of the data as loaded / last saved
+        self._loaded_private = {}
+
+    @property
+    def db_write_interval(self) -> float:
+        return getattr(settings, "SESSION_DB_WRITE_INTERVAL", DEFAULT_DB_WRITE_INTERVAL)
+
+    def _remember(self, data, synced_at) -> None:
+        self._synced_at = synced_at
+        self._loaded_state = _snapshot(data)
+        self._loaded_private = _private(data)
+
+    def load(self):
+        try:
+            entry = self._cache.get(self.cache_key)
+        except Exception:
+            entry = None    # invalid key on some backends; see cached_db.load
+        if isinstance(entry, dict) and "data" in entry:
+            data = entry["data"]
+            self._remember(data, entry.get("synced", 0.0))
+            return data
+
+        s = self._get_session_from_db()
+        data = self.decode(s.session_data) if s else {}
+        if s:
+            now = time.time()
+            self._cache.set(self.cache_key, {"data": data, "synced": now},
+                            self.get_expiry_age(expiry=s.expire_date))
+            self._remember(data, now)
+        return data
+
+    def save(self, must_create=False):
+        now = time.time()
+        data = self._get_session(no_load=must_create)
+        due = now - self._synced_at >= self.db_write_interval
+
+        if must_create or self.session_key is None or self._loaded_state is None:
+            DBStore.save(self, must_create=must_create)
+            self._synced_at = now
+        else:
+            state = _snapshot(data)
+            if state == self._loaded_state and not due:
+                return
+            if due or _private(data) != self._loaded_private:
+                DBStore.save(self)
+                self._synced_at = now
+
+        self._cache.set(self.cache_key, {"data": self._session, "synced": self._synced_at},
+                        self.get_expiry_age())
+        self._remember(self._session, self._synced_at)
@@ -28,6 +28,12 @@ urlpatterns = [
     path("compare/", v.compare_page, name="compare_page"),
     path("finance/offers/", v.finance_offers, name="finance_offers"),
     path("api/counters/", v.nav_counters, name="nav_counters"),
+    path("api/facets/", v.facets_json, name="facets_json"),
+    path("api/suggest/", v.suggest_json, name="suggest_json"),
+    path("api/cars/", v.cars_json, name="cars_json"),
+    path("api/cars/<int:pk>/", v.car_json, name="car_json"),
+    path("api/cars/<int:pk>/finance/", v.car_finance_json, name="car_finance_json"),
+    path("api/listing-cache/stats/", v.listing_cache_stats, name="listing_cache_stats"),
     path("car/<int:pk>/test-drive/", v.test_drive, name="test_drive"),
     path("car/<int:pk>/share/", v.share_car, name="share_car"),
     path("car/<int:pk>/reviews.json", v.reviews_json, name="reviews_json"),
@@ -75,6 +81,7 @@ urlpatterns = [
     path("dealers/map/", mviews.dealer_map, name="dealer_map"),
     path("api/dealers.json", mviews.dealers_json, name="dealers_json"),
     path("api/dealers/", mviews.dealers_geojson, name="dealers_geojson"),
+    path("api/map/<slug:layer>/", mviews.map_features, name="map_features"),
     path("car/<int:pk>/geo.json", v.car_geo, name="car_geo"),
 
     # automart/urls.py  (import payment_views already exists)
@@ -82,12 +82,9 @@ class SavedSearchAdmin(admin.ModelAdmin):
         (_("System"), {"fields": ("params_hash", "last_seen_car_created_at", "created_at")}),
     )
 
-    @admin.display(description=_("New matches"))
+    @admin.display(description=_("New matches"), ordering="new_match_count")
     def new_count(self, obj):
-        try:
-            return obj.new_matches_qs().count()
-        except Exception:
-            return "—"
+        return obj.new_match_count
 
 
 @admin.action(description=_("Mark selected sellers as VERIFIED"))
@@ -1,68 +1,33 @@
-from marketplace.models import SellerProfile, SavedSearch, Cart
+from functools import partial
 
+from django.utils.functional import SimpleLazyObject
 
-def seller_flags(request):
-    is_seller = False
-    is_seller_pending = False
-    if request.user.is_authenticated:
-        try:
-            sp = request.user.seller_profile
-            is_seller = sp.is_verified
-            is_seller_pending = (sp.verification_status in ("DRAFT", "PENDING"))
-        except SellerProfile.DoesNotExist:
-            pass
-    return {"is_seller": is_seller, "is_seller_pending": is_seller_pending}
+from . import nav as nav_state
 
 
-def saved_search_badge(request):
-    if not request.user.is_authenticated:
-        return {}
-    has_new = False
-    for s in SavedSearch.objects.filter(user=request.user, is_active=True):
-        if s.new_matches_qs().exists():
-            has_new = True
-            break
-    return {"has_new_saved_searches": has_new}
+def nav(request):
+    """
+    `nav`: lazy per-request navbar state (marketplace/nav.py). Templates
+    read nav.cart_count, nav.compare_ids, nav.is_seller, ... and nothing
+    is queried until they do.
+    """
+    return {"nav": nav_state.for_request(request)}
 
 
+def legacy(*names):
+    """
+    A processor standing in for one that `nav` replaced: `nav` plus the
+    variables the old one set, each a lazy proxy for the nav attribute of
+    the same name, so templates that still print them keep working and
+    the ones that don't pay nothing.
+    """
+    def processor(request):
+        state = nav_state.for_request(request)
+        return {"nav": state, **{name: SimpleLazyObject(partial(getattr, state, name)) for name in names}}
+    return processor
 
-def nav_counts(request):
-    # safe default if sessions not ready (e.g., during some system checks)
-    try:
-        cart = Cart.for_request(request)
-        count = cart.total_quantity
-    except Exception:
-        count = 0
-    return {"cart_count": count}
 
-
-
-# models/context_processors.py
-from typing import List
-
-COMPARE_SESSION_KEY = "compare_ids"
-MAX_COMPARE = 4
-
-def compare_context(request):
-    ids = request.session.get(COMPARE_SESSION_KEY, [])
-    if not isinstance(ids, list):
-        ids = []
-    try:
-        ids = [int(x) for x in ids]
-    except Exception:
-        ids = []
-    return {
-        "compare_ids": ids,              # list of car IDs in compare
-        "compare_count": len(ids),       # count badge for navbar
-        "compare_max": MAX_COMPARE,
-    }
-# marketplace/context_processors.py
-from .compare_session import get_ids, MAX_COMPARE
-
-def compare_meta(request):
-    ids = get_ids(request)
-    return {
-        "compare_ids": ids,
-        "compare_count": len(ids),
-        "compare_max": MAX_COMPARE,
-    }
+seller_flags = legacy("is_seller", "is_seller_pending")
+saved_search_badge = legacy("has_new_saved_searches")
+nav_counts = legacy("cart_count")
+compare_context = compare_meta = legacy("compare_ids", "compare_count", "compare_max")
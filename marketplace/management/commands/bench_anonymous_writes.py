@@ -0,0 +1,60 @@
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from models import bench
+from models.models import Car
+
+
+class Command(BaseCommand):
+    help = "Crawl the public pages as anonymous visitors and fail if any request writes to the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--visitors", type=int, default=20, help="Fresh cookie-less clients (crawlers)")
+        parser.add_argument("--cars", type=int, default=10, help="Car detail pages per visitor")
+        parser.add_argument("--keep-cookies", action="store_true",
+                            help="One client that keeps its cookies, like a browser")
+
+    def _urls(self, n_cars):
+        car_ids = list(Car.objects.order_by("-created").values_list("pk", flat=True)[:n_cars])
+        urls = [
+            reverse("home"),
+            reverse("marketplace:browse_listings"),
+            reverse("finance_offers"),
+            reverse("compare_page"),
+            reverse("wishlist_page"),
+            reverse("cart"),
+            reverse("nav_counters"),
+        ]
+        for pk in car_ids:
+            urls += [reverse("car_detail", args=[pk]), reverse("car_json", args=[pk])]
+        return urls
+
+    def handle(self, *args, **opts):
+        host = bench.client_host()
+        urls = self._urls(opts["cars"])
+        counter = bench.WriteCounter()
+        statuses = Counter()
+        requests = 0
+
+        shared = Client(HTTP_HOST=host) if opts["keep_cookies"] else None
+        t0 = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            for _ in range(opts["visitors"]):
+                client = shared or Client(HTTP_HOST=host)
+                for url in urls:
+                    statuses[client.get(url).status_code] += 1
+                    requests += 1
+        elapsed = time.perf_counter() - t0
+
+        self.stdout.write(f"{requests} requests over {len(urls)} URLs in {elapsed:.2f} s "
+                          f"({elapsed / max(1, requests) * 1000:.1f} ms/request), status {dict(statuses)}")
+        if counter.writes:
+            for stmt, n in counter.writes.most_common():
+                self.stdout.write(f"  {n:6d}  {stmt} ...")
+            raise CommandError(f"{counter.total} database write(s) during anonymous browsing")
+        self.stdout.write(self.style.SUCCESS("0 database writes."))
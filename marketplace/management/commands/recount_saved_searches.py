@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from marketplace import saved_searches
+
+
+class Command(BaseCommand):
+    help = "Recompute SavedSearch.new_match_count from each search's watermark"
+
+    def handle(self, *args, **options):
+        changed = saved_searches.recount()
+        self.stdout.write(self.style.SUCCESS(f"Updated {changed} saved search count(s)."))
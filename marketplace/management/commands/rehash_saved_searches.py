@@ -0,0 +1,45 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from marketplace.models import SavedSearch, SavedSearchHit
+
+
+class Command(BaseCommand):
+    help = ("Rewrite SavedSearch params / params_hash in the canonical CarFilter form, "
+            "merging a user's searches that turn out to be the same search")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Report the changes without writing them")
+
+    def handle(self, *args, **options):
+        groups = defaultdict(list)
+        for s in SavedSearch.objects.order_by("created_at", "pk"):
+            old = (s.params, s.params_hash)
+            s.set_params(s.params or s.query_json or {})
+            groups[(s.user_id, s.params_hash)].append((s, (s.params, s.params_hash) != old))
+
+        rewritten = merged = 0
+        with transaction.atomic():
+            # drop the duplicates first: the survivors' new hashes may be theirs now
+            for rows in groups.values():
+                keep = rows[0][0]
+                for dupe, _ in rows[1:]:
+                    self.stdout.write(f"saved search {dupe.pk}: merged into {keep.pk}")
+                    merged += 1
+                    if options["dry_run"]:
+                        continue
+                    seen = set(keep.hits.values_list("car_id", flat=True))
+                    SavedSearchHit.objects.filter(saved_search=dupe).exclude(car_id__in=seen).update(saved_search=keep)
+                    keep.is_active = keep.is_active or dupe.is_active
+                    dupe.delete()
+            for rows in groups.values():
+                keep, changed = rows[0]
+                if changed or len(rows) > 1:
+                    rewritten += 1
+                    if not options["dry_run"]:
+                        keep.save(update_fields=["params", "params_hash", "is_active"])
+
+        verb = "Would rewrite" if options["dry_run"] else "Rewrote"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {rewritten} saved search(es), merged {merged} duplicate(s)."))
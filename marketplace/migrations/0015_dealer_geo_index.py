@@ -0,0 +1,17 @@
+# Generated by Django 5.0.14 on 2026-10-17 06:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0014_savedcomparison_savedcomparisonitem'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dealer',
+            index=models.Index(fields=['lat', 'lng'], name='marketplace_lat_dea373_idx'),
+        ),
+    ]
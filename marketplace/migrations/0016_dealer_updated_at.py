@@ -0,0 +1,26 @@
+# Generated by Django 5.0.14 on 2026-10-17 07:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_updated_at(apps, schema_editor):
+    Dealer = apps.get_model("marketplace", "Dealer")
+    Dealer.objects.update(updated_at=models.F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0015_dealer_geo_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dealer',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ]
@@ -8,9 +8,8 @@ from django.db.models import Max, Sum
 from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.utils.text import slugify
-from django.core.exceptions import FieldError
-import hashlib, json
 
+from models.filters import CarFilter
 from models.models import Car
 
 
@@ -215,47 +214,36 @@ class SavedSearch(models.Model):
 
     # 👉 Only watermark we maintain without any background job
     last_seen_car_created_at = models.DateTimeField(blank=True, null=True)
+    # cars added since the watermark that matched when they were listed
+    # (marketplace/saved_searches.py); reset by mark_read()
+    new_match_count = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         unique_together = (("user", "params_hash"),)
         ordering = ["-created_at"]
+        indexes = [models.Index(fields=["user", "is_active", "new_match_count"], name="savedsearch_unread_idx")]
 
     def __str__(self):
         return self.name or f"SavedSearch #{self.pk}"
 
+    @property
+    def car_filter(self):
+        # older rows stored raw form values; CarFilter reads both shapes
+        return CarFilter.from_params(self.params or self.query_json or {})
+
+    @staticmethod
+    def hash_for(params: dict) -> str:
+        """Canonical CarFilter hash, shared with facet/result caches."""
+        return CarFilter.from_params(params).hash
+
     def set_params(self, raw_params: dict):
-        allow = {
-            "make", "model_name", "body_type", "transmission", "fuel",
-            "price_min", "price_max", "mileage_max",
-            "is_featured", "is_new", "is_certified", "is_hot",
-        }
-        cleaned = {k: v for k, v in raw_params.items() if k in allow and v not in ("", None)}
-        for k, v in list(cleaned.items()):
-            if isinstance(v, str):
-                cleaned[k] = v.strip()
-        for b in ["is_featured","is_new","is_certified","is_hot"]:
-            if b in cleaned:
-                cleaned[b] = str(cleaned[b]).lower() in ("1","true","on","yes")
-        self.params = cleaned
-        self.params_hash = hashlib.sha1(json.dumps(cleaned, sort_keys=True).encode("utf-8")).hexdigest()
+        # rows hashed before CarFilter: `manage.py rehash_saved_searches`
+        f = CarFilter.from_params(raw_params)
+        self.params = f.to_params()
+        self.params_hash = f.hash
 
     def queryset(self):
-        from .models import Car
-        p  = self.params or {}
-        qs = Car.objects.all()
-        if "make" in p:           qs = qs.filter(make__name__iexact=p["make"])
-        if "model_name" in p:     qs = qs.filter(model_name__iexact=p["model_name"])
-        if "body_type" in p:      qs = qs.filter(body_type__name__iexact=p["body_type"])
-        if "transmission" in p:   qs = qs.filter(transmission=p["transmission"])
-        if "fuel" in p:           qs = qs.filter(fuel=p["fuel"])
-        if "price_min" in p:      qs = qs.filter(price__gte=p["price_min"] or 0)
-        if "price_max" in p:      qs = qs.filter(price__lte=p["price_max"])
-        if "mileage_max" in p:    qs = qs.filter(mileage__lte=p["mileage_max"])
-        if p.get("is_featured"):  qs = qs.filter(is_featured=True)
-        if p.get("is_new"):       qs = qs.filter(is_new=True)
-        if p.get("is_certified"): qs = qs.filter(is_certified=True)
-        if p.get("is_hot"):       qs = qs.filter(is_hot=True)
-        return qs
+        return self.car_filter.queryset()
 
     def new_matches_qs(self):
         qs = self.queryset()
@@ -266,6 +254,17 @@ class SavedSearch(models.Model):
     def newest_car_created(self):
         return self.queryset().aggregate(mx=Max("created"))["mx"]
 
+    @property
+    def has_new(self) -> bool:
+        return self.new_match_count > 0
+
+    def mark_read(self):
+        """Move the watermark to the newest match and clear the unread count."""
+        newest = self.newest_car_created()
+        self.last_seen_car_created_at = newest or timezone.now()
+        self.new_match_count = 0
+        self.save(update_fields=["last_seen_car_created_at", "new_match_count"])
+
 
 class SavedSearchHit(models.Model):
     saved_search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name="hits")
@@ -283,111 +282,9 @@ class SavedSearchHit(models.Model):
         return f"Hit for {self.saved_search.name or 'Search'} – Car #{self.car.id}"
 
 
-    @staticmethod
-    def hash_for(params: dict) -> str:
-        """
-        Stable SHA-1 over normalized params dict.
-        """
-        return hashlib.sha1(
-            json.dumps(params or {}, sort_keys=True, separators=(",", ":")).encode("utf-8")
-        ).hexdigest()
-
-    def set_params(self, params: dict) -> None:
-        """
-        Normalize and store params + params_hash.
-        Allowed keys match your filters.
-        """
-        allowed = {
-            "make", "model_name", "body_type", "transmission", "fuel",
-            "price_min", "price_max", "mileage_max",
-            "is_featured", "is_new", "is_certified", "is_hot",
-        }
-        cleaned = {}
-        for k, v in (params or {}).items():
-            if k in allowed:
-                s = str(v).strip()
-                if s != "":
-                    cleaned[k] = s
-        self.params = cleaned
-        self.params_hash = self.hash_for(cleaned)
-
     def queryset(self):
-        """
-        Build the base queryset from self.params using your field names:
-          make, model_name, body_type, transmission, fuel,
-          price_min, price_max, mileage_max, is_featured, is_new, is_certified, is_hot
-        NOTE: This references CarListing defined earlier in this file.
-        """
-        # CarListing is defined above in this same module
-        qs = CarListing.objects.filter(is_active=True)
-        p = (self.params or self.query_json or {})  # keep backward-compat
-
-        # helpers
-        def to_int(v):
-            try:
-                return int(str(v).replace(",", ""))
-            except Exception:
-                return None
-
-        def truthy(key):
-            return str(p.get(key, "")).lower() in {"1", "true", "yes", "on"}
-
-        # make (works whether CharField or FK to a Make with 'name')
-        if p.get("make"):
-            val = p["make"]
-            try:
-                qs = qs.filter(make__name__iexact=val)
-            except FieldError:
-                try:
-                    qs = qs.filter(make__iexact=val)
-                except FieldError:
-                    pass
-
-        # exact text fields
-        if p.get("model_name"):
-            qs = qs.filter(model_name__iexact=p["model_name"])
-        if p.get("body_type"):
-            qs = qs.filter(body_type__iexact=p["body_type"])
-        if p.get("transmission"):
-            qs = qs.filter(transmission__iexact=p["transmission"])
-        if p.get("fuel"):
-            qs = qs.filter(fuel__iexact=p["fuel"])
-
-        # numeric ranges
-        v = to_int(p.get("price_min"))
-        if v is not None:
-            qs = qs.filter(price__gte=v)
-        v = to_int(p.get("price_max"))
-        if v is not None:
-            qs = qs.filter(price__lte=v)
-        v = to_int(p.get("mileage_max"))
-        if v is not None:
-            qs = qs.filter(mileage__lte=v)
-
-        # boolean flags
-        if truthy("is_featured"):
-            qs = qs.filter(is_featured=True)
-        if truthy("is_new"):
-            qs = qs.filter(is_new=True)
-        if truthy("is_certified"):
-            qs = qs.filter(is_certified=True)
-        if truthy("is_hot"):
-            qs = qs.filter(is_hot=True)
-
-        # ordering: prefer '-created' if that field exists, else '-id'
-        has_created = any(f.name == "created" for f in CarListing._meta.fields)
-        return qs.order_by("-created" if has_created else "-id")
-
-    def new_matches_qs(self):
-        """
-        Return only listings newer than the watermark.
-        If no watermark, return the base queryset.
-        """
-        qs = self.queryset()
-        has_created = any(f.name == "created" for f in CarListing._meta.fields)
-        if self.last_seen_car_created_at and has_created:
-            qs = qs.filter(created__gt=self.last_seen_car_created_at)
-        return qs
+        """Cars matching the parent saved search (same CarFilter)."""
+        return self.saved_search.queryset()
 
 
 class Cart(models.Model):
@@ -444,21 +341,30 @@ class Cart(models.Model):
         CartItem.objects.filter(cart=self, car=car).delete()
 
     # ---------- Utilities ----------
+    SESSION_COUNT_KEY = "cart_count"   # [session key, total_quantity], see count_for_request
+
     @classmethod
-    def for_request(cls, request):
+    def for_request(cls, request, *, create: bool = True):
         """
-        Get/create a cart bound to this request. Always returns a cart with a session_key.
-        If the user logs in, you can optionally attach/merge carts here later.
+        The cart bound to this request's session. With create=False nothing is
+        written: a visitor without a session or a cart gets None.
         """
+        key = request.session.session_key
+        if not create:
+            return cls.objects.filter(session_key=key).first() if key else None
+
         # Ensure session exists
-        if not request.session.session_key:
+        if not key:
             request.session.save()
-        key = request.session.session_key
+            key = request.session.session_key
 
-        cart, _ = cls.objects.get_or_create(
+        cart, created = cls.objects.get_or_create(
             session_key=key,
             defaults={"user": request.user if request.user.is_authenticated else None},
         )
+        if created:
+            # the cached "no cart" 0 no longer holds
+            request.session.pop(cls.SESSION_COUNT_KEY, None)
 
         # Attach user if not already set
         if request.user.is_authenticated and cart.user_id is None:
@@ -466,6 +372,33 @@ class Cart(models.Model):
             cart.save(update_fields=["user"])
         return cart
 
+    @classmethod
+    def count_for_request(cls, request) -> int:
+        """
+        The navbar badge. Read from the session, where cart writes keep it;
+        visitors without a session cost no query and no write, and a session
+        without a cart is looked up once and its 0 stored like any count.
+        The stored count is tied to the session key, so a rotated session
+        (login) re-counts.
+        """
+        key = request.session.session_key
+        if not key:
+            return 0
+        stored = request.session.get(cls.SESSION_COUNT_KEY)
+        if isinstance(stored, list) and len(stored) == 2 and stored[0] == key:
+            return stored[1]
+        cart = cls.for_request(request, create=False)
+        if cart is None:
+            request.session[cls.SESSION_COUNT_KEY] = [key, 0]
+            return 0
+        return cart.remember_count(request)
+
+    def remember_count(self, request) -> int:
+        """Recount this cart into the session (call after changing it); returns the count."""
+        count = self.total_quantity
+        request.session[self.SESSION_COUNT_KEY] = [request.session.session_key, count]
+        return count
+
     def __str__(self):
         return f"Cart#{self.pk}"
 
@@ -547,6 +480,13 @@ class Dealer(models.Model):
     website = models.URLField(blank=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # bbox scans for map tiles (models/map_tiles.py)
+            models.Index(fields=["lat", "lng"]),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.slug:
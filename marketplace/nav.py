@@ -0,0 +1,125 @@
+# marketplace/nav.py
+"""
+NavState: the per-visitor values the navbar and listing cards print
+(seller flags, saved-search badge, cart and compare state).
+
+These used to come from six context processors that all ran on every
+render, each re-reading the session and querying SellerProfile,
+SavedSearch and Cart whether or not the page showed the result. Templates
+now get one `nav` object per request; every attribute is computed on
+first access and memoised on it, so a page pays only for what it prints.
+
+The database-backed values are also cached per user:
+
+  seller flags        until the user's SellerProfile is written
+  saved-search badge  until one of the user's saved searches is written
+                      or gains a match (marketplace/saved_searches.py)
+
+models/signals.py and saved_searches.py bump the user's version on those
+writes. Session-backed values (compare ids, the checkout cart, the cart
+count that Cart.count_for_request keeps there) are only memoised per
+request.
+"""
+from django.core.cache import cache
+from django.utils.functional import cached_property
+
+from models import versions
+from payment import cart as checkout_cart
+
+from . import saved_searches, seller_status
+from .compare_session import MAX_COMPARE, get_ids
+from .models import Cart
+
+TTL = 60 * 60
+
+
+def _version_key(user_id) -> str:
+    return f"nav:{user_id}:version"
+
+
+def user_version(user_id) -> int:
+    return versions.get(_version_key(user_id))
+
+
+def bump_user(*user_ids) -> None:
+    versions.bump(*{_version_key(u) for u in user_ids if u is not None})
+
+
+class NavState:
+    def __init__(self, request):
+        self.request = request
+
+    # ---------- helpers ----------
+    @cached_property
+    def user_id(self):
+        user = getattr(self.request, "user", None)
+        return user.pk if user is not None and user.is_authenticated else None
+
+    def _cached(self, name, compute, *vary):
+        key = ":".join(str(p) for p in ("nav", self.user_id, user_version(self.user_id), name, *vary))
+        return cache.get_or_set(key, compute, TTL)
+
+    # ---------- seller ----------
+    @cached_property
+    def _seller_status(self):
+        if self.user_id is None:
+            return seller_status.NONE
+        loader = seller_status.for_request(self.request)
+        code = self._cached("seller", lambda: loader.get(self.user_id).code)
+        loader.seed(self.user_id, code)
+        loader.want(self.request.user)      # so `user|is_seller` reads the seeded value
+        return seller_status.Status(code)
+
+    @property
+    def is_seller(self) -> bool:
+        return self._seller_status.is_verified
+
+    @property
+    def is_seller_pending(self) -> bool:
+        return self._seller_status.is_pending
+
+    # ---------- saved searches ----------
+    @cached_property
+    def has_new_saved_searches(self) -> bool:
+        if self.user_id is None:
+            return False
+        return self._cached("saved", lambda: saved_searches.has_unread(self.user_id))
+
+    # ---------- cart ----------
+    @cached_property
+    def cart_count(self) -> int:
+        # safe default if sessions not ready (e.g., during some system checks)
+        try:
+            return Cart.count_for_request(self.request)
+        except Exception:
+            return 0
+
+    @cached_property
+    def cart_ids(self) -> list:
+        return [str(pk) for pk in checkout_cart.ids(self.request)]
+
+    @cached_property
+    def cart_total_cents(self) -> int:
+        return checkout_cart.total_cents(self.request)
+
+    # ---------- compare ----------
+    compare_max = MAX_COMPARE
+
+    @cached_property
+    def compare_ids(self) -> list:
+        return get_ids(self.request)
+
+    @property
+    def compare_count(self) -> int:
+        return len(self.compare_ids)
+
+    @property
+    def compare_full(self) -> bool:
+        return self.compare_count >= self.compare_max
+
+
+def for_request(request) -> NavState:
+    """The request's NavState, created on first use."""
+    if not hasattr(request, "_nav"):
+        request._nav = NavState(request)
+    return request._nav
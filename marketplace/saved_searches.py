@@ -0,0 +1,86 @@
+# marketplace/saved_searches.py
+"""
+Unread state for saved searches (SavedSearch.new_match_count).
+
+The navbar badge used to run new_matches_qs().exists() for every active
+saved search of the user on every page, and the list page a COUNT per
+search. The count is now kept on the row instead:
+
+  * a new Car is tested against every saved search in memory
+    (CarFilter.matches) and the matching rows get +1 in one UPDATE;
+  * SavedSearch.mark_read() moves the watermark and sets it back to 0.
+
+The badge is then one indexed EXISTS (savedsearch_unread_idx), cached per
+user by marketplace/nav.py. The parsed filters of all saved searches are
+cached too, until a saved search, Make or BodyType is written; they are
+read from the stored canonical params, so a cold cache costs the Car save
+one query however many searches there are.
+
+Only cars added after the watermark are counted, as they were when
+listed: edits and deletions do not move the count. `manage.py
+recount_saved_searches` recomputes every count from the watermarks: run
+it once after migrating to marketplace 0017 (the column starts at 0), and
+after Car bulk_create, which sends no signals.
+"""
+from django.core.cache import cache
+from django.db.models import F
+
+from models import versions
+from models.filters import CarFilter
+
+from .models import SavedSearch
+
+FILTERS_VERSION_KEY = "saved_searches:filters:version"
+FILTERS_TTL = 60 * 60 * 24
+
+
+def _filters_key() -> str:
+    version = versions.get(FILTERS_VERSION_KEY)
+    return f"saved_searches:filters:{version}"
+
+
+def bump_filters() -> None:
+    versions.bump(FILTERS_VERSION_KEY)
+
+
+def _load_filters() -> list:
+    # params are canonical (set_params); reading them without resolving makes and
+    # body types keeps a cold cache at one query, not one or more per search
+    return [(s.pk, s.user_id, CarFilter.from_params(s.params, resolve=False) if s.params else s.car_filter)
+            for s in SavedSearch.objects.only("pk", "user_id", "params", "query_json")]
+
+
+def filters() -> list:
+    """[(saved search pk, user pk, CarFilter)] for every saved search."""
+    return cache.get_or_set(_filters_key(), _load_filters, FILTERS_TTL)
+
+
+def car_listed(car) -> int:
+    """Count a newly created car against every saved search it matches; returns how many."""
+    from . import nav  # nav imports this module
+
+    hits = [(pk, user_id) for pk, user_id, car_filter in filters() if car_filter.matches(car)]
+    if not hits:
+        return 0
+    SavedSearch.objects.filter(pk__in=[pk for pk, _ in hits]).update(new_match_count=F("new_match_count") + 1)
+    nav.bump_user(*(user_id for _, user_id in hits))
+    return len(hits)
+
+
+def has_unread(user_id) -> bool:
+    return SavedSearch.objects.filter(user_id=user_id, is_active=True, new_match_count__gt=0).exists()
+
+
+def recount(qs=None) -> int:
+    """Recompute new_match_count from the watermarks; returns rows changed."""
+    from . import nav
+
+    changed, users = 0, set()
+    for s in (qs if qs is not None else SavedSearch.objects.all()):
+        count = s.new_matches_qs().count()
+        if count != s.new_match_count:
+            SavedSearch.objects.filter(pk=s.pk).update(new_match_count=count)
+            changed += 1
+            users.add(s.user_id)
+    nav.bump_user(*users)
+    return changed
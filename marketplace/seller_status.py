@@ -0,0 +1,105 @@
+# marketplace/seller_status.py
+"""
+Request-scoped, batched SellerProfile status lookups.
+
+The `is_seller` filter and the navbar flags each asked the database about
+one user at a time, once per evaluation. A SellerStatusLoader (one per
+request, for_request) collects the user ids a page needs and answers all
+of them with one query the first time any of them is read; repeats come
+from memory:
+
+    loader = seller_status.for_request(request).want(*users)   # no query yet
+    loader.get(users[0]).is_verified                            # 1 query for all
+    loader.get(users[1]).is_pending                             # from memory
+
+User objects queued through the loader remember it, so the plain
+`user|is_seller` filter (which cannot see the request) joins the batch
+too: NavState queues request.user, so the filter on it reads the value
+the navbar already has. A user the filter has never seen gets a loader of
+its own, and still costs at most one query however often it runs.
+"""
+from dataclasses import dataclass
+
+from .models import SellerProfile
+
+
+@dataclass(frozen=True)
+class Status:
+    code: str = ""              # SellerProfile.verification_status, "" without a profile
+
+    @property
+    def is_seller(self) -> bool:
+        return bool(self.code)
+
+    @property
+    def is_verified(self) -> bool:
+        return self.code == "APPROVED"
+
+    @property
+    def is_pending(self) -> bool:
+        return self.code in ("DRAFT", "PENDING")
+
+
+NONE = Status()
+
+
+def _user_id(user_or_id):
+    if user_or_id is None or isinstance(user_or_id, int):
+        return user_or_id
+    if not getattr(user_or_id, "is_authenticated", True):
+        return None
+    return getattr(user_or_id, "pk", None)
+
+
+class SellerStatusLoader:
+    def __init__(self):
+        self._known = {}        # user id -> Status
+        self._queued = set()
+
+    def want(self, *users) -> "SellerStatusLoader":
+        """Queue users (objects or ids); objects remember this loader for the `is_seller` filter."""
+        for user in users:
+            user_id = _user_id(user)
+            if user_id is None:
+                continue
+            if not isinstance(user, int):
+                try:
+                    user._seller_status_loader = self
+                except AttributeError:
+                    pass
+            if user_id not in self._known:
+                self._queued.add(user_id)
+        return self
+
+    def seed(self, user_id, code) -> None:
+        """Record a status learnt elsewhere (e.g. a cache hit in marketplace/nav.py)."""
+        if user_id is not None:
+            self._known[user_id] = Status(code or "")
+            self._queued.discard(user_id)
+
+    def _flush(self) -> None:
+        ids, self._queued = self._queued, set()
+        found = dict(SellerProfile.objects.filter(user_id__in=ids).values_list("user_id", "verification_status"))
+        for user_id in ids:
+            self._known[user_id] = Status(found.get(user_id, ""))
+
+    def get(self, user) -> Status:
+        user_id = _user_id(user)
+        if user_id is None:
+            return NONE
+        if user_id not in self._known:
+            self.want(user)
+            self._flush()
+        return self._known[user_id]
+
+
+def for_request(request) -> SellerStatusLoader:
+    if not hasattr(request, "_seller_status"):
+        request._seller_status = SellerStatusLoader()
+    return request._seller_status
+
+
+def for_user(user) -> SellerStatusLoader:
+    """The loader `user` was queued on, else a new one bound to it."""
+    loader = getattr(user, "_seller_status_loader", None)
+    return loader if loader is not None else SellerStatusLoader().want(user)
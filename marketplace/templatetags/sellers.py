@@ -1,10 +1,14 @@
-
 from django import template
-from marketplace.models import SellerProfile
+
+from marketplace import seller_status as statuses
 
 register = template.Library()
 
+
 @register.filter
 def is_seller(user):
-    return getattr(user, "is_authenticated", False) and \
-           SellerProfile.objects.filter(user_id=user.id).exists()
\ No newline at end of file
+    """Has a SellerProfile; batched and memoised (marketplace/seller_status.py)."""
+    if not getattr(user, "is_authenticated", False):
+        return False
+    return statuses.for_user(user).get(user).is_seller
+
@@ -1,3 +1,275 @@
-from django.test import TestCase
+import hashlib
+import json
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.cache import SessionStore as CacheSession
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.template import Context, RequestContext, Template
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from models.models import Car, Make
+from payment.context_processors import cart_meta
+
+from . import context_processors, nav, saved_searches, seller_status
+from .models import Cart, SavedSearch, SavedSearchHit, SellerProfile
+
+
+class RehashSavedSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.toyota = Make.objects.create(name="Toyota")
+        cls.user = get_user_model().objects.create_user("alice")
+
+    def legacy(self, params):
+        # as saved before CarFilter: sha1 of the raw form values
+        raw_hash = hashlib.sha1(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+        return SavedSearch.objects.create(user=self.user, params=params, params_hash=raw_hash)
+
+    def test_rehash_rewrites_and_merges(self):
+        first = self.legacy({"make": "Toyota", "max_price": "10000"})
+        second = self.legacy({"make": "toyota", "price_max": "10000.00"})
+        car = Car.objects.create(make=self.toyota, title="Toyota car", price=Decimal(9000))
+        SavedSearchHit.objects.create(saved_search=second, car=car)
+
+        out = StringIO()
+        call_command("rehash_saved_searches", "--dry-run", stdout=out)
+        self.assertIn("merged 1 duplicate", out.getvalue())
+        self.assertEqual(SavedSearch.objects.count(), 2)
+
+        call_command("rehash_saved_searches", stdout=StringIO())
+        kept = SavedSearch.objects.get()
+        self.assertEqual(kept.pk, first.pk)
+        self.assertEqual(kept.params_hash, kept.car_filter.hash)
+        self.assertEqual(kept.params, {"make": ["toyota"], "price_max": "10000.00"})
+        self.assertEqual(list(kept.hits.values_list("car_id", flat=True)), [car.pk])
+
+    def test_saving_again_after_rehash_finds_the_row(self):
+        self.legacy({"make": "Toyota"})
+        call_command("rehash_saved_searches", stdout=StringIO())
+        self.client.force_login(self.user)
+        self.client.post(reverse("marketplace:saved_search_create"), {"make": "toyota"})
+        self.assertEqual(SavedSearch.objects.count(), 1)
+
+
+@override_settings(SESSION_ENGINE="django.contrib.sessions.backends.cache")
+class NavContextTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("alice")
+
+    def setUp(self):
+        cache.clear()
+
+    def request(self, user=None, **session):
+        request = RequestFactory().get("/")
+        request.user = user or AnonymousUser()
+        request.session = CacheSession()
+        request.session.update(session)
+        return request
+
+    def render(self, source, request, processors):
+        return Template(source).render(RequestContext(request, processors=processors))
+
+    def test_old_processor_names_still_set_their_variables(self):
+        request = self.request(compare_ids=[3, 1], cart=[7])
+        processors = [context_processors.seller_flags, context_processors.compare_meta, cart_meta]
+        out = self.render("{{ compare_count }}/{{ compare_max }} {% for pk in compare_ids %}{{ pk }},{% endfor %} "
+                          "{% if is_seller %}seller{% else %}buyer{% endif %} {{ cart_count }}", request, processors)
+        self.assertEqual(out, "2/4 3,1, buyer 1")
+
+    def test_nothing_is_queried_until_printed(self):
+        processors = [context_processors.nav, context_processors.seller_flags,
+                      context_processors.saved_search_badge, context_processors.nav_counts]
+        with self.assertNumQueries(0):
+            self.render("{{ nav.compare_count }}", self.request(self.user), processors)
+        with self.assertNumQueries(1):
+            self.render("{% if has_new_saved_searches %}new{% endif %}", self.request(self.user), processors)
+        with self.assertNumQueries(0):     # cached per user until a saved search is written
+            self.render("{% if nav.has_new_saved_searches %}new{% endif %}", self.request(self.user), processors)
+
+
+class SavedSearchUnreadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.toyota = Make.objects.create(name="Toyota")
+        cls.honda = Make.objects.create(name="Honda")
+        User = get_user_model()
+        cls.alice, cls.bob = User.objects.create_user("alice"), User.objects.create_user("bob")
+
+    def setUp(self):
+        cache.clear()
+        self.cheap_toyota = self.search(self.alice, {"make": "toyota", "max_price": "10000"})
+        self.any_honda = self.search(self.bob, {"make": "honda"})
+
+    def search(self, user, params, **fields):
+        s = SavedSearch(user=user, **fields)
+        s.set_params(params)
+        s.save()
+        s.mark_read()
+        return s
+
+    def car(self, make, price):
+        return Car.objects.create(make=make, title=f"{make.name} car", price=Decimal(price))
+
+    def counts(self):
+        return dict(SavedSearch.objects.values_list("pk", "new_match_count"))
+
+    def test_new_car_bumps_only_matching_searches(self):
+        self.car(self.toyota, 9000)
+        self.car(self.toyota, 25000)
+        self.car(self.honda, 25000)
+        self.car(self.toyota, 8000)
+        self.assertEqual(self.counts(), {self.cheap_toyota.pk: 2, self.any_honda.pk: 1})
+        self.assertTrue(saved_searches.has_unread(self.alice.pk))
+
+    def test_edits_do_not_count(self):
+        car = self.car(self.toyota, 25000)
+        car.price = Decimal(9000)
+        car.save()
+        self.assertEqual(self.counts()[self.cheap_toyota.pk], 0)
+
+    def test_mark_read_resets_the_count(self):
+        self.car(self.toyota, 9000)
+        s = SavedSearch.objects.get(pk=self.cheap_toyota.pk)
+        self.assertTrue(s.has_new)
+        s.mark_read()
+        s.refresh_from_db()
+        self.assertEqual(s.new_match_count, 0)
+        self.assertFalse(saved_searches.has_unread(self.alice.pk))
+
+    def test_inactive_searches_are_not_unread(self):
+        self.search(self.alice, {"make": "honda"}, is_active=False)
+        self.car(self.honda, 5000)
+        self.assertFalse(saved_searches.has_unread(self.alice.pk))
+        self.assertTrue(saved_searches.has_unread(self.bob.pk))
+
+    def test_changed_params_reach_the_cached_filters(self):
+        self.car(self.honda, 5000)      # fills the filters cache
+        s = SavedSearch.objects.get(pk=self.cheap_toyota.pk)
+        s.set_params({"make": "honda"})
+        s.save()
+        self.car(self.honda, 6000)
+        self.assertEqual(self.counts()[self.cheap_toyota.pk], 1)
+
+    def test_navbar_version_moves_for_matched_users_only(self):
+        alice, bob = nav.user_version(self.alice.pk), nav.user_version(self.bob.pk)
+        self.car(self.honda, 5000)
+        self.assertEqual(nav.user_version(self.alice.pk), alice)
+        self.assertNotEqual(nav.user_version(self.bob.pk), bob)
+
+    def test_cold_filters_cache_costs_one_query_however_many_searches(self):
+        def listing_queries():
+            cache.clear()
+            with CaptureQueriesContext(connection) as ctx:
+                self.car(self.honda, 5000)
+            return len(ctx)
+
+        few = listing_queries()
+        for i in range(40):
+            self.search(self.alice, {"make": "toyota", "max_price": str(1000 + i), "body_type": "SUV"})
+        self.assertEqual(listing_queries(), few)
+        with self.assertNumQueries(1):
+            cache.clear()
+            self.assertEqual(len(saved_searches.filters()), 42)
+
+    def test_recount_catches_up_after_bulk_create(self):
+        Car.objects.bulk_create([
+            Car(make=self.toyota, title="Toyota car", price=Decimal(7000)),
+            Car(make=self.honda, title="Honda car", price=Decimal(7000)),
+        ])
+        self.assertEqual(self.counts(), {self.cheap_toyota.pk: 0, self.any_honda.pk: 0})
+        self.assertEqual(saved_searches.recount(), 2)
+        self.assertEqual(self.counts(), {self.cheap_toyota.pk: 1, self.any_honda.pk: 1})
+        self.assertEqual(saved_searches.recount(), 0)
+
+
+class CartCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.car = Car.objects.create(make=Make.objects.create(name="Toyota"), title="Toyota car",
+                                     price=Decimal(9000))
+
+    def request(self, *, session=True):
+        request = RequestFactory().get("/")
+        request.user = AnonymousUser()
+        request.session = CacheSession()
+        if session:
+            request.session.save()
+        return request
+
+    def test_no_session_costs_nothing(self):
+        request = self.request(session=False)
+        with self.assertNumQueries(0):
+            self.assertEqual(Cart.count_for_request(request), 0)
+        self.assertFalse(request.session.modified)
+
+    def test_a_session_without_a_cart_is_counted_once(self):
+        request = self.request()
+        with self.assertNumQueries(1):
+            self.assertEqual(Cart.count_for_request(request), 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(Cart.count_for_request(request), 0)
+
+    def test_creating_the_cart_drops_the_cached_zero(self):
+        request = self.request()
+        Cart.count_for_request(request)
+        cart = Cart.for_request(request)
+        cart.add(self.car)
+        self.assertEqual(Cart.count_for_request(request), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(Cart.count_for_request(request), 1)
+
+    def test_cart_add_creates_the_cart_and_counts_it(self):
+        response = self.client.post(reverse("cart_add", args=[self.car.pk]), HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        self.assertEqual(response.json()["cart_count"], 1)
+        self.assertEqual(Cart.objects.count(), 1)
+
+    def test_anonymous_pages_do_not_write(self):
+        out = StringIO()
+        call_command("bench_anonymous_writes", visitors=2, cars=1, stdout=out)
+        self.assertIn("0 database writes", out.getvalue())
+        self.assertEqual(Cart.objects.count(), 0)
+
+
+class SellerStatusTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.users = [User.objects.create_user(f"user{i}") for i in range(4)]
+        SellerProfile.objects.create(user=cls.users[0], verification_status="APPROVED")
+        SellerProfile.objects.create(user=cls.users[1], verification_status="PENDING")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_queued_users_resolve_in_one_query(self):
+        loader = seller_status.SellerStatusLoader().want(*self.users)
+        with self.assertNumQueries(1):
+            statuses = [loader.get(u) for u in self.users * 2]
+        self.assertEqual([(s.is_seller, s.is_verified, s.is_pending) for s in statuses[:4]],
+                         [(True, True, False), (True, False, True), (False, False, False), (False, False, False)])
+
+    def test_is_seller_filter_costs_one_query_however_often_it_runs(self):
+        template = Template("{% load sellers %}{% for u in users %}{{ u|is_seller }}{{ u|is_seller }} {% endfor %}")
+        users = list(get_user_model().objects.filter(pk__in=[u.pk for u in self.users]).order_by("pk"))
+        seller_status.SellerStatusLoader().want(*users)
+        with self.assertNumQueries(1):
+            out = template.render(Context({"users": users}))
+        self.assertEqual(out, "TrueTrue TrueTrue FalseFalse FalseFalse ")
+
+    def test_navbar_flags_and_the_filter_share_one_lookup(self):
+        request = RequestFactory().get("/")
+        request.user = self.users[0]
+        request.session = CacheSession()
+        state = nav.for_request(request)
+        with self.assertNumQueries(1):
+            self.assertTrue(state.is_seller)
+            self.assertEqual(Template("{% load sellers %}{{ user|is_seller }}").render(Context({"user": request.user})),
+                             "True")
@@ -7,22 +7,7 @@ from django.utils import timezone
 from django.db import transaction
 
 from marketplace.models import SavedSearch
-
-# These are the exact keys visible in your repo/templates/filters
-ALLOWED_KEYS = [
-    "make", "model_name", "body_type", "transmission", "fuel",
-    "price_min", "price_max", "mileage_max",
-    "is_featured", "is_new", "is_certified", "is_hot",
-]
-
-def _extract_filters(qd):
-    """Pick out only the allowed filter keys, trimming blanks."""
-    out = {}
-    for k in ALLOWED_KEYS:
-        v = (qd.get(k) or "").strip()
-        if v != "":
-            out[k] = v
-    return out
+from models.filters import CarFilter
 
 
 @login_required
@@ -33,8 +18,9 @@ def saved_search_create(request):
     Accepts POST (hidden form) or GET (?make=Toyota&...).
     """
     qd = request.POST if request.method == "POST" else request.GET
-    params = _extract_filters(qd)
-    if not params:
+    # canonical spec: the home page and /browse/ forms save the same search
+    car_filter = CarFilter.from_querydict(qd)
+    if not car_filter:
         messages.warning(request, "No filters to save.")
         return redirect(reverse("marketplace:saved_search_list"))
 
@@ -44,25 +30,15 @@ def saved_search_create(request):
     if freq not in ("DAILY", "WEEKLY"):
         freq = "DAILY"
 
-    # Deduplicate via params_hash (your model supports this)
-    try:
-        params_hash = SavedSearch.hash_for(params)
-    except AttributeError:
-        import hashlib, json
-        params_hash = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
-
-    existing = SavedSearch.objects.filter(user=request.user, params_hash=params_hash).first()
+    # Deduplicate via params_hash (CarFilter.hash)
+    existing = SavedSearch.objects.filter(user=request.user, params_hash=car_filter.hash).first()
     if existing:
         messages.info(request, "You already saved this search.")
         return redirect(reverse("marketplace:saved_search_list"))
 
     # Create and persist
     ss = SavedSearch(user=request.user, name=name, frequency=freq, is_active=True)
-    if hasattr(ss, "set_params"):
-        ss.set_params(params)      # your helper: sets params + params_hash
-    else:
-        ss.params = params
-        ss.params_hash = params_hash
+    ss.set_params(car_filter.to_params())      # sets params + params_hash
     ss.save()
 
     # Baseline watermark so “new” means after this save moment
@@ -77,7 +53,7 @@ def saved_search_create(request):
 def saved_search_list(request):
     """List saved searches with a count of NEW matches since the watermark."""
     searches = SavedSearch.objects.filter(user=request.user).order_by("-created_at")
-    items = [{"s": s, "new_count": s.new_matches_qs().count()} for s in searches]
+    items = [{"s": s, "new_count": s.new_match_count} for s in searches]
     return render(request, "saved_searches/list.html", {"items": items})
 
 
@@ -98,9 +74,7 @@ def saved_search_mark_read(request, pk):
     if request.method != "POST":
         return redirect(reverse("marketplace:saved_search_list"))
     s = get_object_or_404(SavedSearch, pk=pk, user=request.user)
-    newest = s.queryset().order_by("-created").first()
-    s.last_seen_car_created_at = (newest.created if newest else timezone.now())
-    s.save(update_fields=["last_seen_car_created_at"])
+    s.mark_read()
     messages.success(request, "Marked as read.")
     return redirect(reverse("marketplace:saved_search_list"))
 
@@ -1,11 +1,10 @@
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.admin.views.decorators import staff_member_required
 from django.core.exceptions import PermissionDenied
-from django.core.paginator import Paginator
 from django.utils import timezone
-from django.http import HttpResponseBadRequest, JsonResponse
+from django.http import Http404, HttpResponseBadRequest, JsonResponse
 from django.shortcuts import get_object_or_404, redirect
-from django.views.decorators.http import require_POST, require_GET
+from django.views.decorators.http import condition, require_POST, require_GET
 from django.contrib import messages
 from django.db import transaction
 from django.conf import settings
@@ -51,10 +50,10 @@ def my_listings(request):
 
 
 # views.py
-from decimal import Decimal, InvalidOperation
-from django.db.models import Q
 from django.shortcuts import render
 from .models import Car  # adjust import to your app
+from models import conditional, map_tiles, pagination, result_cache, session_ids
+from models.filters import CarFilter
 
 FUEL_ALIASES = {
     "petrol": "Petrol",
@@ -83,59 +82,33 @@ def browse_listings(request):  # keep same name so your navbar link still works
     mileage_max= (request.GET.get("mileage_max") or "").strip()
     fuel       = (request.GET.get("fuel") or "").strip().lower()   # 'petrol','diesel',...
     trans      = (request.GET.get("trans") or "").strip().lower()  # 'manual','auto','cvt'
-
-    qs = (Car.objects
-          .select_related("make", "body_type")
-          .prefetch_related("images")
-          .all())
-
-    if q:
-        qs = qs.filter(
-            Q(title__icontains=q) |
-            Q(make__name__icontains=q) |
-            Q(model_name__icontains=q) |
-            Q(overview__icontains=q) |
-            Q(history__icontains=q)
-        )
-
-    if make:
-        qs = qs.filter(make__name__icontains=make)
-    if model:
-        qs = qs.filter(model_name__icontains=model)
-
-    # map query values to your Car.choices (title-case)
-    fuel_map  = {"petrol":"Petrol","diesel":"Diesel","hybrid":"Hybrid","electric":"Electric"}
-    trans_map = {"manual":"Manual","auto":"Automatic","automatic":"Automatic","cvt":"CVT"}
-    if fuel in fuel_map:
-        qs = qs.filter(fuel=fuel_map[fuel])
-    if trans in trans_map:
-        qs = qs.filter(transmission=trans_map[trans])
-
-    if price_min:
-        try: qs = qs.filter(price__gte=Decimal(price_min))
-        except: pass
-    if price_max:
-        try: qs = qs.filter(price__lte=Decimal(price_max))
-        except: pass
-    if mileage_max:
-        try: qs = qs.filter(mileage__lte=int(mileage_max))
-        except: pass
-
-    # optional flags (work if you pass ?is_new=1 etc.)
-    if request.GET.get("is_featured"):   qs = qs.filter(is_featured=True)
-    if request.GET.get("is_new"):        qs = qs.filter(is_new=True)
-    if request.GET.get("is_certified"):  qs = qs.filter(is_certified=True)
-    if request.GET.get("is_hot"):        qs = qs.filter(is_hot=True)
-
-    paginator = Paginator(qs, 12)
-    page_obj = paginator.get_page(request.GET.get("page"))
+    # same canonical filter spec as the home page and saved searches (models/filters.py);
+    # numbered pages first, keyset cursors past pagination.MAX_PAGES,
+    # anonymous pages served from the versioned result cache
+    car_filter = CarFilter.from_querydict(request.GET)
+    sort       = request.GET.get("sort")
+    if sort not in pagination.SORT_KEYS or (sort == "distance" and not car_filter.near):
+        sort = None
+    page_obj = result_cache.paginate(
+        request,
+        Car.objects.select_related("make", "body_type").prefetch_related("images"),
+        car_filter, sort, namespace="cars",
+    )
 
     query = {
         "q": q, "make": make, "model": model,
         "price_min": price_min, "price_max": price_max,
         "mileage_max": mileage_max, "fuel": fuel, "trans": trans,
+        "near": (request.GET.get("near") or "").strip() if car_filter.near else "",
+        "radius_km": car_filter.radius_km or "",
+        "sort": sort or "",
     }
-    return render(request, "marketplace/listings.html", {"page_obj": page_obj, "query": query})
+    params = request.GET.copy()
+    params.pop("page", None)
+    params.pop("cursor", None)
+    return render(request, "marketplace/listings.html", {
+        "page_obj": page_obj, "query": query, "querystring": params.urlencode(),
+    })
 
 
 def listing_detail(request, slug):
@@ -357,19 +330,11 @@ def saved_search_create(request):
     if request.method != "POST":
         return HttpResponseBadRequest("POST required")
 
-    # Capture filters that your UI uses
-    fields = [
-        "q","make","model_name","body_type","transmission","fuel",
-        "price_min","price_max","mileage_max","is_featured","is_new","is_certified","is_hot",
-    ]
-    payload = {k: request.POST.get(k) for k in fields if request.POST.get(k) not in (None, "")}
-
-    ss = SavedSearch.objects.create(
-        user=request.user,
-        name=request.POST.get("name") or "My search",
-        query_json=payload,               # JSONField or TextField(json.dumps(...))
-        created_at=timezone.now(),
-    )
+    # Capture filters that your UI uses (canonical CarFilter params)
+    ss = SavedSearch(user=request.user, name=request.POST.get("name") or "My search")
+    ss.set_params(CarFilter.from_querydict(request.POST).to_params())
+    if not SavedSearch.objects.filter(user=request.user, params_hash=ss.params_hash).exists():
+        ss.save()
     messages.success(request, "Search saved.")
     return redirect("marketplace:saved_search_list")
 
@@ -382,25 +347,21 @@ def saved_search_list(request):
 
 # CART VIEW 🛒
 
-def _get_session_key(request):
-    if not request.session.session_key:
-        request.session.save()
-    return request.session.session_key
-
-def _get_or_create_cart(request):
-    sk = _get_session_key(request)
-    cart, _ = Cart.objects.get_or_create(
-        user=request.user if request.user.is_authenticated else None,
-        session_key=sk
-    )
+# A Cart row is only created by the first cart_add; reads never write
+# (Cart.for_request(create=False)). Every change refreshes the navbar count
+# kept in the session (Cart.remember_count).
+def _existing_cart_or_404(request):
+    cart = Cart.for_request(request, create=False)
+    if cart is None:
+        raise Http404("No cart")
     return cart
 
 @require_POST
 @transaction.atomic
 def cart_add(request, car_id):
     """Add once. If already in cart, do NOT increment here."""
-    cart = _get_or_create_cart(request)
     car  = get_object_or_404(Car, pk=car_id)   # no is_published on Car
+    cart = Cart.for_request(request)
 
     item, created = CartItem.objects.select_for_update().get_or_create(
         cart=cart, car=car, defaults={"qty": 1}
@@ -410,7 +371,7 @@ def cart_add(request, car_id):
         pass
     item.save()
 
-    count = cart.cartitem_set.count()
+    count = cart.remember_count(request)
     # AJAX?
     if request.headers.get('x-requested-with') == 'XMLHttpRequest':
         return JsonResponse({"ok": True, "already": (not created), "cart_count": count})
@@ -421,7 +382,7 @@ def cart_add(request, car_id):
 @require_POST
 @transaction.atomic
 def cart_update(request, item_id):
-    cart = _get_or_create_cart(request)
+    cart = _existing_cart_or_404(request)
     item = get_object_or_404(CartItem, pk=item_id, cart=cart)
     try:
         qty = int(request.POST.get("qty", "1"))
@@ -430,21 +391,23 @@ def cart_update(request, item_id):
     qty = 1 if qty < 1 else 10 if qty > 10 else qty
     item.qty = qty
     item.save()
+    cart.remember_count(request)
     messages.info(request, "Cart updated.")
     return redirect("cart")
 
 @require_POST
 @transaction.atomic
 def cart_remove(request, item_id):
-    cart = _get_or_create_cart(request)
+    cart = _existing_cart_or_404(request)
     item = get_object_or_404(CartItem, pk=item_id, cart=cart)
     item.delete()
+    cart.remember_count(request)
     messages.warning(request, "Removed from cart.")
     return redirect("cart")
 
 def cart_view(request):
-    cart = _get_or_create_cart(request)
-    items = cart.cartitem_set.select_related("car", "car__make").all()
+    cart = Cart.for_request(request, create=False)
+    items = cart.cartitem_set.select_related("car", "car__make").all() if cart else []
 
     rows = []
     for it in items:
@@ -475,18 +438,19 @@ def dealer_map(request):
                   {"default_center": [37.0902, -95.7129, 4]})
 
 
+@condition(etag_func=conditional.dealers_etag, last_modified_func=conditional.dealers_last_modified)
 def dealers_json(request):
     qs = (
         Dealer.objects
         .filter(is_active=True)
         .exclude(lat__isnull=True).exclude(lng__isnull=True)
-        .exclude(lat="").exclude(lng="")
         .values("id","name","slug","address","lat","lng","phone","website")
     )
     return JsonResponse({"items": list(qs)})
 
 
 @require_GET
+@condition(etag_func=conditional.dealers_etag, last_modified_func=conditional.dealers_last_modified)
 def dealers_geojson(request):
     qs = Dealer.objects.filter(is_active=True).exclude(lat__isnull=True).exclude(lng__isnull=True)
     feats = []
@@ -506,6 +470,27 @@ def dealers_geojson(request):
         })
     return JsonResponse({"type": "FeatureCollection", "features": feats})
 
+
+@require_GET
+def map_features(request, layer):
+    """Clusters/points for one viewport: ?bbox=west,south,east,north&zoom=N (cached per tile)."""
+    layer = map_tiles.LAYERS.get(layer)
+    if layer is None:
+        raise Http404("Unknown map layer")
+    bbox = map_tiles.parse_bbox(request.GET.get("bbox"))
+    try:
+        zoom = int(request.GET.get("zoom", ""))
+    except ValueError:
+        zoom = None
+    if bbox is None or zoom is None:
+        return HttpResponseBadRequest("bbox=west,south,east,north and zoom are required")
+    zoom = max(0, min(zoom, map_tiles.MAX_ZOOM))
+    try:
+        features = map_tiles.features_for_bbox(layer, bbox, zoom)
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+    return JsonResponse({"type": "FeatureCollection", "zoom": zoom, "features": features})
+
 # ENDING!🔚
 
 
@@ -530,19 +515,12 @@ MAX_COMPARE = 4
 
 def _get_compare_ids(request) -> list[int]:
     """Read compare list (ids) from session."""
-    ids = request.session.get(COMPARE_SESSION_KEY, [])
-    if not isinstance(ids, list):
-        ids = []
-    try:
-        return [int(x) for x in ids]
-    except Exception:
-        return []
+    return session_ids.get_ids(request.session, COMPARE_SESSION_KEY)
 
 
 def _set_compare_ids(request, ids: list[int]) -> None:
-    """Persist compare list in session."""
-    request.session[COMPARE_SESSION_KEY] = ids
-    request.session.modified = True
+    """Persist compare list in session (untouched if unchanged)."""
+    session_ids.set_ids(request.session, COMPARE_SESSION_KEY, ids)
 
 
 # ---------- PAGES ----------
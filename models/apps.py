@@ -3,4 +3,7 @@ from django.apps import AppConfig
 class ModelsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "models"
-    verbose_name = "AutoMart"
\ No newline at end of file
+    verbose_name = "AutoMart"
+
+    def ready(self):
+        from . import signals  # noqa: F401  (registers receivers)
@@ -0,0 +1,170 @@
+# models/bench.py
+"""
+Helpers shared by the bench_* management commands.
+
+Every benchmark seeds synthetic inventory inside a transaction that is rolled
+back at the end, so running one against a dev database leaves it untouched;
+BenchCommand does that part for the commands.
+"""
+import random
+import statistics
+import time
+from collections import Counter
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from .geo import encode_geohash
+from .models import BodyType, Car, Make
+
+MAKES = {
+    "Toyota": ["Corolla", "Camry", "RAV4", "Prius", "Hilux"],
+    "Honda": ["Civic", "Accord", "CR-V", "Fit"],
+    "BMW": ["X5", "M3", "320i", "i4"],
+    "Ford": ["Focus", "Mustang", "F-150", "Ranger"],
+    "Tesla": ["Model 3", "Model Y", "Model S"],
+    "Audi": ["A4", "Q5", "e-tron"],
+    "Nissan": ["Leaf", "Altima", "Rogue"],
+    "Kia": ["Sportage", "Rio", "EV6"],
+}
+BODY_TYPES = ["Sedan", "SUV", "Hatchback", "Coupe", "Pickup", "Wagon"]
+WORDS = (
+    "clean title one owner low miles service history garage kept sunroof leather "
+    "navigation bluetooth backup camera new tires warranty accident free"
+).split()
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextmanager
+def scratch_data():
+    """Run the block in a transaction and always roll it back."""
+    try:
+        with transaction.atomic():
+            yield
+            raise _Rollback
+    except _Rollback:
+        pass
+
+
+def seed_cars(n: int, *, geo: bool = False, batch_size: int = 5000, seed: int = 42) -> int:
+    """bulk_create `n` synthetic cars (signals do not fire; rebuild derived data yourself)."""
+    rng = random.Random(seed)
+    makes = {name: Make.objects.get_or_create(name=name)[0] for name in MAKES}
+    bodies = [BodyType.objects.get_or_create(name=name)[0] for name in BODY_TYPES]
+    fuels = [c for c, _ in Car.FUEL_CHOICES]
+    transmissions = [c for c, _ in Car.TRANSMISSION_CHOICES]
+
+    rows = []
+    for i in range(n):
+        make_name = rng.choice(list(MAKES))
+        model = rng.choice(MAKES[make_name])
+        car = Car(
+            title=f"{rng.randint(2005, 2025)} {make_name} {model}",
+            make=makes[make_name],
+            model_name=model,
+            body_type=rng.choice(bodies),
+            price=Decimal(rng.randrange(3000, 120000, 50)),
+            mileage=rng.randrange(0, 200000, 10),
+            fuel=rng.choice(fuels),
+            transmission=rng.choice(transmissions),
+            is_featured=rng.random() < 0.02,
+            is_new=rng.random() < 0.1,
+            is_certified=rng.random() < 0.15,
+            is_hot=rng.random() < 0.05,
+            overview=" ".join(rng.choice(WORDS) for _ in range(30)),
+            history=" ".join(rng.choice(WORDS) for _ in range(15)),
+            seller_meta=rng.choice(["Austin, TX", "Denver, CO", "Miami, FL", "Seattle, WA"]),
+        )
+        if geo:
+            car.seller_lat = Decimal(f"{rng.uniform(25.0, 49.0):.6f}")
+            car.seller_lng = Decimal(f"{rng.uniform(-124.0, -67.0):.6f}")
+            car.seller_geohash = encode_geohash(car.seller_lat, car.seller_lng)
+        rows.append(car)
+        if len(rows) >= batch_size:
+            Car.objects.bulk_create(rows)
+            rows = []
+    if rows:
+        Car.objects.bulk_create(rows)
+    return n
+
+
+WRITES = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+class WriteCounter:
+    """
+    connection.execute_wrapper that counts data-changing statements by their
+    first three words ("UPDATE django_session SET"); `table` keeps only the
+    statements that mention it.
+    """
+
+    def __init__(self, table=None):
+        self.table = table
+        self.writes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        words = sql.split(None, 3)
+        if words and words[0].upper() in WRITES and (self.table is None or self.table in sql):
+            self.writes[" ".join(words[:3])] += 1
+        return execute(sql, params, many, context)
+
+    @property
+    def total(self) -> int:
+        return sum(self.writes.values())
+
+
+def client_host() -> str:
+    """A host the test Client can send that ALLOWED_HOSTS accepts."""
+    hosts = [h for h in settings.ALLOWED_HOSTS if h not in ("*", "")] or ["testserver"]
+    return hosts[0].lstrip(".")
+
+
+def timeit(fn, repeat: int = 7) -> dict:
+    """Call fn() `repeat` times; return best/median wall time in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return {"best": min(samples), "median": statistics.median(samples)}
+
+
+def fmt(result: dict) -> str:
+    return f"best {result['best']:8.2f} ms   median {result['median']:8.2f} ms"
+
+
+class BenchCommand(BaseCommand):
+    """
+    --cars synthetic cars are seeded (geo-tagged if `geo`), then bench()
+    runs with the parsed options; everything is rolled back afterwards.
+    """
+    default_cars = 100_000
+    default_repeat = 5
+    geo = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.help = f"{cls.help} (rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cars", type=int, default=self.default_cars)
+        parser.add_argument("--repeat", type=int, default=self.default_repeat)
+
+    def preflight(self, opts) -> None:
+        """Raise CommandError before seeding if the benchmark cannot run."""
+
+    def bench(self, opts) -> None:
+        raise NotImplementedError
+
+    def handle(self, *args, **opts):
+        self.preflight(opts)
+        with scratch_data():
+            self.stdout.write(f"Seeding {opts['cars']} {'geo-tagged ' if self.geo else ''}cars ...")
+            seed_cars(opts["cars"], geo=self.geo)
+            self.bench(opts)
@@ -0,0 +1,122 @@
+# models/car_api.py
+"""
+Batch car hydration for /api/cars/?ids=1,2,3&fields=title,price,cover.
+
+Only the columns behind the requested fields are selected (one values()
+query, joins only for make / body_type), images come from one extra query
+for all cars, and the result keeps the order of `ids`. Ids that do not
+exist are listed under "missing" instead of failing the batch.
+
+dumps() uses orjson when it is installed and falls back to the standard
+library encoder otherwise; the output is the same compact JSON either way.
+"""
+import json
+from collections import defaultdict
+
+from django.core.files.storage import default_storage
+from django.urls import reverse
+
+from .models import Car, CarImage
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+MAX_IDS = 100
+DEFAULT_FIELDS = ("title", "price", "cover")
+
+_TRANSMISSIONS = dict(Car.TRANSMISSION_CHOICES)
+_FUELS = dict(Car.FUEL_CHOICES)
+
+
+def _url(name):
+    return default_storage.url(name) if name else ""
+
+
+def _text(column):
+    return (column,), lambda row: row[column] or ""
+
+
+def _plain(column):
+    return (column,), lambda row: row[column]
+
+
+# field -> (values() lookups it needs, row -> JSON value); "images" is batch-loaded
+FIELDS = {
+    "title": _text("title"),
+    "make": _text("make__name"),
+    "model_name": _text("model_name"),
+    "body_type": _text("body_type__name"),
+    "price": (("price",), lambda row: float(row["price"]) if row["price"] is not None else None),
+    "mileage": _plain("mileage"),
+    "transmission": (("transmission",), lambda row: str(_TRANSMISSIONS.get(row["transmission"], row["transmission"]))),
+    "fuel": (("fuel",), lambda row: str(_FUELS.get(row["fuel"], row["fuel"]))),
+    "overview": _text("overview"),
+    "history": _text("history"),
+    "seller_name": _text("seller_name"),
+    "seller_meta": _text("seller_meta"),
+    "cover": (("cover",), lambda row: _url(row["cover"])),
+    "is_new": _plain("is_new"),
+    "is_certified": _plain("is_certified"),
+    "is_hot": _plain("is_hot"),
+    "is_featured": _plain("is_featured"),
+    "rating_avg": _plain("rating_avg"),
+    "rating_count": _plain("rating_count"),
+    "url": ((), lambda row: reverse("car_detail", args=[row["id"]])),
+    "images": ((), None),
+}
+
+
+def parse_ids(value) -> list:
+    """"3,1,3,x" -> [3, 1]; ValueError past MAX_IDS."""
+    ids = []
+    for part in str(value or "").split(","):
+        part = part.strip()
+        if part.isdigit() and int(part) not in ids:
+            ids.append(int(part))
+    if len(ids) > MAX_IDS:
+        raise ValueError(f"at most {MAX_IDS} ids per request")
+    return ids
+
+
+def parse_fields(value) -> list:
+    """"title,price" -> ["title", "price"]; ValueError naming unknown fields."""
+    fields = [f.strip() for f in str(value or "").split(",") if f.strip()] or list(DEFAULT_FIELDS)
+    unknown = [f for f in fields if f not in FIELDS and f != "id"]
+    if unknown:
+        raise ValueError("unknown field(s): " + ", ".join(unknown))
+    return [f for f in dict.fromkeys(fields) if f != "id"]
+
+
+def _images(ids) -> dict:
+    out = defaultdict(list)
+    for car_id, name in CarImage.objects.filter(car_id__in=ids).order_by("car_id", "pk").values_list("car_id", "image"):
+        out[car_id].append(_url(name))
+    return out
+
+
+def cars(ids, fields) -> dict:
+    """{"cars": [...in ids order...], "missing": [...]}; every car carries "id"."""
+    columns = {"id"}
+    for field in fields:
+        columns.update(FIELDS[field][0])
+    rows = {row["id"]: row for row in Car.objects.filter(pk__in=ids).order_by().values(*columns)}
+    images = _images(list(rows)) if "images" in fields and rows else {}
+
+    out = []
+    for car_id in ids:
+        row = rows.get(car_id)
+        if row is None:
+            continue
+        item = {"id": car_id}
+        for field in fields:
+            item[field] = images.get(car_id, []) if field == "images" else FIELDS[field][1](row)
+        out.append(item)
+    return {"cars": out, "missing": [car_id for car_id in ids if car_id not in rows]}
+
+
+def dumps(payload) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode()
@@ -0,0 +1,97 @@
+# models/conditional.py
+"""
+Validators for conditional GET (django.views.decorators.http.condition).
+
+Each function answers "has this resource changed?" from a one-row or
+one-aggregate query (or a cache read), so a client holding a current copy
+gets a 304 before the view runs its real queries.
+
+  car_detail      Car.updated + CarRatingSummary.updated_at +
+                  CarSimilarity.computed_at + the car's fragment version
+                  (models/detail_cache.py, which also moves on image and
+                  vote writes). Only for requests without a session or
+                  login: everyone else sees per-visitor parts (cart,
+                  wishlist, nav counts, CSRF) the validators can't see.
+  reviews_json    the same, plus the viewer and the query string.
+  car_row         Car.updated alone: car_geo and car_finance_json, which
+                  read only columns of the car row.
+  dealers_*       latest Dealer.updated_at + the dealer count (deletes).
+
+Writes that go through queryset .update() must set Car.updated themselves
+(models/sellers.py does) or they will not invalidate these validators.
+"""
+import hashlib
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from . import detail_cache
+from .models import Car
+
+
+def _digest(*parts) -> str:
+    return hashlib.md5("|".join(str(p) for p in parts).encode()).hexdigest()
+
+
+def _car_stamps(request, pk):
+    """(Car.updated, summary updated_at, similar-cars computed_at), read once per request."""
+    memo = request.__dict__.setdefault("_car_stamps", {})
+    if pk not in memo:
+        memo[pk] = Car.objects.filter(pk=pk).values_list(
+            "updated", "rating_summary__updated_at", "similarity__computed_at").first()
+    return memo[pk]
+
+
+def _personal(request) -> bool:
+    return settings.SESSION_COOKIE_NAME in request.COOKIES or request.user.is_authenticated
+
+
+# ---------- cars ----------
+def car_last_modified(request, pk):
+    stamps = _car_stamps(request, pk)
+    if stamps is None:
+        return None
+    return max(stamp for stamp in stamps if stamp is not None)
+
+
+def car_etag(request, pk):
+    stamps = _car_stamps(request, pk)
+    if stamps is None:
+        return None
+    return _digest(*stamps, detail_cache.vary(pk, request))
+
+
+def car_detail_etag(request, pk):
+    return None if _personal(request) else car_etag(request, pk)
+
+
+def car_detail_last_modified(request, pk):
+    return None if _personal(request) else car_last_modified(request, pk)
+
+
+def reviews_etag(request, pk):
+    base = car_etag(request, pk)
+    if base is None:
+        return None
+    return _digest(base, request.user.pk, request.GET.urlencode())
+
+
+def car_row_last_modified(request, pk):
+    return Car.objects.filter(pk=pk).values_list("updated", flat=True).first()
+
+
+# ---------- dealers ----------
+def _dealer_stamp(request):
+    if not hasattr(request, "_dealer_stamp"):
+        from marketplace.models import Dealer
+        request._dealer_stamp = Dealer.objects.aggregate(latest=Max("updated_at"), n=Count("id"))
+    return request._dealer_stamp
+
+
+def dealers_etag(request, *args, **kwargs):
+    stamp = _dealer_stamp(request)
+    return _digest(stamp["latest"], stamp["n"]) if stamp["latest"] else None
+
+
+def dealers_last_modified(request, *args, **kwargs):
+    return _dealer_stamp(request)["latest"]
@@ -0,0 +1,52 @@
+# models/detail_cache.py
+"""
+Fragment-cache keys for car_detail.
+
+templates/car_detail.html wraps the parts every viewer sees the same way
+(gallery + overview/specs/history, the rating summary, and the first page
+of reviews for anonymous visitors) in {% cache %} blocks varied on
+`detail_vary`: the car's version, the site-wide epoch, the language and
+the display currency. The view hands those blocks their data lazily, so a
+hit skips the images / summary / review queries entirely. The per-viewer
+holes (CSRF forms, cart state, finance inputs from the query string, the
+signed-in user's votes) are rendered outside the blocks on every request.
+
+models/signals.py bumps a car's version on Car, CarImage, CarReview and
+ReviewFeedback writes, and the epoch on Make / BodyType writes (their
+names are printed in every car's specs). Old fragments are never deleted,
+they simply stop being looked up and expire after TTL.
+
+The counters are models/versions.py ones, seeded from the clock, so an
+ETag built on them (models/conditional.py) survives a cache flush.
+"""
+from django.utils import translation
+
+from . import versions
+
+TTL = 60 * 60 * 6
+EPOCH_KEY = "car_detail:epoch"
+
+
+def _version_key(car_id) -> str:
+    return f"car_detail:{car_id}:version"
+
+
+def version(car_id) -> str:
+    """The car's fragment version as "<epoch>.<car version>"."""
+    keys = [EPOCH_KEY, _version_key(car_id)]
+    found = versions.get_many(keys)
+    return f"{found[EPOCH_KEY]}.{found[keys[1]]}"
+
+
+def vary(car_id, request) -> str:
+    """The {% cache %} vary_on value for one car as seen by this request."""
+    currency = request.session.get("currency", "USD")
+    return f"{version(car_id)}:{translation.get_language()}:{currency}"
+
+
+def bump(*car_ids) -> None:
+    versions.bump(*{_version_key(c) for c in car_ids if c is not None})
+
+
+def bump_all() -> None:
+    versions.bump(EPOCH_KEY)
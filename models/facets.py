@@ -0,0 +1,114 @@
+# models/facets.py
+"""
+Sidebar facet counts for the home page.
+
+All counts for one filter set come from a single GROUP BY over
+(make, body type, fuel, transmission, price bucket, in-price-range); each
+facet is then summed in Python over the rows that match every *other*
+selection, so a facet never narrows itself ("Toyota (12) / BMW (30)" stays
+visible while Toyota is selected).
+
+Results are cached under CarFilter.hash (models/filters.py) and the
+inventory version (models/result_cache.py), so any inventory write drops them.
+"""
+from dataclasses import replace
+
+from django.core.cache import cache
+from django.db.models import Case, Count, IntegerField, Q, Value, When
+
+from . import result_cache
+from .filters import CarFilter
+
+CACHE_TTL = 60 * 60
+
+# (key, min, max) — min inclusive, max exclusive, None = open
+PRICE_BUCKETS = [
+    ("0-10k", None, 10000),
+    ("10k-20k", 10000, 20000),
+    ("20k-35k", 20000, 35000),
+    ("35k-50k", 35000, 50000),
+    ("50k+", 50000, None),
+]
+
+
+def _base_queryset(f: CarFilter):
+    """Filters that are not facets apply to every count."""
+    return replace(
+        f, make=(), body_types=(), fuel="", transmission="", price_min=None, price_max=None
+    ).queryset()
+
+
+def _bucket_case():
+    whens = []
+    for key, lo, hi in PRICE_BUCKETS:
+        cond = Q()
+        if lo is not None:
+            cond &= Q(price__gte=lo)
+        if hi is not None:
+            cond &= Q(price__lt=hi)
+        whens.append(When(cond & Q(price__isnull=False), then=Value(key)))
+    return Case(*whens, default=Value(""))
+
+
+def _in_price_case(f: CarFilter):
+    cond = Q()
+    if f.price_min is not None:
+        cond &= Q(price__gte=f.price_min)
+    if f.price_max is not None:
+        cond &= Q(price__lte=f.price_max)
+    if not cond:
+        return Value(1)
+    return Case(When(cond, then=Value(1)), default=Value(0), output_field=IntegerField())
+
+
+def compute(f: CarFilter) -> dict:
+    rows = list(
+        _base_queryset(f)
+        .annotate(price_bucket=_bucket_case(), in_price=_in_price_case(f))
+        .values("make__slug", "body_type__slug", "fuel", "transmission", "price_bucket", "in_price")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+
+    bodies = set(f.body_types)
+    tests = {
+        "make": lambda r: not f.make or r["make__slug"] in f.make,
+        "body_type": lambda r: not bodies or r["body_type__slug"] in bodies,
+        "fuel": lambda r: not f.fuel or r["fuel"] == f.fuel,
+        "transmission": lambda r: not f.transmission or r["transmission"] == f.transmission,
+        "price": lambda r: r["in_price"] == 1,
+    }
+    columns = {
+        "make": "make__slug",
+        "body_type": "body_type__slug",
+        "fuel": "fuel",
+        "transmission": "transmission",
+        "price": "price_bucket",
+    }
+
+    out = {name: {} for name in columns}
+    total = 0
+    for r in rows:
+        passed = {name: test(r) for name, test in tests.items()}
+        if all(passed.values()):
+            total += r["n"]
+        for name, col in columns.items():
+            # a facet ignores its own selection
+            if r[col] and all(ok for other, ok in passed.items() if other != name):
+                out[name][r[col]] = out[name].get(r[col], 0) + r["n"]
+
+    out["price"] = [
+        {"key": key, "min": lo, "max": hi, "count": out["price"].get(key, 0)}
+        for key, lo, hi in PRICE_BUCKETS
+    ]
+    out["total"] = total
+    return out
+
+
+def get_counts(f: CarFilter) -> dict:
+    key = f"facets:{result_cache.inventory_version()}:{f.hash}"
+    data = cache.get(key)
+    if data is None:
+        data = compute(f)
+        cache.set(key, data, CACHE_TTL)
+    return data
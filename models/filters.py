@@ -0,0 +1,284 @@
+# models/filters.py
+"""
+One car-filter spec for every search entry point.
+
+The home page, /marketplace/browse/ and saved searches all accept slightly
+different parameter names (``trans`` / ``transmission``, ``max_price`` /
+``price_max``, make by slug or by name, ...). CarFilter parses any of them
+into one canonical, typed, hashable value and compiles it to a queryset, so
+the same search from two pages shares one ``hash`` — the key used for facet
+caching, result caching and saved-search de-duplication.
+"""
+import hashlib
+import json
+from dataclasses import dataclass, fields
+from decimal import Decimal, InvalidOperation
+
+from django.utils.text import slugify
+
+from . import geo, search
+from .models import BodyType, Car, Make
+
+TRUTHY = {"1", "true", "yes", "on"}
+
+FUELS = {code.lower(): code for code, _ in Car.FUEL_CHOICES}
+TRANSMISSIONS = {code.lower(): code for code, _ in Car.TRANSMISSION_CHOICES}
+TRANSMISSIONS["auto"] = "Automatic"
+
+# canonical name -> accepted spellings, first match wins
+ALIASES = {
+    "q": ("q",),
+    "make": ("make",),
+    "model": ("model", "model_name"),
+    "body_types": ("body_types", "body_type"),
+    "fuel": ("fuel",),
+    "transmission": ("transmission", "trans"),
+    "price_min": ("price_min", "min_price"),
+    "price_max": ("price_max", "max_price"),
+    "mileage_max": ("mileage_max",),
+    "rating_min": ("rating_min", "min_rating"),
+    "location": ("location",),
+    "is_featured": ("is_featured", "featured"),
+    "is_new": ("is_new",),
+    "is_certified": ("is_certified",),
+    "is_hot": ("is_hot",),
+    "near": ("near",),
+    "radius_km": ("radius_km", "radius"),
+}
+
+
+def _first(getlist, names) -> str:
+    for name in names:
+        for v in getlist(name):
+            if v is not None and str(v).strip() != "":
+                return str(v).strip()
+    return ""
+
+
+def _decimal(val):
+    try:
+        d = Decimal(val.replace(",", "").replace("$", ""))
+        return d.quantize(Decimal("0.01")) if d.is_finite() and d >= 0 else None
+    except (InvalidOperation, AttributeError):
+        return None
+
+
+def _int(val):
+    try:
+        n = int(Decimal(val.replace(",", "")))
+    except (InvalidOperation, AttributeError, ValueError, OverflowError):
+        return None
+    return n if n >= 0 else None
+
+
+def _rating(val):
+    try:
+        r = float(val)
+    except (TypeError, ValueError):
+        return None
+    return r if 0 < r <= 5 else None
+
+
+def _make_slugs(values) -> tuple:
+    """Make slugs for slugs or names; a partial name keeps every make it is part of."""
+    wanted = {v.strip() for v in values if v and v.strip()}
+    if not wanted:
+        return ()
+    makes = list(Make.objects.values_list("slug", "name"))
+    out = set()
+    for v in wanted:
+        slug, name = slugify(v), v.lower()
+        hits = ([s for s, n in makes if s == slug or n.lower() == name]
+                or [s for s, n in makes if name in n.lower()])
+        # unknown values keep their slug so a stale link still filters (to nothing)
+        out.update(hits or [slug])
+    return tuple(sorted(out))
+
+
+def _slugs(values) -> tuple:
+    return tuple(sorted({slugify(v) for v in values if v and v.strip()}))
+
+
+def _body_slugs(values) -> tuple:
+    wanted = {v.strip() for v in values if v and v.strip()}
+    if not wanted:
+        return ()
+    by_name = {name.lower(): slug for slug, name in BodyType.objects.values_list("slug", "name")}
+    # unknown values keep their slug so a stale link still filters (to nothing)
+    return tuple(sorted({by_name.get(v.lower(), slugify(v)) for v in wanted}))
+
+
+@dataclass(frozen=True)
+class CarFilter:
+    q: str = ""
+    make: tuple[str, ...] = ()     # sorted Make slugs
+    model: str = ""                # lower-cased, substring match on model_name
+    body_types: tuple[str, ...] = ()  # sorted BodyType slugs
+    fuel: str = ""                 # Car.FUEL_CHOICES code
+    transmission: str = ""         # Car.TRANSMISSION_CHOICES code
+    price_min: Decimal | None = None
+    price_max: Decimal | None = None
+    mileage_max: int | None = None
+    rating_min: float | None = None  # Car.rating_avg, 0.5 .. 5
+    location: str = ""             # lower-cased, substring match on seller_meta
+    is_featured: bool = False
+    is_new: bool = False
+    is_certified: bool = False
+    is_hot: bool = False
+    near: tuple[float, float] | None = None   # (lat, lng) of the buyer
+    radius_km: float | None = None            # set whenever `near` is
+
+    # ---------- parsing ----------
+    @classmethod
+    def _parse(cls, getlist, *, resolve=True) -> "CarFilter":
+        get = lambda name: _first(getlist, ALIASES[name])  # noqa: E731
+        every = lambda name: [str(v) for a in ALIASES[name] for v in getlist(a) if v is not None]  # noqa: E731
+        makes, bodies = every("make"), every("body_types")
+        near = geo.parse_near(get("near"))
+        return cls(
+            q=" ".join(search.tokenize(get("q"))),
+            make=_make_slugs(makes) if resolve else _slugs(makes),
+            model=get("model").lower(),
+            body_types=_body_slugs(bodies) if resolve else _slugs(bodies),
+            fuel=FUELS.get(get("fuel").lower(), ""),
+            transmission=TRANSMISSIONS.get(get("transmission").lower(), ""),
+            price_min=_decimal(get("price_min")),
+            price_max=_decimal(get("price_max")),
+            mileage_max=_int(get("mileage_max")),
+            rating_min=_rating(get("rating_min")),
+            location=get("location").lower(),
+            is_featured=get("is_featured").lower() in TRUTHY,
+            is_new=get("is_new").lower() in TRUTHY,
+            is_certified=get("is_certified").lower() in TRUTHY,
+            is_hot=get("is_hot").lower() in TRUTHY,
+            near=near,
+            radius_km=(geo.parse_radius(get("radius_km")) or geo.DEFAULT_RADIUS_KM) if near else None,
+        )
+
+    @classmethod
+    def from_querydict(cls, qd) -> "CarFilter":
+        """From request.GET / request.POST."""
+        return cls._parse(qd.getlist)
+
+    @classmethod
+    def from_params(cls, params: dict, *, resolve=True) -> "CarFilter":
+        """
+        From a plain dict (saved-search params, JSON bodies); values may be lists.
+        resolve=False takes make and body type values as slugs without a query,
+        for params that to_params() produced.
+        """
+        params = params or {}
+
+        def getlist(name):
+            v = params.get(name)
+            if v is None:
+                return []
+            if isinstance(v, (list, tuple)):
+                return list(v)
+            if isinstance(v, bool):
+                return ["1" if v else ""]
+            return [v]
+
+        return cls._parse(getlist, resolve=resolve)
+
+    # ---------- canonical form ----------
+    def to_params(self) -> dict:
+        """JSON-safe dict of the non-default fields (canonical key names)."""
+        out = {}
+        for f in fields(self):
+            v = getattr(self, f.name)
+            if v is None or v is False or v == "" or v == ():
+                continue
+            if isinstance(v, Decimal):
+                v = str(v)
+            elif f.name == "near":
+                v = f"{v[0]},{v[1]}"
+            elif isinstance(v, tuple):
+                v = list(v)
+            out[f.name] = v
+        return out
+
+    @property
+    def hash(self) -> str:
+        return hashlib.sha1(
+            json.dumps(self.to_params(), sort_keys=True, separators=(",", ":")).encode("utf-8")
+        ).hexdigest()
+
+    def __bool__(self):
+        return bool(self.to_params())
+
+    # ---------- compiling ----------
+    def apply(self, qs, *, rank: bool = False):
+        """Narrow a Car queryset; `rank` orders a text search by relevance."""
+        if self.q:
+            qs = search.apply(qs, self.q, rank=rank)
+        if self.make:
+            qs = qs.filter(make__slug__in=self.make)
+        if self.model:
+            qs = qs.filter(model_name__icontains=self.model)
+        if self.body_types:
+            qs = qs.filter(body_type__slug__in=self.body_types)
+        if self.fuel:
+            qs = qs.filter(fuel=self.fuel)
+        if self.transmission:
+            qs = qs.filter(transmission=self.transmission)
+        if self.price_min is not None:
+            qs = qs.filter(price__gte=self.price_min)
+        if self.price_max is not None:
+            qs = qs.filter(price__lte=self.price_max)
+        if self.mileage_max is not None:
+            qs = qs.filter(mileage__lte=self.mileage_max)
+        if self.rating_min is not None:
+            qs = qs.filter(rating_avg__gte=self.rating_min)
+        if self.location:
+            qs = qs.filter(seller_meta__icontains=self.location)
+        for flag in ("is_featured", "is_new", "is_certified", "is_hot"):
+            if getattr(self, flag):
+                qs = qs.filter(**{flag: True})
+        if self.near:
+            qs = geo.within(qs, *self.near, self.radius_km)
+        return qs
+
+    def matches(self, car) -> bool:
+        """apply() for one in-memory car (saved-search alerts), without a query per filter."""
+        if self.q and not search.matches(car, self.q):
+            return False
+        if self.make and (car.make.slug if car.make_id else "") not in self.make:
+            return False
+        if self.model and self.model not in (car.model_name or "").lower():
+            return False
+        if self.body_types and (car.body_type.slug if car.body_type_id else "") not in self.body_types:
+            return False
+        if self.fuel and car.fuel != self.fuel:
+            return False
+        if self.transmission and car.transmission != self.transmission:
+            return False
+        if self.price_min is not None and (car.price is None or car.price < self.price_min):
+            return False
+        if self.price_max is not None and (car.price is None or car.price > self.price_max):
+            return False
+        if self.mileage_max is not None and (car.mileage is None or car.mileage > self.mileage_max):
+            return False
+        if self.rating_min is not None and (car.rating_avg or 0) < self.rating_min:
+            return False
+        if self.location and self.location not in (car.seller_meta or "").lower():
+            return False
+        for flag in ("is_featured", "is_new", "is_certified", "is_hot"):
+            if getattr(self, flag) and not getattr(car, flag):
+                return False
+        if self.near:
+            if car.seller_lat is None or car.seller_lng is None:
+                return False
+            distance = geo.haversine_km(*self.near, float(car.seller_lat), float(car.seller_lng))
+            if distance > self.radius_km:
+                return False
+        return True
+
+    def annotate(self, qs):
+        """Add `distance_km` when searching near a point (display + "distance" sort)."""
+        if self.near:
+            qs = geo.annotate_distance(qs, *self.near)
+        return qs
+
+    def queryset(self, *, rank: bool = False):
+        return self.apply(Car.objects.all(), rank=rank)
@@ -0,0 +1,161 @@
+# models/finance.py
+"""
+Loan maths for the finance pages.
+
+monthly = (price - down) * factor(apr, term), with the amortisation factor
+
+    factor = r / (1 - (1 + r) ** -n)      r = apr / 1200, n = term months
+           = 1 / n                        when apr is 0
+
+computed once per (apr, term) and reused for every car. Because the
+monthly payment only grows with price, "monthly <= budget" is the same
+predicate as "price <= down + budget / factor" and "cheapest monthly
+first" is the same order as "cheapest price first": offers() filters and
+sorts on the indexed price column, and annotates `monthly` / `principal`
+as SQL expressions for display only. Nothing is computed per car in
+Python, so a page costs the same at any inventory size.
+
+matrix() is the same maths for one car over a grid of down payments,
+APRs and terms (the car_detail calculator, /api/cars/<pk>/finance/): one
+factor per (apr, term) pair, multiplied by one principal per down
+payment, so the browser can move the sliders without a round trip.
+"""
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+
+from django.db.models import DecimalField, ExpressionWrapper, F, Value
+from django.db.models.functions import Greatest
+
+DEFAULT_DOWN = Decimal("0")
+DEFAULT_APR = Decimal("0")
+DEFAULT_TERM = 60
+MAX_APR = Decimal("100")
+MIN_TERM, MAX_TERM = 1, 120
+
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+CENT = Decimal("0.01")
+
+# calculator grid (matrix)
+GRID_TERMS = range(12, 85)     # the car_detail slider, every month
+DOWN_STEP = Decimal("1000")
+APR_STEP = Decimal("0.5")
+GRID_SPAN = 2                  # steps either side of the requested down / apr
+MAX_CELLS = 5000
+
+
+def to_decimal(val, default=None):
+    try:
+        if val in ("", None):
+            return default
+        d = Decimal(str(val))
+    except (InvalidOperation, TypeError, ValueError):
+        return default
+    return d if d.is_finite() else default
+
+
+@lru_cache(maxsize=512)
+def factor(apr: Decimal, term: int) -> Decimal:
+    """Monthly payment per unit of principal."""
+    if term <= 0:
+        raise ValueError("term must be positive")
+    r = apr / Decimal("1200")
+    if r == 0:
+        return Decimal(1) / term
+    return r / (1 - (1 + r) ** -term)
+
+
+@dataclass(frozen=True)
+class Terms:
+    down: Decimal = DEFAULT_DOWN
+    apr: Decimal = DEFAULT_APR     # percent per year
+    term: int = DEFAULT_TERM       # months
+
+    @classmethod
+    def from_querydict(cls, qd, *, down=DEFAULT_DOWN, apr=DEFAULT_APR, term=DEFAULT_TERM) -> "Terms":
+        """?down=&apr=&term=, clamped to sane ranges; the keyword args are the defaults."""
+        months = to_decimal(qd.get("term"))
+        return cls(
+            down=max(Decimal(0), to_decimal(qd.get("down"), Decimal(down))),
+            apr=min(MAX_APR, max(Decimal(0), to_decimal(qd.get("apr"), Decimal(apr)))),
+            term=min(MAX_TERM, max(MIN_TERM, int(months) if months is not None else term)),
+        )
+
+    @property
+    def factor(self) -> Decimal:
+        return factor(self.apr, self.term)
+
+    def principal(self, price) -> Decimal:
+        return max(Decimal(0), to_decimal(price, Decimal(0)) - self.down)
+
+    def monthly(self, price) -> Decimal:
+        return (self.principal(price) * self.factor).quantize(CENT)
+
+    def max_price(self, monthly) -> Decimal:
+        """Highest price whose payment, to the cent, stays within `monthly`."""
+        return self.down + (Decimal(monthly) + CENT / 2) / self.factor
+
+    # ---------- SQL ----------
+    def principal_expr(self):
+        return ExpressionWrapper(Greatest(F("price") - Value(self.down), Value(Decimal(0))), output_field=MONEY)
+
+    def monthly_expr(self):
+        return ExpressionWrapper(self.principal_expr() * Value(self.factor.quantize(Decimal("1e-12"))),
+                                 output_field=MONEY)
+
+
+def offers(qs, terms: Terms, *, max_monthly=None):
+    """
+    Priced cars annotated with `principal` and `monthly`, within the budget.
+    Order by "price" (pagination.SORT_KEYS) for cheapest monthly first.
+    """
+    qs = qs.filter(price__isnull=False)
+    if max_monthly is not None:
+        qs = qs.filter(price__lte=terms.max_price(max_monthly))
+    return qs.annotate(principal=terms.principal_expr(), monthly=terms.monthly_expr())
+
+
+# ---------- grid ----------
+def _axis(raw, cast, lo, hi) -> list:
+    """'a,b,c' -> sorted unique values within [lo, hi]; ValueError on junk."""
+    values = set()
+    for part in filter(None, (p.strip() for p in raw.split(","))):
+        try:
+            value = cast(part)
+            in_range = lo <= value <= hi     # NaN raises InvalidOperation here
+        except (InvalidOperation, TypeError, ValueError):
+            raise ValueError(f"bad value {part!r}") from None
+        if not in_range:
+            raise ValueError(f"{part} is out of range")
+        values.add(value)
+    return sorted(values)
+
+
+def _around(center, step, lo, hi) -> list:
+    return sorted({min(hi, max(lo, center + k * step)) for k in range(-GRID_SPAN, GRID_SPAN + 1)})
+
+
+def grid_axes(qd, price, terms: Terms) -> tuple:
+    """
+    (downs, aprs, terms) for matrix(). ?downs=, ?aprs=, ?terms= take comma
+    lists; otherwise GRID_SPAN steps around the requested down / apr, and
+    every term of the slider. ValueError when a list is invalid or too big.
+    """
+    price = to_decimal(price, Decimal(0))
+    downs = (_axis(qd["downs"], Decimal, 0, max(price, Decimal(0))) if qd.get("downs")
+             else _around(min(terms.down, price), DOWN_STEP, Decimal(0), price))
+    aprs = (_axis(qd["aprs"], Decimal, 0, MAX_APR) if qd.get("aprs")
+            else _around(terms.apr, APR_STEP, Decimal(0), MAX_APR))
+    months = _axis(qd["terms"], int, MIN_TERM, MAX_TERM) if qd.get("terms") else list(GRID_TERMS)
+    if not (downs and aprs and months):
+        raise ValueError("empty grid")
+    if len(downs) * len(aprs) * len(months) > MAX_CELLS:
+        raise ValueError(f"grid larger than {MAX_CELLS} cells")
+    return downs, aprs, months
+
+
+def matrix(price, downs, aprs, terms) -> list:
+    """monthly[down][apr][term] for one price, to the cent."""
+    factors = [[factor(apr, term) for term in terms] for apr in aprs]
+    principals = [max(Decimal(0), to_decimal(price, Decimal(0)) - down) for down in downs]
+    return [[[(p * f).quantize(CENT) for f in row] for row in factors] for p in principals]
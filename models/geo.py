@@ -0,0 +1,142 @@
+# models/geo.py
+"""
+Distance search on Car.seller_lat / seller_lng.
+
+within() narrows a queryset in two steps: a lat/lng bounding box that the
+(seller_lat, seller_lng) index can range-scan, then an exact haversine
+test on the few rows left. annotate_distance() adds `distance_km` for
+display and for the "distance" sort (models/pagination.py).
+
+The geohash helpers are pure Python; Car.save() stores a precision-7 hash
+in seller_geohash so proximity can be bucketed with a plain prefix match.
+"""
+import math
+
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cast, Cos, Least, Power, Radians, Sin, Sqrt
+
+EARTH_KM = 6371.0088
+DEFAULT_RADIUS_KM = 50.0
+MAX_RADIUS_KM = 500.0
+GEOHASH_PRECISION = 7
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def parse_near(value):
+    """Parse "lat,lng" into (lat, lng) rounded to ~1 m, or None."""
+    try:
+        lat, lng = (float(x) for x in str(value).split(","))
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return round(lat, 5), round(lng, 5)
+
+
+def parse_radius(value):
+    try:
+        r = float(value)
+    except (TypeError, ValueError):
+        return None
+    if not math.isfinite(r) or r <= 0:
+        return None
+    return round(min(r, MAX_RADIUS_KM), 3)
+
+
+def bbox(lat, lng, radius_km):
+    """(min_lat, max_lat, min_lng, max_lng); lng bounds are None near the poles."""
+    dlat = math.degrees(radius_km / EARTH_KM)
+    min_lat, max_lat = lat - dlat, lat + dlat
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90), min(max_lat, 90), None, None
+    dlng = math.degrees(radius_km / EARTH_KM / math.cos(math.radians(lat)))
+    return min_lat, max_lat, lng - dlng, lng + dlng
+
+
+def _bbox_q(lat, lng, radius_km):
+    min_lat, max_lat, min_lng, max_lng = bbox(lat, lng, radius_km)
+    q = Q(seller_lat__gte=min_lat, seller_lat__lte=max_lat)
+    if min_lng is None or max_lng - min_lng >= 360:
+        return q
+    if min_lng < -180:      # box wraps the antimeridian
+        return q & (Q(seller_lng__gte=min_lng + 360) | Q(seller_lng__lte=max_lng))
+    if max_lng > 180:
+        return q & (Q(seller_lng__gte=min_lng) | Q(seller_lng__lte=max_lng - 360))
+    return q & Q(seller_lng__gte=min_lng, seller_lng__lte=max_lng)
+
+
+def distance_expr(lat, lng):
+    """Haversine distance in km from (lat, lng) to the seller, as a SQL expression."""
+    lat2 = Radians(Cast(F("seller_lat"), FloatField()))
+    lng2 = Radians(Cast(F("seller_lng"), FloatField()))
+    lat1 = Value(math.radians(lat), output_field=FloatField())
+    lng1 = Value(math.radians(lng), output_field=FloatField())
+    a = (
+        Power(Sin((lat2 - lat1) / 2), 2)
+        + Cos(lat1) * Cos(lat2) * Power(Sin((lng2 - lng1) / 2), 2)
+    )
+    return Value(2 * EARTH_KM, output_field=FloatField()) * ASin(
+        Least(Sqrt(a), Value(1.0, output_field=FloatField()))
+    )
+
+
+def within(qs, lat, lng, radius_km):
+    """Cars whose seller is within radius_km (bounding box first, then exact)."""
+    return qs.filter(_bbox_q(lat, lng, radius_km)).alias(
+        geo_distance=distance_expr(lat, lng)
+    ).filter(geo_distance__lte=radius_km)
+
+
+def annotate_distance(qs, lat, lng):
+    return qs.annotate(distance_km=distance_expr(lat, lng))
+
+
+def haversine_km(lat1, lng1, lat2, lng2) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+# ---------- geohash ----------
+def encode_geohash(lat, lng, precision=GEOHASH_PRECISION) -> str:
+    lat, lng = float(lat), float(lng)
+    lat_lo, lat_hi, lng_lo, lng_hi = -90.0, 90.0, -180.0, 180.0
+    out, bits, ch, even = [], 0, 0, True
+    while len(out) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                ch, lng_lo = ch << 1 | 1, mid
+            else:
+                ch, lng_hi = ch << 1, mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                ch, lat_lo = ch << 1 | 1, mid
+            else:
+                ch, lat_hi = ch << 1, mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            out.append(_BASE32[ch])
+            bits, ch = 0, 0
+    return "".join(out)
+
+
+def decode_geohash(gh: str):
+    """Geohash -> (lat, lng) of the cell centre."""
+    lat_lo, lat_hi, lng_lo, lng_hi = -90.0, 90.0, -180.0, 180.0
+    even = True
+    for c in gh:
+        d = _BASE32.index(c)
+        for shift in range(4, -1, -1):
+            bit = (d >> shift) & 1
+            if even:
+                mid = (lng_lo + lng_hi) / 2
+                lng_lo, lng_hi = (mid, lng_hi) if bit else (lng_lo, mid)
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                lat_lo, lat_hi = (mid, lat_hi) if bit else (lat_lo, mid)
+            even = not even
+    return (lat_lo + lat_hi) / 2, (lng_lo + lng_hi) / 2
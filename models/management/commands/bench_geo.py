@@ -0,0 +1,44 @@
+from models import bench, geo, pagination
+from models.filters import CarFilter
+from models.models import Car
+
+# (label, lat, lng): a dense metro, a sparse interior point, the edge of the seeded area
+POINTS = [("Denver", 39.7392, -104.9903), ("Kansas", 38.5, -98.0), ("Seattle", 47.6062, -122.3321)]
+RADII = [10, 50, 200]
+
+
+class Command(bench.BenchCommand):
+    help = "Compare a full-table haversine scan against bbox + haversine for 'cars near me'"
+    default_cars = 200_000
+    geo = True
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--page-size", type=int, default=12)
+
+    def bench(self, opts):
+        size = opts["page_size"]
+        base = Car.objects.select_related("make", "body_type")
+
+        for label, lat, lng in POINTS:
+            for radius in RADII:
+                def full_scan():
+                    qs = (
+                        geo.annotate_distance(base.filter(seller_lat__isnull=False), lat, lng)
+                        .filter(distance_km__lte=radius)
+                        .order_by("distance_km", "id")
+                    )
+                    return [c.pk for c in qs[:size]], qs.count()
+
+                def bbox_first():
+                    f = CarFilter(near=(lat, lng), radius_km=radius)
+                    page = pagination.paginate(f.apply(f.annotate(base)), "distance", per_page=size)
+                    return [c.pk for c in page.object_list], page.paginator.count
+
+                expected, found = full_scan(), bbox_first()
+                assert expected[0] == found[0], (label, radius)
+                old = bench.timeit(full_scan, opts["repeat"])
+                new = bench.timeit(bbox_first, opts["repeat"])
+                self.stdout.write(f"{label} r={radius}km ({expected[1]} cars)")
+                self.stdout.write(f"  full scan     {bench.fmt(old)}")
+                self.stdout.write(f"  bbox + exact  {bench.fmt(new)}")
@@ -0,0 +1,48 @@
+import json
+
+from django.core.cache import cache
+
+from models import bench, map_tiles
+from models.models import Car
+
+# (label, bbox west,south,east,north, zoom): continental US down to one metro
+VIEWS = [
+    ("US", (-125.0, 24.0, -66.0, 50.0), 4),
+    ("Colorado", (-109.0, 37.0, -102.0, 41.0), 7),
+    ("Denver", (-105.2, 39.6, -104.8, 39.9), 11),
+    ("Downtown", (-105.0, 39.73, -104.98, 39.75), 15),
+]
+
+
+class Command(bench.BenchCommand):
+    help = "Compare shipping every seller point against tiled clusters, cold and cached"
+    default_cars = 200_000
+    default_repeat = 3
+    geo = True
+
+    def bench(self, opts):
+        layer = map_tiles.LAYERS["cars"]
+
+        def everything():
+            return list(Car.objects.filter(seller_lat__isnull=False).values("id", "title", "seller_lat", "seller_lng"))
+
+        rows = everything()
+        size = len(json.dumps(rows, default=str))
+        self.stdout.write(f"all points ({len(rows)}): {bench.fmt(bench.timeit(everything, opts['repeat']))}   {size / 1024:,.0f} KiB")
+
+        for label, bbox, zoom in VIEWS:
+            def cold():
+                cache.clear()
+                return map_tiles.features_for_bbox(layer, bbox, zoom)
+
+            features = cold()
+            size = len(json.dumps(features))
+            clusters = sum(1 for f in features if f["properties"].get("cluster"))
+            self.stdout.write(
+                f"{label} z{zoom}: {len(map_tiles.tiles_for_bbox(*bbox, zoom))} tiles, "
+                f"{clusters} clusters + {len(features) - clusters} points, {size / 1024:,.1f} KiB"
+            )
+            self.stdout.write(f"  cold    {bench.fmt(bench.timeit(cold, opts['repeat']))}")
+            warm = bench.timeit(lambda: map_tiles.features_for_bbox(layer, bbox, zoom), opts["repeat"])
+            self.stdout.write(f"  cached  {bench.fmt(warm)}")
+        cache.clear()
@@ -0,0 +1,52 @@
+from django.core.management.base import CommandError
+from django.core.paginator import Paginator
+
+from models import bench, pagination
+from models.models import Car
+
+
+class Command(bench.BenchCommand):
+    help = "Compare OFFSET pagination against keyset cursors on page 1 and a deep page"
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--page", type=int, default=5000)
+        parser.add_argument("--page-size", type=int, default=12)
+
+    def preflight(self, opts):
+        deep, size = opts["page"], opts["page_size"]
+        if deep * size > opts["cars"]:
+            raise CommandError(f"--page {deep} needs at least {deep * size} cars.")
+
+    def bench(self, opts):
+        size, deep = opts["page_size"], opts["page"]
+        base = Car.objects.select_related("make", "body_type")
+
+        for sort, keys in pagination.SORT_KEYS.items():
+            if sort == "distance":
+                continue  # needs a near point; see bench_geo
+            ordered = base.order_by(*pagination.ordering_for(keys))
+
+            def offset_page(n):
+                page = Paginator(ordered, size).page(n)
+                return list(page.object_list), page.paginator.count
+
+            def keyset_page(**kw):
+                page = pagination.paginate(base, sort, per_page=size, **kw)
+                return list(page.object_list), page.paginator.count
+
+            # the cursor a visitor would hold after clicking through to page `deep - 1`
+            anchor = ordered[(deep - 1) * size - 1]
+            token = pagination.encode_cursor(anchor, keys, "n")
+            assert [c.pk for c in keyset_page(cursor=token)[0]] == [c.pk for c in offset_page(deep)[0]]
+
+            old_first = bench.timeit(lambda: offset_page(1), opts["repeat"])
+            old_deep = bench.timeit(lambda: offset_page(deep), opts["repeat"])
+            new_first = bench.timeit(lambda: keyset_page(page=1), opts["repeat"])
+            new_deep = bench.timeit(lambda: keyset_page(cursor=token), opts["repeat"])
+            self.stdout.write(f"sort={sort}")
+            for label, n, result in [
+                ("offset", 1, old_first), ("offset", deep, old_deep),
+                ("keyset", 1, new_first), ("keyset", deep, new_deep),
+            ]:
+                self.stdout.write(f"  {label} page {n:<6} {bench.fmt(result)}")
@@ -0,0 +1,35 @@
+from django.core.management.base import CommandError
+
+from models import bench, search
+from models.models import Car
+
+TERMS = ["toyota", "civic", "leather sunroof", "tesla model", "one owner", "rav"]
+
+
+class Command(bench.BenchCommand):
+    help = "Compare icontains search against the full-text index on synthetic inventory"
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--page-size", type=int, default=12)
+
+    def preflight(self, opts):
+        if search.backend() is None:
+            raise CommandError("No full-text backend for this database.")
+
+    def bench(self, opts):
+        size = opts["page_size"]
+        search.rebuild()
+        base = Car.objects.select_related("make", "body_type")
+
+        for term in TERMS:
+            old = bench.timeit(
+                lambda: (list(search.legacy_apply(base, term)[:size]), search.legacy_apply(base, term).count()),
+                opts["repeat"],
+            )
+            new = bench.timeit(
+                lambda: (list(search.apply(base, term)[:size]), search.apply(base, term, rank=False).count()),
+                opts["repeat"],
+            )
+            self.stdout.write(f"{term!r:20} icontains: {bench.fmt(old)}")
+            self.stdout.write(f"{'':20} index:     {bench.fmt(new)}   ({old['median'] / max(new['median'], 1e-6):.1f}x)")
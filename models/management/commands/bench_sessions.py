@@ -0,0 +1,72 @@
+import time
+
+from django.contrib.sessions.backends.base import SessionBase
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from models import bench
+from models.models import Car
+from payment.cart import _car_to_session_row
+
+ENGINES = ["django.contrib.sessions.backends.db", "automart.session_store"]
+
+
+class Command(bench.BenchCommand):
+    help = ("Session payload size (legacy vs compact ids) and django_session writes per engine; "
+            "--cars is also the wishlist/cart size, --repeat the toggle rounds per visitor")
+    default_cars = 20
+    default_repeat = 50
+
+    def _sizes(self, cars):
+        legacy = {
+            "wishlist_ids": [str(c.pk) for c in cars],
+            "compare_ids": [str(c.pk) for c in cars[:4]],
+            "cart": [_car_to_session_row(c) for c in cars],
+            "currency": "USD",
+            "theme": "auto",
+        }
+        compact = {
+            "wishlist_ids": [c.pk for c in cars],
+            "compare_ids": [c.pk for c in cars[:4]],
+            "cart": [c.pk for c in cars],
+        }
+        encoder = SessionBase()
+        return len(encoder.encode(legacy)), len(encoder.encode(compact))
+
+    def _visit(self, host, pks, toggles):
+        client = Client(HTTP_HOST=host)
+        requests = 0
+        for i in range(toggles):
+            pk = pks[i % len(pks)]
+            client.get(reverse("toggle_wishlist", args=[pk]))
+            client.get(reverse("toggle_compare", args=[pks[i % 4]]))
+            client.get(reverse("set_currency") + "?currency=USD")
+            requests += 3
+        return requests
+
+    def preflight(self, opts):
+        if opts["cars"] < 4:
+            raise CommandError("--cars must be at least 4 (the compare list).")
+
+    def bench(self, opts):
+        host = bench.client_host()
+        cars = list(Car.objects.select_related("make").order_by("-pk")[: opts["cars"]])
+        pks = [c.pk for c in cars]
+
+        legacy, compact = self._sizes(cars)
+        self.stdout.write(f"Session payload with {len(cars)} wishlist/cart items and 4 compared cars")
+        self.stdout.write(f"  legacy (string ids, cart rows)  {legacy:7d} bytes")
+        self.stdout.write(f"  compact (int ids)               {compact:7d} bytes")
+
+        for engine in ENGINES:
+            counter = bench.WriteCounter("django_session")
+            with override_settings(SESSION_ENGINE=engine), connection.execute_wrapper(counter):
+                t0 = time.perf_counter()
+                requests = self._visit(host, pks, opts["repeat"])
+                elapsed = time.perf_counter() - t0
+            self.stdout.write(
+                f"{engine}: {requests} requests in {elapsed:.2f} s, "
+                f"{counter.total} django_session writes {dict(counter.writes)}"
+            )
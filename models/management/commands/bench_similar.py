@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import CommandError
+
+from models import bench, similar
+from models.models import Car
+
+
+class Command(bench.BenchCommand):
+    help = "Time the similar-cars batch job (full and incremental) and the per-page read"
+    default_repeat = 50
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--new", type=int, default=500, help="Cars added before the incremental run")
+
+    def preflight(self, opts):
+        if similar.np is None:
+            raise CommandError("numpy is required for this benchmark")
+
+    def bench(self, opts):
+        t0 = time.perf_counter()
+        ids, X = similar.encode()
+        self.stdout.write(f"encode {len(ids)} x {X.shape[1]} features: {(time.perf_counter() - t0) * 1000:8.1f} ms")
+
+        t0 = time.perf_counter()
+        stats = similar.refresh(full=True)
+        self.stdout.write(f"full refresh ({stats['written']} rows): {time.perf_counter() - t0:8.2f} s")
+
+        bench.seed_cars(opts["new"], seed=7)
+        t0 = time.perf_counter()
+        stats = similar.refresh()
+        self.stdout.write(
+            f"incremental ({stats['stale']} new, {stats['displaced']} displaced): "
+            f"{time.perf_counter() - t0:8.2f} s"
+        )
+
+        sample = list(Car.objects.order_by("?").values_list("pk", flat=True)[: opts["repeat"]])
+        it = iter(sample * 2)
+        read = bench.timeit(lambda: similar.similar_cars(next(it)), len(sample))
+        self.stdout.write(f"car_detail read: {bench.fmt(read)}")
@@ -0,0 +1,51 @@
+import time
+from unittest import mock
+
+from models import bench, result_cache, suggest
+
+PREFIXES = ["t", "to", "toy", "toyota c", "co", "m", "model", "e", "bmw x", "zzz"]
+
+
+class Command(bench.BenchCommand):
+    help = "Time the typeahead trie build and per-keystroke lookups on synthetic inventory"
+    default_repeat = 3
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--lookups", type=int, default=20_000)
+
+    def bench(self, opts):
+        build = bench.timeit(suggest.build, opts["repeat"])
+        trie = suggest.rebuild()
+        self.stdout.write(f"build ({len(trie.entries)} entries): {bench.fmt(build)}")
+
+        for prefix in PREFIXES:
+            n = opts["lookups"]
+            t0 = time.perf_counter()
+            for _ in range(n):
+                suggest.suggest(prefix)
+            per_us = (time.perf_counter() - t0) / n * 1_000_000
+            top = ", ".join(r["label"] for r in suggest.suggest(prefix, limit=3))
+            self.stdout.write(f"{prefix!r:12} {per_us:7.2f} µs/lookup   {top}")
+
+        # another process bumped the inventory: lookups must keep answering from
+        # the old trie and only start a background refresh. The seeded cars are
+        # visible to this connection only, so the refresh a lookup would start is
+        # recorded instead, and run (and timed) in this thread afterwards.
+        started = []
+        result_cache.bump_inventory()
+        suggest.recheck()
+        n = opts["lookups"]
+        with mock.patch.object(suggest, "_start_refresh", lambda: started.append(1)):
+            t0 = time.perf_counter()
+            for _ in range(n):
+                suggest.suggest("toyota c")
+            per_us = (time.perf_counter() - t0) / n * 1_000_000
+        self.stdout.write(f"stale version: {per_us:7.2f} µs/lookup, {len(started)} refresh(es) started")
+
+        def foreign_write():
+            result_cache.bump_inventory()
+            suggest.refresh()
+
+        self.stdout.write(f"background refresh after a foreign write: "
+                          f"{bench.fmt(bench.timeit(foreign_write, opts['repeat']))}")
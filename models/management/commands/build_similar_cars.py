@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from models import similar
+
+
+class Command(BaseCommand):
+    help = "Refresh the precomputed similar-cars table (new/edited cars only unless --full)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Recompute every car (run nightly)")
+
+    def handle(self, *args, **options):
+        t0 = time.perf_counter()
+        try:
+            stats = similar.refresh(full=options["full"])
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - t0
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['written']} row(s) written for {stats['cars']} cars "
+            f"({stats['stale']} stale, {stats['displaced']} displaced) in {elapsed:.1f}s."
+        ))
@@ -0,0 +1,97 @@
+import re
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from models import pagination
+from models.filters import CarFilter
+from models.models import BodyType, Car, Make
+
+# (label, CarFilter kwargs, sort) — the shapes index(), browse_listings and
+# SavedSearch.queryset() actually produce; full-text and location searches
+# are left out on purpose (they scan their own index / need a scan).
+CATALOGUE = [
+    ("default listing", {}, "-created"),
+    ("price sort", {}, "price"),
+    ("price desc sort", {}, "-price"),
+    ("mileage sort", {}, "mileage"),
+    ("top rated", {}, "-rating"),
+    ("rated 4+", {"rating_min": 4.0}, "-rating"),
+    ("make", {"make": "<make>"}, "-created"),
+    ("make by price", {"make": "<make>"}, "price"),
+    ("body type", {"body_types": ("<body>",)}, "-created"),
+    ("fuel + transmission by price", {"fuel": "Petrol", "transmission": "Automatic"}, "price"),
+    ("fuel + transmission + price range", {
+        "fuel": "Petrol", "transmission": "Automatic", "price_min": Decimal("10000"), "price_max": Decimal("30000"),
+    }, "price"),
+    ("featured", {"is_featured": True}, "-created"),
+    ("hot", {"is_hot": True}, "-created"),
+    ("price range", {"price_min": Decimal("10000"), "price_max": Decimal("20000")}, "price"),
+    ("near me by distance", {"near": (39.7392, -104.9903), "radius_km": 50.0}, "distance"),
+]
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN representative car listing queries and fail if any falls back to a sequential scan"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--verbose-plans", action="store_true", help="Print every plan, not just failures")
+
+    def handle(self, *args, **opts):
+        vendor = connection.vendor
+        if vendor not in ("sqlite", "postgresql"):
+            raise CommandError(f"No plan checks for {vendor}.")
+        make = Make.objects.values_list("slug", flat=True).first() or "any"
+        body = BodyType.objects.values_list("slug", flat=True).first() or "any"
+        table = Car._meta.db_table
+
+        failures = []
+        for label, kwargs, sort in self._catalogue(make, body):
+            plan = self._explain(self._query(kwargs, sort))
+            if self._seq_scan(plan, table, vendor):
+                failures.append(label)
+                self.stdout.write(self.style.ERROR(f"SEQ SCAN  {label}"))
+                self.stdout.write(plan)
+            else:
+                self.stdout.write(self.style.SUCCESS(f"ok        {label}"))
+                if opts["verbose_plans"]:
+                    self.stdout.write(plan)
+
+        if failures:
+            raise CommandError(f"{len(failures)} quer{'y' if len(failures) == 1 else 'ies'} regressed to a sequential scan.")
+
+    def _catalogue(self, make, body):
+        fill = {"<make>": (make,), ("<body>",): (body,)}
+        for label, kwargs, sort in CATALOGUE:
+            yield label, {k: fill.get(v, v) for k, v in kwargs.items()}, sort
+        # saved-search "new matches since watermark"
+        yield "saved search new matches", {"make": (make,), "_created_after": timezone.now()}, "-created"
+
+    def _query(self, kwargs, sort):
+        created_after = kwargs.pop("_created_after", None)
+        f = CarFilter(**kwargs)
+        qs = f.apply(f.annotate(Car.objects.select_related("make", "body_type")))
+        if created_after:
+            qs = qs.filter(created__gt=created_after)
+        return qs.order_by(*pagination.ordering_for(pagination.SORT_KEYS[sort]))[:13]
+
+    def _explain(self, qs) -> str:
+        if connection.vendor != "postgresql":
+            return qs.explain()
+        # tiny dev tables make the planner prefer seq scans; ask whether an index *can* serve the query
+        with transaction.atomic():
+            with connection.cursor() as cur:
+                cur.execute("SET LOCAL enable_seqscan = off")
+            return qs.explain()
+
+    @staticmethod
+    def _seq_scan(plan: str, table: str, vendor: str) -> bool:
+        if vendor == "postgresql":
+            # with enable_seqscan off a seq scan is only chosen when nothing else works
+            return bool(re.search(rf"Seq Scan on {re.escape(table)}\b", plan))
+        for line in plan.splitlines():
+            if re.search(rf"\bSCAN {re.escape(table)}\b", line) and "USING" not in line:
+                return True
+        return False
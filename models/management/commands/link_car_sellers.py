@@ -0,0 +1,37 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from models import sellers
+from models.models import Car
+
+BATCH = 1000
+
+
+class Command(BaseCommand):
+    help = "Backfill / repair Car.seller_user from each car's seller_email"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Report stale links without fixing them")
+
+    def handle(self, *args, **options):
+        owners = sellers.user_map()
+        moves = defaultdict(list)   # target user pk (or None) -> car pks
+        rows = Car.objects.values_list("pk", "seller_email", "seller_user_id").order_by()
+        for pk, email, linked in rows.iterator(chunk_size=5000):
+            target = owners.get(sellers.normalize(email))
+            if target != linked:
+                moves[target].append(pk)
+
+        changed = sum(len(pks) for pks in moves.values())
+        if changed and not options["dry_run"]:
+            now = timezone.now()
+            with transaction.atomic():
+                for target, pks in moves.items():
+                    for i in range(0, len(pks), BATCH):
+                        Car.objects.filter(pk__in=pks[i:i + BATCH]).update(seller_user_id=target, updated=now)
+
+        verb = "Found" if options["dry_run"] else "Relinked"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {changed} car(s) with a stale seller link."))
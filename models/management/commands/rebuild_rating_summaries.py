@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from models import ratings, result_cache
+from models.models import CarRatingSummary, CarReview
+
+
+class Command(BaseCommand):
+    help = "Recompute CarRatingSummary (and Car.rating_avg / rating_count) from the reviews"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--car", type=int, action="append", help="Only this car id (repeatable)")
+
+    def handle(self, *args, **options):
+        if options["car"]:
+            car_ids = set(options["car"])
+        else:
+            # cars with reviews, plus cars whose summary may now be stale
+            car_ids = set(CarReview.objects.values_list("car_id", flat=True).distinct())
+            car_ids |= set(CarRatingSummary.objects.values_list("car_id", flat=True))
+        for car_id in sorted(car_ids):
+            ratings.rebuild(car_id, bump=False)
+        result_cache.bump_inventory()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(car_ids)} rating summaries."))
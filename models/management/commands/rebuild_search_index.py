@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from models import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the Car full-text search index (FTS5 on SQLite, tsvector on Postgres)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        kind = search.backend()
+        if kind is None:
+            self.stdout.write(self.style.WARNING("No full-text backend for this database; nothing to do."))
+            return
+        with transaction.atomic():
+            n = search.rebuild(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {n} cars ({kind})."))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from models.models import CarReview, ReviewFeedback
+
+
+def _tally(action):
+    rows = (ReviewFeedback.objects.filter(review_id=OuterRef("pk"), action=action)
+            .order_by().values("review_id").annotate(n=Count("id")).values("n"))
+    return Coalesce(Subquery(rows), 0)
+
+
+class Command(BaseCommand):
+    help = "Repair CarReview.helpful_count / report_count drift against the ReviewFeedback rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Report drifted reviews without fixing them")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drifted = list(
+                CarReview.objects.select_for_update()
+                .annotate(true_helpful=_tally(ReviewFeedback.ACTION_HELPFUL),
+                          true_report=_tally(ReviewFeedback.ACTION_REPORT))
+                .exclude(helpful_count=F("true_helpful"), report_count=F("true_report"))
+                .values_list("pk", "helpful_count", "true_helpful", "report_count", "true_report")
+            )
+            for pk, helpful, true_helpful, report, true_report in drifted:
+                self.stdout.write(f"review {pk}: helpful {helpful} -> {true_helpful}, report {report} -> {true_report}")
+            if drifted and not options["dry_run"]:
+                CarReview.objects.filter(pk__in=[row[0] for row in drifted]).update(
+                    helpful_count=_tally(ReviewFeedback.ACTION_HELPFUL),
+                    report_count=_tally(ReviewFeedback.ACTION_REPORT),
+                )
+
+        verb = "Found" if options["dry_run"] else "Repaired"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {len(drifted)} drifted review(s)."))
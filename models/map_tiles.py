@@ -0,0 +1,225 @@
+# models/map_tiles.py
+"""
+Zoom-aware map layers for the dealer map (and any other Leaflet view).
+
+The client sends its viewport (bbox + zoom); the server answers with the
+GeoJSON features of every slippy-map tile (z/x/y, the same grid the base
+map uses) that the viewport touches. Each tile is built once per layer
+version and cached, so panning and repeated visits cost cache reads, not
+queries, and a payload is bounded by tiles x cells instead of by the
+number of dealers or cars.
+
+Inside a tile the points are bucketed on a CELLS x CELLS grid in SQL:
+cells holding several points come back as one cluster feature (count +
+centroid), lone points come back as themselves. Sparse tiles (at most
+POINT_LIMIT points) and zooms >= POINTS_ZOOM skip clustering entirely.
+Cells are linear in latitude rather than Mercator-exact; at tile scale
+the difference is invisible.
+
+Layer versions: "cars" follows the inventory version (models/result_cache.py),
+"dealers" has its own, bumped by models/signals.py on Dealer writes.
+"""
+import math
+
+from django.core.cache import cache
+from django.db.models import Avg, Count, F, FloatField, Min
+from django.db.models.functions import Cast, Floor
+from django.urls import reverse
+
+from . import result_cache, versions
+from .models import Car
+
+CELLS = 8               # grid cells per tile edge (~32 px at 256 px tiles)
+POINT_LIMIT = 60
+POINTS_ZOOM = 15
+MAX_ZOOM = 18
+MAX_TILES = 64          # a big desktop viewport is ~30 tiles
+CACHE_TTL = 60 * 60 * 6
+MAX_LAT = 85.05112878   # Web Mercator limit
+
+DEALERS_VERSION_KEY = "map:dealers:version"
+
+
+# ---------- tile math ----------
+def _tile_lat(y, n):
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+
+
+def tile_bounds(z, x, y):
+    """(west, south, east, north) of tile z/x/y."""
+    n = 2 ** z
+    return x / n * 360 - 180, _tile_lat(y + 1, n), (x + 1) / n * 360 - 180, _tile_lat(y, n)
+
+
+def _tile_xy(lat, lng, n):
+    lat = max(-MAX_LAT, min(MAX_LAT, lat))
+    x = int((lng + 180) / 360 * n)
+    rad = math.radians(lat)
+    y = int((1 - math.log(math.tan(rad) + 1 / math.cos(rad)) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tiles_for_bbox(west, south, east, north, z, *, limit=None):
+    """(x, y) of every tile at zoom z under the bbox; ValueError past `limit` tiles."""
+    n = 2 ** z
+    x0, y0 = _tile_xy(north, west, n)
+    x1, y1 = _tile_xy(south, east, n)
+    count = (x1 - x0 + 1) * (y1 - y0 + 1)
+    if limit is not None and count > limit:
+        raise ValueError(f"{count} tiles at zoom {z}; zoom in")
+    return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+def parse_bbox(value):
+    """Leaflet's toBBoxString() "west,south,east,north" -> floats, or None."""
+    try:
+        west, south, east, north = (float(v) for v in str(value).split(","))
+    except (TypeError, ValueError):
+        return None
+    if not all(math.isfinite(v) for v in (west, south, east, north)):
+        return None
+    west, east = max(west, -180.0), min(east, 180.0)    # a wrapped world is clamped, not repeated
+    south, north = max(south, -90.0), min(north, 90.0)
+    if west >= east or south >= north:
+        return None
+    return west, south, east, north
+
+
+# ---------- layers ----------
+def _dealer_rows():
+    from marketplace.models import Dealer
+    return Dealer.objects.filter(is_active=True)
+
+
+def _dealer_feature(row):
+    return {
+        "name": row["name"],
+        "slug": row["slug"],
+        "address": row["address"] or "",
+        "phone": row["phone"] or "",
+        "website": row["website"] or "",
+        "url": f"/dealers/{row['slug']}/",
+    }
+
+
+def _car_feature(row):
+    return {
+        "name": row["title"],
+        "price": str(row["price"]) if row["price"] is not None else "",
+        "address": row["seller_address"] or row["seller_meta"] or "",
+        "url": reverse("car_detail", args=[row["id"]]),
+    }
+
+
+def dealers_version() -> int:
+    return versions.get(DEALERS_VERSION_KEY)
+
+
+def bump_dealers() -> None:
+    versions.bump(DEALERS_VERSION_KEY)
+
+
+class Layer:
+    def __init__(self, name, rows, lat, lng, fields, properties, version):
+        self.name = name
+        self.rows = rows                # () -> queryset
+        self.lat, self.lng = lat, lng
+        self.fields = fields            # values() needed by properties()
+        self.properties = properties    # values() row -> GeoJSON properties
+        self.version = version          # () -> int, changes on every write
+
+
+LAYERS = {
+    "dealers": Layer(
+        "dealers", _dealer_rows, "lat", "lng",
+        ("id", "name", "slug", "address", "phone", "website"), _dealer_feature, dealers_version,
+    ),
+    "cars": Layer(
+        "cars", Car.objects.all, "seller_lat", "seller_lng",
+        ("id", "title", "price", "seller_address", "seller_meta"), _car_feature, result_cache.inventory_version,
+    ),
+}
+
+
+# ---------- building ----------
+def _in_tile(layer, z, x, y):
+    west, south, east, north = tile_bounds(z, x, y)
+    last = 2 ** z - 1
+    # half-open so a point on a shared edge belongs to one tile only. Tiles on
+    # the edge of the map (y == 0 is the north row) are unbounded on that side:
+    # a stored 6-decimal MAX_LAT rounds past the top row's north edge, and
+    # points beyond the Mercator limit are drawn at the edge, not dropped.
+    bounds = {}
+    if y < last:
+        bounds[f"{layer.lat}__gte"] = south
+    if y > 0:
+        bounds[f"{layer.lat}__lt"] = north
+    if x > 0:
+        bounds[f"{layer.lng}__gte"] = west
+    if x < last:
+        bounds[f"{layer.lng}__lt"] = east
+    return layer.rows().filter(**bounds)
+
+
+def _points(layer, qs):
+    out = []
+    for row in qs.values(layer.lat, layer.lng, *layer.fields):
+        out.append({
+            "type": "Feature",
+            "id": row["id"],
+            "properties": layer.properties(row),
+            "geometry": {"type": "Point", "coordinates": [float(row[layer.lng]), float(row[layer.lat])]},
+        })
+    return out
+
+
+def build_tile(layer, z, x, y) -> list:
+    qs = _in_tile(layer, z, x, y)
+    if z >= POINTS_ZOOM:
+        return _points(layer, qs)
+
+    west, south, east, north = tile_bounds(z, x, y)
+    lat = Cast(F(layer.lat), FloatField())
+    lng = Cast(F(layer.lng), FloatField())
+    cells = list(
+        qs.annotate(
+            cx=Floor((lng - west) / ((east - west) / CELLS)),
+            cy=Floor((lat - south) / ((north - south) / CELLS)),
+        )
+        .values("cx", "cy")
+        .annotate(n=Count("pk"), first=Min("pk"), clat=Avg(lat), clng=Avg(lng))
+        .order_by()
+    )
+    if sum(c["n"] for c in cells) <= POINT_LIMIT:
+        return _points(layer, qs)
+
+    singles = [c["first"] for c in cells if c["n"] == 1]
+    features = _points(layer, layer.rows().filter(pk__in=singles)) if singles else []
+    for c in cells:
+        if c["n"] > 1:
+            features.append({
+                "type": "Feature",
+                "properties": {"cluster": True, "count": c["n"]},
+                "geometry": {"type": "Point", "coordinates": [round(c["clng"], 6), round(c["clat"], 6)]},
+            })
+    return features
+
+
+def _key(layer, version, z, x, y) -> str:
+    return f"map:{layer.name}:{version}:{z}/{x}/{y}"
+
+
+def features_for_bbox(layer, bbox, z) -> list:
+    """Features of every tile under bbox; raises ValueError past MAX_TILES."""
+    tiles = tiles_for_bbox(*bbox, z, limit=MAX_TILES)
+    version = layer.version()
+    keys = {_key(layer, version, z, x, y): (x, y) for x, y in tiles}
+    cached = cache.get_many(list(keys))
+    out = []
+    for key, (x, y) in keys.items():
+        features = cached.get(key)
+        if features is None:
+            features = build_tile(layer, z, x, y)
+            cache.set(key, features, CACHE_TTL)
+        out.extend(features)
+    return out
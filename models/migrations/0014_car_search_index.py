@@ -0,0 +1,88 @@
+import django.db.models.deletion
+from django.db import OperationalError, migrations, models
+
+
+def create_index(apps, schema_editor):
+    conn = schema_editor.connection
+    with conn.cursor() as cur:
+        if conn.vendor == "sqlite":
+            try:
+                cur.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS models_car_fts USING fts5("
+                    "title, make, model_name, overview, history, "
+                    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+                )
+            except OperationalError as exc:
+                if "fts5" not in str(exc):
+                    raise
+                # SQLite built without FTS5: no index, search falls back to
+                # the icontains scan (models.search.backend() returns None)
+                return
+            cur.execute(
+                "INSERT INTO models_car_fts (rowid, title, make, model_name, overview, history) "
+                "SELECT c.id, c.title, m.name, c.model_name, c.overview, c.history "
+                "FROM models_car c JOIN models_make m ON m.id = c.make_id"
+            )
+        elif conn.vendor == "postgresql":
+            cur.execute(
+                "CREATE TABLE IF NOT EXISTS models_car_search ("
+                "car_id bigint PRIMARY KEY REFERENCES models_car (id) "
+                "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+                "document tsvector NOT NULL)"
+            )
+            cur.execute(
+                "CREATE INDEX IF NOT EXISTS models_car_search_document_gin "
+                "ON models_car_search USING GIN (document)"
+            )
+            cur.execute(
+                "INSERT INTO models_car_search (car_id, document) "
+                "SELECT c.id, "
+                "setweight(to_tsvector('simple', c.title), 'A') || "
+                "setweight(to_tsvector('simple', m.name), 'A') || "
+                "setweight(to_tsvector('simple', c.model_name), 'B') || "
+                "setweight(to_tsvector('simple', c.overview), 'C') || "
+                "setweight(to_tsvector('simple', c.history), 'D') "
+                "FROM models_car c JOIN models_make m ON m.id = c.make_id"
+            )
+
+
+def drop_index(apps, schema_editor):
+    conn = schema_editor.connection
+    with conn.cursor() as cur:
+        if conn.vendor == "sqlite":
+            cur.execute("DROP TABLE IF EXISTS models_car_fts")
+        elif conn.vendor == "postgresql":
+            cur.execute("DROP TABLE IF EXISTS models_car_search")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("models", "0013_car_seller_address_car_seller_lat_car_seller_lng_and_more"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+        # unmanaged: lets querysets join the tables created above (models/search.py)
+        migrations.CreateModel(
+            name="CarSearchDocument",
+            fields=[
+                ("car", models.OneToOneField(
+                    db_column="car_id", db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING,
+                    primary_key=True, related_name="search_document", serialize=False, to="models.car",
+                )),
+                ("document", models.TextField()),
+            ],
+            options={"db_table": "models_car_search", "managed": False},
+        ),
+        migrations.CreateModel(
+            name="CarSearchFts",
+            fields=[
+                ("car", models.OneToOneField(
+                    db_column="rowid", db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING,
+                    primary_key=True, related_name="search_fts", serialize=False, to="models.car",
+                )),
+                ("document", models.TextField(db_column="models_car_fts")),
+            ],
+            options={"db_table": "models_car_fts", "managed": False},
+        ),
+    ]
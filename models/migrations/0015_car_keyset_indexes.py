@@ -0,0 +1,25 @@
+# Generated by Django 5.0.14 on 2026-10-17 06:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('models', '0014_car_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['created', 'id'], name='models_car_created_8678f0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['price', 'id'], name='models_car_price_32314e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['mileage', 'id'], name='models_car_mileage_82488e_idx'),
+        ),
+    ]
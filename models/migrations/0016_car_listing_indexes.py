@@ -0,0 +1,37 @@
+# Generated by Django 5.0.14 on 2026-10-17 06:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('models', '0015_car_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['make', 'created', 'id'], name='car_make_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['make', 'price', 'id'], name='car_make_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['body_type', 'created', 'id'], name='car_body_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['fuel', 'transmission', 'price', 'id'], name='car_fuel_trans_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(condition=models.Q(('is_featured', True)), fields=['created', 'id'], name='car_featured_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(condition=models.Q(('is_hot', True)), fields=['created', 'id'], name='car_hot_created_idx'),
+        ),
+    ]
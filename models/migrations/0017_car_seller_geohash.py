@@ -0,0 +1,62 @@
+# Generated by Django 5.0.14 on 2026-10-17 06:13
+
+from django.db import migrations, models
+
+# Frozen copy of models.geo.encode_geohash at precision 7, so later edits
+# to geo.py cannot change what this migration writes.
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def encode_geohash(lat, lng, precision=7):
+    lat, lng = float(lat), float(lng)
+    lat_lo, lat_hi, lng_lo, lng_hi = -90.0, 90.0, -180.0, 180.0
+    out, bits, ch, even = [], 0, 0, True
+    while len(out) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                ch, lng_lo = ch << 1 | 1, mid
+            else:
+                ch, lng_hi = ch << 1, mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                ch, lat_lo = ch << 1 | 1, mid
+            else:
+                ch, lat_hi = ch << 1, mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            out.append(_BASE32[ch])
+            bits, ch = 0, 0
+    return "".join(out)
+
+
+def backfill_geohash(apps, schema_editor):
+    Car = apps.get_model("models", "Car")
+    rows = Car.objects.filter(seller_lat__isnull=False, seller_lng__isnull=False).only("seller_lat", "seller_lng")
+    batch = []
+    for car in rows.iterator(chunk_size=2000):
+        car.seller_geohash = encode_geohash(car.seller_lat, car.seller_lng)
+        batch.append(car)
+        if len(batch) >= 2000:
+            Car.objects.bulk_update(batch, ["seller_geohash"])
+            batch = []
+    if batch:
+        Car.objects.bulk_update(batch, ["seller_geohash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('models', '0016_car_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='car',
+            name='seller_geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
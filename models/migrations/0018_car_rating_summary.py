@@ -0,0 +1,91 @@
+# Generated by Django 5.0.14 on 2026-10-17 06:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_summaries(apps, schema_editor):
+    Car = apps.get_model("models", "Car")
+    CarReview = apps.get_model("models", "CarReview")
+    CarRatingSummary = apps.get_model("models", "CarRatingSummary")
+    visible = CarReview.objects.filter(status=True)
+    rows = visible.values("car_id").annotate(
+        n=Count("id"), total=Sum("rating"),
+        star5=Count("id", filter=Q(rating__gte=4.75)),
+        star4=Count("id", filter=Q(rating__gte=3.75, rating__lt=4.75)),
+        star3=Count("id", filter=Q(rating__gte=2.75, rating__lt=3.75)),
+        star2=Count("id", filter=Q(rating__gte=1.75, rating__lt=2.75)),
+        star1=Count("id", filter=Q(rating__gte=0.5, rating__lt=1.75)),
+    ).order_by()
+    for row in rows:
+        car_id = row["car_id"]
+        mine = visible.filter(car_id=car_id)
+        CarRatingSummary.objects.create(
+            car_id=car_id, rating_count=row["n"], rating_sum=row["total"] or 0.0,
+            star1=row["star1"], star2=row["star2"], star3=row["star3"], star4=row["star4"], star5=row["star5"],
+            top_positive_id=mine.filter(rating__gte=3).order_by("-rating", "-created_at")
+                .values_list("pk", flat=True).first(),
+            top_critical_id=mine.filter(rating__lt=3).order_by("rating", "-created_at")
+                .values_list("pk", flat=True).first(),
+        )
+        Car.objects.filter(pk=car_id).update(rating_avg=round(row["total"] / row["n"], 1), rating_count=row["n"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('models', '0017_car_seller_geohash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CarRatingSummary',
+            fields=[
+                ('car', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rating_summary', serialize=False, to='models.car')),
+                ('rating_count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.FloatField(default=0)),
+                ('star1', models.PositiveIntegerField(default=0)),
+                ('star2', models.PositiveIntegerField(default=0)),
+                ('star3', models.PositiveIntegerField(default=0)),
+                ('star4', models.PositiveIntegerField(default=0)),
+                ('star5', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Car rating summary',
+                'verbose_name_plural': 'Car rating summaries',
+            },
+        ),
+        migrations.AddField(
+            model_name='car',
+            name='rating_avg',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='Rating'),
+        ),
+        migrations.AddField(
+            model_name='car',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Reviews'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['rating_avg', 'id'], name='models_car_rating__73cb04_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='carreview',
+            index=models.Index(fields=['car', 'status', 'rating', 'created_at'], name='models_carr_car_id_6966ae_idx'),
+        ),
+        migrations.AddField(
+            model_name='carratingsummary',
+            name='top_critical',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='models.carreview'),
+        ),
+        migrations.AddField(
+            model_name='carratingsummary',
+            name='top_positive',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='models.carreview'),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
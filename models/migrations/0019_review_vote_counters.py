@@ -0,0 +1,44 @@
+# Generated by Django 5.0.14 on 2026-10-17 06:23
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    CarReview = apps.get_model("models", "CarReview")
+    ReviewFeedback = apps.get_model("models", "ReviewFeedback")
+
+    def tally(action):
+        rows = (ReviewFeedback.objects.filter(review_id=OuterRef("pk"), action=action)
+                .order_by().values("review_id").annotate(n=Count("id")).values("n"))
+        return Coalesce(Subquery(rows), 0)
+
+    CarReview.objects.update(helpful_count=tally("helpful"), report_count=tally("report"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('models', '0018_car_rating_summary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carreview',
+            name='helpful_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='carreview',
+            name='report_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='carreview',
+            index=models.Index(fields=['car', 'status', 'helpful_count', 'created_at'], name='models_carr_car_id_f8f72b_idx'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.14 on 2026-10-17 07:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_updated(apps, schema_editor):
+    Car = apps.get_model("models", "Car")
+    Car.objects.update(updated=models.F("created"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('models', '0020_car_seller_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='car',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_updated, migrations.RunPython.noop),
+    ]
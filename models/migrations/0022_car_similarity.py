@@ -0,0 +1,27 @@
+# Generated by Django 5.0.14 on 2026-10-17 06:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('models', '0021_car_updated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CarSimilarity',
+            fields=[
+                ('car', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='similarity', serialize=False, to='models.car')),
+                ('neighbor_ids', models.JSONField(default=list)),
+                ('kth_distance', models.FloatField(default=0)),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Car similarity',
+                'verbose_name_plural': 'Car similarities',
+            },
+        ),
+    ]
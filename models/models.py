@@ -2,13 +2,14 @@
 from django.conf import settings
 from django.contrib import admin
 from django.db import models
-from django.db.models import Count, Avg, Q
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from .geo import encode_geohash
+
 class Make(models.Model):
     name = models.CharField(max_length=100, unique=True)
     slug = models.SlugField(max_length=120, unique=True, blank=True)
@@ -93,8 +94,21 @@ class Car(models.Model):
         validators=[MinValueValidator(-180), MaxValueValidator(180)],
         help_text=_("e.g. -74.005974"),
     )
+    # derived from seller_lat/lng in save(); prefix = proximity bucket (models/geo.py)
+    seller_geohash = models.CharField(max_length=12, blank=True, db_index=True, editable=False)
+    # account owning seller_email, resolved in save() (models/sellers.py)
+    seller_user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, editable=False,
+        on_delete=models.SET_NULL, related_name="cars_selling",
+    )
 
     created = models.DateTimeField(auto_now_add=True)
+    # Last-Modified / ETag source for the car's read endpoints (models/conditional.py)
+    updated = models.DateTimeField(auto_now=True)
+
+    # copied from CarRatingSummary by models/ratings.py so listings can sort/filter without a join
+    rating_avg = models.FloatField(_("Rating"), null=True, blank=True, editable=False)
+    rating_count = models.PositiveIntegerField(_("Reviews"), default=0, editable=False)
 
     class Meta:
         ordering = ["-created"]
@@ -102,11 +116,52 @@ class Car(models.Model):
         verbose_name_plural = _("Cars")
         indexes = [
             models.Index(fields=["seller_lat", "seller_lng"]),
+            # keyset pagination (models/pagination.py): sort key + id tie-breaker
+            models.Index(fields=["created", "id"]),
+            models.Index(fields=["price", "id"]),
+            models.Index(fields=["mileage", "id"]),
+            models.Index(fields=["rating_avg", "id"]),
+            # listing filters (models/filters.py) followed by their usual sort;
+            # keep `manage.py check_query_plans` green when changing these
+            models.Index(fields=["make", "created", "id"], name="car_make_created_idx"),
+            models.Index(fields=["make", "price", "id"], name="car_make_price_idx"),
+            models.Index(fields=["body_type", "created", "id"], name="car_body_created_idx"),
+            models.Index(fields=["fuel", "transmission", "price", "id"], name="car_fuel_trans_price_idx"),
+            models.Index(
+                fields=["created", "id"], condition=models.Q(is_featured=True), name="car_featured_created_idx"
+            ),
+            models.Index(fields=["created", "id"], condition=models.Q(is_hot=True), name="car_hot_created_idx"),
         ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        car = super().from_db(db, field_names, values)
+        # what seller_user was resolved from; None when the field was deferred
+        car._seller_email_loaded = car.__dict__.get("seller_email")
+        return car
+
+    def save(self, *args, **kwargs):
+        from . import sellers
+
+        self.seller_geohash = encode_geohash(self.seller_lat, self.seller_lng) if self.seller_has_geo else ""
+        update_fields = kwargs.get("update_fields")
+        if update_fields:   # an empty list still means "save nothing"
+            update_fields = {*update_fields, "updated"}
+            if {"seller_lat", "seller_lng"} & update_fields:
+                update_fields.add("seller_geohash")
+            kwargs["update_fields"] = update_fields
+        if update_fields is None or "seller_email" in update_fields:
+            loaded = getattr(self, "_seller_email_loaded", None)
+            if loaded is None or sellers.normalize(loaded) != sellers.normalize(self.seller_email):
+                self.seller_user_id = sellers.user_id_for_email(self.seller_email)
+                if update_fields is not None:
+                    kwargs["update_fields"] = {*update_fields, "seller_user"}
+        super().save(*args, **kwargs)
+        self._seller_email_loaded = self.seller_email
+
     def get_absolute_url(self):
         return reverse("car_detail", args=[self.pk])
 
@@ -196,11 +251,18 @@ class CarReview(models.Model):
     status     = models.BooleanField(default=True)  # approved/visible
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # ReviewFeedback tallies, kept by models/signals.py; `manage.py reconcile_review_counters` repairs drift
+    helpful_count = models.PositiveIntegerField(default=0, editable=False)
+    report_count  = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         indexes = [
             models.Index(fields=['car', 'status']),
             models.Index(fields=['car', 'created_at']),
+            # top positive / critical lookups in models/ratings.py
+            models.Index(fields=['car', 'status', 'rating', 'created_at']),
+            # "most helpful" review feed (models/review_feed.py)
+            models.Index(fields=['car', 'status', 'helpful_count', 'created_at']),
         ]
         ordering = ['-created_at']  # newest first
         verbose_name = 'Car review'
@@ -209,10 +271,22 @@ class CarReview(models.Model):
     def __str__(self):
         return self.subject or f"Review #{self.pk}"
 
+    COUNTER_FIELDS = ("helpful_count", "report_count")
+
+    def save(self, *args, **kwargs):
+        # the vote counters only move through F() updates; a stale instance must not write them back
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     @classmethod
-    def aggregate_for_car(cls, car_id: int):
+    def aggregate_for_car(cls, car_id: int, *, with_reviews: bool = True):
         """
-        Aggregate approved reviews for a car.
+        Aggregate approved reviews for a car, read from its CarRatingSummary.
+        With with_reviews=False the top_* entries are review ids (JSON-safe).
 
         Returns dict:
           {
@@ -223,42 +297,109 @@ class CarReview(models.Model):
             'top_critical': CarReview|None,  # worst among rating < 3
           }
         """
-        qs = (
-            cls.objects
-               .filter(car_id=car_id, status=True)
-               .select_related('user')
-        )
-
-        agg = qs.aggregate(
-            avg=Avg('rating'),
-            count=Count('id'),
-            # bucket distribution (half-up ranges)
-            star5=Count('id', filter=Q(rating__gte=4.75)),
-            star4=Count('id', filter=Q(rating__gte=3.75, rating__lt=4.75)),
-            star3=Count('id', filter=Q(rating__gte=2.75, rating__lt=3.75)),
-            star2=Count('id', filter=Q(rating__gte=1.75, rating__lt=2.75)),
-            star1=Count('id', filter=Q(rating__gte=0.50, rating__lt=1.75)),
-        )
-
-        # pick representative “top” reviews without assuming extra fields
-        top_positive = qs.filter(rating__gte=3).order_by('-rating', '-created_at').first()
-        top_critical = qs.filter(rating__lt=3).order_by('rating', '-created_at').first()
+        summary = CarRatingSummary.objects.filter(car_id=car_id).first()
+        if summary is None:
+            summary = CarRatingSummary(car_id=car_id)
+        return summary.as_dict(with_reviews=with_reviews)
+
+
+class CarRatingSummary(models.Model):
+    """
+    Materialized CarReview.aggregate_for_car() — one row per reviewed car.
+
+    Kept current by models/ratings.py on every CarReview save/delete;
+    `manage.py rebuild_rating_summaries` recomputes it from scratch.
+    """
+    car = models.OneToOneField(Car, on_delete=models.CASCADE, primary_key=True, related_name="rating_summary")
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.FloatField(default=0)  # sum of half-star ratings: exact in a float
+    star1 = models.PositiveIntegerField(default=0)
+    star2 = models.PositiveIntegerField(default=0)
+    star3 = models.PositiveIntegerField(default=0)
+    star4 = models.PositiveIntegerField(default=0)
+    star5 = models.PositiveIntegerField(default=0)
+    top_positive = models.ForeignKey(CarReview, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    top_critical = models.ForeignKey(CarReview, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        verbose_name = "Car rating summary"
+        verbose_name_plural = "Car rating summaries"
+
+    def __str__(self):
+        return f"{self.car_id}: {self.rating_avg} ({self.rating_count})"
+
+    @property
+    def rating_avg(self):
+        return round(self.rating_sum / self.rating_count, 1) if self.rating_count else 0.0
+
+    def as_dict(self, *, with_reviews: bool = True):
+        tops = {}
+        ids = [pk for pk in (self.top_positive_id, self.top_critical_id) if pk]
+        if with_reviews and ids:
+            tops = CarReview.objects.select_related("user").in_bulk(ids)
         return {
-            'rating_avg': round(agg['avg'] or 0.0, 1),
-            'rating_count': int(agg['count'] or 0),
-            'rating_dist': {
-                5: int(agg['star5'] or 0),
-                4: int(agg['star4'] or 0),
-                3: int(agg['star3'] or 0),
-                2: int(agg['star2'] or 0),
-                1: int(agg['star1'] or 0),
-            },
-            'top_positive': top_positive,
-            'top_critical': top_critical,
+            "rating_avg": self.rating_avg,
+            "rating_count": self.rating_count,
+            "rating_dist": {5: self.star5, 4: self.star4, 3: self.star3, 2: self.star2, 1: self.star1},
+            "top_positive": tops.get(self.top_positive_id) if with_reviews else self.top_positive_id,
+            "top_critical": tops.get(self.top_critical_id) if with_reviews else self.top_critical_id,
         }
 
 
+class CarSimilarity(models.Model):
+    """
+    Precomputed "similar cars" for one car, nearest first.
+
+    Written by models/similar.py (`manage.py build_similar_cars`); ids of
+    cars deleted since the last run are simply skipped when read.
+    """
+    car = models.OneToOneField(Car, on_delete=models.CASCADE, primary_key=True, related_name="similarity")
+    neighbor_ids = models.JSONField(default=list)
+    # distance to the last neighbour: a new car closer than this joins the list
+    kth_distance = models.FloatField(default=0)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Car similarity"
+        verbose_name_plural = "Car similarities"
+
+    def __str__(self):
+        return f"{self.car_id}: {self.neighbor_ids}"
+
+
+class CarSearchFts(models.Model):
+    """
+    Read-only view of the SQLite FTS5 index (models/search.py, migration 0014).
+
+    Unmanaged: the virtual table is created and written with raw SQL. The
+    model only lets querysets join it (`car.search_fts`); `document` is the
+    table's hidden column, the left side of MATCH and bm25()'s argument.
+    """
+    car = models.OneToOneField(
+        Car, on_delete=models.DO_NOTHING, primary_key=True, db_column="rowid",
+        db_constraint=False, related_name="search_fts",
+    )
+    document = models.TextField(db_column="models_car_fts")
+
+    class Meta:
+        managed = False
+        db_table = "models_car_fts"
+
+
+class CarSearchDocument(models.Model):
+    """Read-only view of the Postgres tsvector table (models/search.py, migration 0014)."""
+    car = models.OneToOneField(
+        Car, on_delete=models.DO_NOTHING, primary_key=True, db_column="car_id",
+        db_constraint=False, related_name="search_document",
+    )
+    document = models.TextField()   # tsvector
+
+    class Meta:
+        managed = False
+        db_table = "models_car_search"
+
+
 # class ReviewFeedback(models.Model):
 #     ACTION_HELPFUL = "helpful"
 #     ACTION_REPORT  = "report"
@@ -0,0 +1,311 @@
+# models/pagination.py
+"""
+Listing pagination that stays flat as inventory grows.
+
+The first MAX_PAGES pages keep the familiar ?page=N links, but the total is
+counted with a LIMIT (CappedPaginator) instead of a full COUNT(*). Past the
+last numbered page the listing switches to keyset ("cursor") pagination:
+?cursor=<token> seeks straight to the next rows using the sort key plus id
+as a tie-breaker, so page 5000 costs the same as page 1.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+MAX_PAGES = 10
+
+# sort param -> [(field, descending), ...]; the last key must be unique
+SORT_KEYS = {
+    "-created": [("created", True), ("id", True)],
+    "price": [("price", False), ("id", False)],
+    "-price": [("price", True), ("id", True)],
+    "mileage": [("mileage", False), ("id", False)],
+    "-rating": [("rating_avg", True), ("id", True)],
+    # only with CarFilter.near, which annotates distance_km (models/geo.py)
+    "distance": [("distance_km", False), ("id", False)],
+}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def ordering_for(keys) -> list[str]:
+    return [f"-{f}" if desc else f for f, desc in keys]
+
+
+def _encode_value(v):
+    if isinstance(v, (datetime, date)):
+        return v.isoformat()
+    if isinstance(v, Decimal):
+        return str(v)
+    return v
+
+
+def _value(obj, name):
+    for part in name.split("__"):
+        obj = getattr(obj, part, None) if obj is not None else None
+    return obj
+
+
+def encode_cursor(obj, keys, direction: str) -> str:
+    payload = {"v": [_encode_value(_value(obj, f)) for f, _ in keys], "d": direction}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, keys):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        values, direction = payload["v"], payload["d"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise InvalidCursor(token)
+    if direction not in ("n", "p") or not isinstance(values, list) or len(values) != len(keys):
+        raise InvalidCursor(token)
+    return values, direction
+
+
+def _nullable(model, name) -> bool:
+    try:
+        return model._meta.get_field(name).null
+    except FieldDoesNotExist:
+        return False
+
+
+def _nulls_after(desc: bool) -> bool:
+    # NULLs stay where the database puts them natively (so plain btree
+    # indexes still serve the ORDER BY); we only need to know which side.
+    return connection.features.nulls_order_largest != desc
+
+
+def _after(model, keys, values, *, null_tail: bool = True) -> Q:
+    """Rows strictly after `values` in the ordering given by `keys`."""
+    (field, desc), rest = keys[0], keys[1:]
+    v = values[0]
+
+    if not rest:
+        return Q(**{f"{field}__{'lt' if desc else 'gt'}": v})
+
+    tail = _after(model, rest, values[1:])
+    if v is None:
+        if _nulls_after(desc):
+            return Q(**{f"{field}__isnull": True}) & tail
+        return Q(**{f"{field}__isnull": False}) | (Q(**{f"{field}__isnull": True}) & tail)
+
+    # "price >= v AND (price > v OR (price = v AND ...))" keeps the range seekable
+    cond = Q(**{f"{field}__{'lte' if desc else 'gte'}": v}) & (
+        Q(**{f"{field}__{'lt' if desc else 'gt'}": v}) | (Q(**{field: v}) & tail)
+    )
+    if null_tail and _nulls_after(desc) and _nullable(model, field):
+        cond |= Q(**{f"{field}__isnull": True})
+    return cond
+
+
+class KeysetPage:
+    """Page-like object for cursor mode (same attribute names the templates use)."""
+
+    cursor_mode = True
+    number = None
+
+    def __init__(self, object_list, *, has_next, has_previous, next_cursor, prev_cursor, paginator=None):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.paginator = paginator
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    def __init__(self, queryset, keys, per_page=12):
+        self.queryset = queryset
+        self.keys = keys
+        self.per_page = per_page
+
+    def _fetch(self, keys, values, limit):
+        model = self.queryset.model
+        ordered = self.queryset.order_by(*ordering_for(keys))
+        field, desc = keys[0]
+        split = values[0] is not None and _nulls_after(desc) and _nullable(model, field)
+        rows = list(ordered.filter(_after(model, keys, values, null_tail=not split))[:limit])
+        if split and len(rows) < limit:
+            # "... OR price IS NULL" would turn the index seek into a scan;
+            # read the trailing NULL rows with a second query instead
+            rows += list(ordered.filter(**{f"{field}__isnull": True})[: limit - len(rows)])
+        return rows
+
+    def first(self, paginator=None) -> KeysetPage:
+        """The first page, with a cursor to the next one."""
+        n = self.per_page
+        rows = list(self.queryset.order_by(*ordering_for(self.keys))[: n + 1])
+        has_next, rows = len(rows) > n, rows[:n]
+        return KeysetPage(
+            rows,
+            has_next=has_next,
+            has_previous=False,
+            next_cursor=encode_cursor(rows[-1], self.keys, "n") if has_next else None,
+            prev_cursor=None,
+            paginator=paginator,
+        )
+
+    def page(self, token: str, paginator=None) -> KeysetPage:
+        values, direction = decode_cursor(token, self.keys)
+        n = self.per_page
+
+        if direction == "n":
+            rows = self._fetch(self.keys, values, n + 1)
+            has_next, rows = len(rows) > n, rows[:n]
+            has_previous = True
+        else:
+            rows = self._fetch([(f, not desc) for f, desc in self.keys], values, n + 1)
+            has_previous, rows = len(rows) > n, rows[:n]
+            rows.reverse()
+            has_next = True
+
+        has_next = has_next and bool(rows)
+        has_previous = has_previous and bool(rows)
+        return KeysetPage(
+            rows,
+            has_next=has_next,
+            has_previous=has_previous,
+            next_cursor=encode_cursor(rows[-1], self.keys, "n") if has_next else None,
+            prev_cursor=encode_cursor(rows[0], self.keys, "p") if has_previous else None,
+            paginator=paginator,
+        )
+
+
+class CappedPaginator(Paginator):
+    """Paginator that counts at most `cap` rows (COUNT over a LIMIT subquery)."""
+
+    def __init__(self, object_list, per_page, cap, **kwargs):
+        self.cap = cap
+        super().__init__(object_list, per_page, **kwargs)
+
+    @cached_property
+    def _raw_count(self):
+        return self.object_list.order_by()[: self.cap + 1].count()
+
+    @cached_property
+    def count(self):
+        return min(self._raw_count, self.cap)
+
+    @property
+    def is_capped(self):
+        return self._raw_count > self.cap
+
+
+def paginate(queryset, sort, *, page=None, cursor=None, per_page=12, max_pages=MAX_PAGES):
+    """
+    Return a page for a listing queryset.
+
+    `sort` is one of SORT_KEYS, or None when the queryset carries its own
+    ordering (e.g. relevance); such listings stay on numbered pages only.
+    """
+    keys = SORT_KEYS.get(sort)
+    if keys:
+        queryset = queryset.order_by(*ordering_for(keys))
+    paginator = CappedPaginator(queryset, per_page, cap=per_page * max_pages)
+
+    if cursor and keys:
+        try:
+            return KeysetPaginator(queryset, keys, per_page).page(cursor, paginator=paginator)
+        except InvalidCursor:
+            pass
+
+    page_obj = paginator.get_page(page)
+    page_obj.cursor_mode = False
+    page_obj.prev_cursor = None
+    page_obj.next_cursor = None
+    if keys and paginator.is_capped and page_obj.number == paginator.num_pages and page_obj.object_list:
+        # last numbered page: continue with a cursor instead of OFFSET
+        page_obj.next_cursor = encode_cursor(list(page_obj.object_list)[-1], keys, "n")
+    return page_obj
+
+
+# ---------- cacheable page metadata (models/result_cache.py) ----------
+def page_meta(page_obj) -> dict:
+    """Everything the listing templates read from a page, minus the rows."""
+    paginator = page_obj.paginator
+    meta = {
+        "cursor_mode": page_obj.cursor_mode,
+        "has_next": page_obj.has_next(),
+        "has_previous": page_obj.has_previous(),
+        "next_cursor": page_obj.next_cursor,
+        "prev_cursor": page_obj.prev_cursor,
+        "count": paginator.count,
+        "num_pages": paginator.num_pages,
+        "is_capped": paginator.is_capped,
+    }
+    if not page_obj.cursor_mode:
+        meta.update(
+            number=page_obj.number,
+            start_index=page_obj.start_index(),
+            end_index=page_obj.end_index(),
+            previous_page_number=page_obj.number - 1,
+            next_page_number=page_obj.number + 1,
+        )
+    return meta
+
+
+class PaginatorSnapshot:
+    def __init__(self, meta):
+        self.count = meta["count"]
+        self.num_pages = meta["num_pages"]
+        self.is_capped = meta["is_capped"]
+        self.page_range = range(1, self.num_pages + 1)
+
+
+class PageSnapshot:
+    """A page rebuilt from page_meta() and freshly hydrated rows."""
+
+    def __init__(self, object_list, meta):
+        self.object_list = object_list
+        self.paginator = PaginatorSnapshot(meta)
+        self.cursor_mode = meta["cursor_mode"]
+        self.next_cursor = meta["next_cursor"]
+        self.prev_cursor = meta["prev_cursor"]
+        self._meta = meta
+        self.number = meta.get("number")
+        self.start_index = meta.get("start_index")
+        self.end_index = meta.get("end_index")
+        self.previous_page_number = meta.get("previous_page_number")
+        self.next_page_number = meta.get("next_page_number")
+
+    def has_next(self):
+        return self._meta["has_next"]
+
+    def has_previous(self):
+        return self._meta["has_previous"]
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
@@ -0,0 +1,133 @@
+# models/ratings.py
+"""
+Upkeep of CarRatingSummary and its Car.rating_avg / rating_count copy.
+
+models/signals.py reads a review's stored (car, rating, status) before each
+save or delete and calls review_saved() / review_deleted() afterwards. The
+summary row is adjusted by the difference under a row lock — no
+re-aggregation of the car's reviews — and the top positive / critical
+picks are re-queried only when the changed review was, or may now beat,
+the current pick.
+
+rebuild() recomputes one car from scratch; `manage.py
+rebuild_rating_summaries` runs it for every car (after bulk imports or
+queryset .update() calls, which bypass signals).
+"""
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from . import result_cache
+from .models import Car, CarRatingSummary, CarReview
+
+POSITIVE_MIN = 3
+
+# whole-star buckets (a 4.5 still counts as four stars)
+STAR_FLOORS = [(5, 4.75), (4, 3.75), (3, 2.75), (2, 1.75), (1, 0.5)]
+
+
+def star(rating):
+    for stars, floor in STAR_FLOORS:
+        if rating >= floor:
+            return stars
+    return None
+
+
+def _visible(car_id):
+    return CarReview.objects.filter(car_id=car_id, status=True)
+
+
+def _top_positive(car_id):
+    return (_visible(car_id).filter(rating__gte=POSITIVE_MIN)
+            .order_by("-rating", "-created_at").values_list("pk", flat=True).first())
+
+
+def _top_critical(car_id):
+    return (_visible(car_id).filter(rating__lt=POSITIVE_MIN)
+            .order_by("rating", "-created_at").values_list("pk", flat=True).first())
+
+
+def _beats(review, top_id, positive: bool) -> bool:
+    if top_id is None:
+        return True
+    top = CarReview.objects.filter(pk=top_id).values_list("rating", "created_at").first()
+    if top is None:
+        return True
+    if review.rating != top[0]:
+        return review.rating > top[0] if positive else review.rating < top[0]
+    return review.created_at > top[1]
+
+
+def _add(summary, rating, sign):
+    summary.rating_count += sign
+    summary.rating_sum += sign * rating
+    stars = star(rating)
+    if stars:
+        field = f"star{stars}"
+        setattr(summary, field, getattr(summary, field) + sign)
+
+
+def _save(summary, *, bump=True):
+    summary.save()
+    Car.objects.filter(pk=summary.car_id).update(
+        rating_avg=summary.rating_avg if summary.rating_count else None,
+        rating_count=summary.rating_count,
+    )
+    if bump:
+        # .update() skips the Car signals; rating sorts/filters are cached listings too
+        result_cache.bump_inventory()
+
+
+def _locked(car_id):
+    return CarRatingSummary.objects.select_for_update().get_or_create(car_id=car_id)[0]
+
+
+def review_saved(review, before=None):
+    """`before` is the stored (car_id, rating, status) prior to this save, or None."""
+    with transaction.atomic():
+        summaries = {}
+        if before and before[2]:
+            summaries[before[0]] = s = _locked(before[0])
+            _add(s, before[1], -1)
+        if review.status:
+            s = summaries.get(review.car_id) or _locked(review.car_id)
+            summaries[review.car_id] = s
+            _add(s, review.rating, +1)
+
+        for car_id, s in summaries.items():
+            if review.pk in (s.top_positive_id, s.top_critical_id):
+                s.top_positive_id, s.top_critical_id = _top_positive(car_id), _top_critical(car_id)
+            elif review.status and review.car_id == car_id:
+                positive = review.rating >= POSITIVE_MIN
+                current = s.top_positive_id if positive else s.top_critical_id
+                if _beats(review, current, positive):
+                    setattr(s, "top_positive_id" if positive else "top_critical_id", review.pk)
+            _save(s)
+
+
+def review_deleted(review, before=None):
+    """`before` is the stored (car_id, rating, status) read just before the delete."""
+    car_id, rating, status = before or (review.car_id, review.rating, review.status)
+    with transaction.atomic():
+        s = CarRatingSummary.objects.select_for_update().filter(car_id=car_id).first()
+        if s is None:   # the car itself is being deleted
+            return
+        if status:
+            _add(s, rating, -1)
+        # the SET_NULL on top_* already ran, so re-pick both
+        s.top_positive_id, s.top_critical_id = _top_positive(car_id), _top_critical(car_id)
+        _save(s)
+
+
+def rebuild(car_id, *, bump=True) -> CarRatingSummary:
+    """Recompute one car's summary from its reviews."""
+    buckets = {f"star{stars}": Count("id", filter=Q(rating__gte=floor) & (Q(rating__lt=upper) if upper else Q()))
+               for (stars, floor), upper in zip(STAR_FLOORS, [None] + [f for _, f in STAR_FLOORS])}
+    agg = _visible(car_id).aggregate(n=Count("id"), total=Sum("rating"), **buckets)
+    with transaction.atomic():
+        s = _locked(car_id)
+        s.rating_count, s.rating_sum = agg["n"], agg["total"] or 0.0
+        for field in buckets:
+            setattr(s, field, agg[field])
+        s.top_positive_id, s.top_critical_id = _top_positive(car_id), _top_critical(car_id)
+        _save(s, bump=bump)
+    return s
@@ -0,0 +1,117 @@
+# models/result_cache.py
+"""
+Versioned result cache for anonymous listing pages.
+
+A listing page is cached as its ordered car ids plus the page metadata the
+templates read (models.pagination.page_meta), keyed by the canonical filter
+hash, sort and page/cursor — the home page and /marketplace/browse/ share
+entries for the same search. A hit hydrates the rows with one pk__in query
+(plus the images prefetch) instead of re-running the filtered query and
+its count.
+
+There is no TTL guessing for freshness: every key embeds a global inventory
+version, bumped by models/signals.py whenever a Car, CarImage, Make or
+BodyType is saved or deleted. The TTL below only bounds memory use.
+Bulk .update() calls bypass signals; call bump_inventory() after them.
+
+Hit/miss counts and hydration time are kept in the cache as counters and
+served to staff by the listing_cache_stats view.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+
+from . import pagination, versions
+
+VERSION_KEY = "inventory:version"
+CACHE_TTL = 60 * 30
+STATS_KEYS = ("hits", "misses", "hydrate_us")
+
+
+def inventory_version() -> int:
+    return versions.get(VERSION_KEY)
+
+
+def bump_inventory() -> None:
+    versions.bump(VERSION_KEY)
+
+
+def _incr(name: str, delta: int = 1) -> None:
+    key = f"listing_cache:stats:{name}"
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key, delta)
+
+
+def stats() -> dict:
+    raw = cache.get_many([f"listing_cache:stats:{name}" for name in STATS_KEYS])
+    hits, misses, hydrate_us = (raw.get(f"listing_cache:stats:{name}", 0) for name in STATS_KEYS)
+    lookups = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / lookups, 4) if lookups else None,
+        "hydrate_ms_total": round(hydrate_us / 1000, 2),
+        "hydrate_ms_avg": round(hydrate_us / 1000 / hits, 3) if hits else None,
+        "inventory_version": inventory_version(),
+    }
+
+
+def reset_stats() -> None:
+    cache.delete_many([f"listing_cache:stats:{name}" for name in STATS_KEYS])
+
+
+def _key(namespace, car_filter, sort, page, cursor) -> str:
+    try:
+        page = max(int(page), 1)
+    except (TypeError, ValueError):
+        page = 1
+    # cursors are opaque user input; keep the key short and bounded
+    where = f"c{hashlib.sha1(cursor.encode('utf-8')).hexdigest()}" if cursor else f"p{page}"
+    return f"listing:{inventory_version()}:{namespace}:{car_filter.hash}:{sort or ''}:{where}"
+
+
+def _hydrate(base, ids):
+    by_pk = base.in_bulk(ids)
+    return [by_pk[pk] for pk in ids if pk in by_pk]
+
+
+def paginate(request, base, car_filter, sort, *, namespace, per_page=12):
+    """
+    Filter `base` with `car_filter` and paginate it, caching the page for
+    anonymous visitors. `base` carries the select/prefetch setup and is
+    also what cached ids are hydrated from.
+    """
+    page, cursor = request.GET.get("page"), request.GET.get("cursor")
+    base = car_filter.annotate(base)
+    if sort == "distance" and not car_filter.near:
+        sort = None
+
+    def build():
+        # a text search without an explicit sort keeps its relevance order;
+        # a "near" search without one lists the closest cars first
+        qs = car_filter.apply(base, rank=sort is None)
+        order = sort or (None if car_filter.q else "distance" if car_filter.near else "-created")
+        return pagination.paginate(qs, order, page=page, cursor=cursor, per_page=per_page)
+
+    if request.user.is_authenticated:
+        return build()
+
+    key = _key(namespace, car_filter, sort, page, cursor)
+    entry = cache.get(key)
+    if entry is not None:
+        t0 = time.perf_counter()
+        rows = _hydrate(base, entry["ids"])
+        _incr("hits")
+        _incr("hydrate_us", int((time.perf_counter() - t0) * 1_000_000))
+        return pagination.PageSnapshot(rows, entry["meta"])
+
+    _incr("misses")
+    page_obj = build()
+    page_obj.object_list = list(page_obj.object_list)
+    meta = pagination.page_meta(page_obj)
+    cache.set(key, {"ids": [c.pk for c in page_obj.object_list], "meta": meta}, CACHE_TTL)
+    return page_obj
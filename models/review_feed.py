@@ -0,0 +1,49 @@
+# models/review_feed.py
+"""
+Cursor-paginated review feed for a car.
+
+car_detail renders the first FIRST_PAGE reviews; the "Show more" button
+(static/scripts.js) pulls the rest from reviews_json with the returned
+next_cursor, so a detail page costs the same whether the car has ten
+reviews or ten thousand. Cursors are models/pagination.py keyset tokens.
+"""
+from django.db.models import Exists, OuterRef
+
+from . import pagination
+from .models import CarReview, ReviewFeedback
+
+FIRST_PAGE = 5
+MAX_PAGE = 50
+
+# ?sort= -> [(field, descending), ...]; the last key must be unique
+SORTS = {
+    "newest": [("created_at", True), ("id", True)],
+    "helpful": [("helpful_count", True), ("created_at", True), ("id", True)],
+    "highest": [("rating", True), ("created_at", True), ("id", True)],
+    "lowest": [("rating", False), ("created_at", True), ("id", True)],
+}
+DEFAULT_SORT = "newest"
+
+
+def queryset(car_id, user=None):
+    """Approved reviews (vote counts are columns), plus the viewer's own votes."""
+    qs = CarReview.objects.filter(car_id=car_id, status=True).select_related("user")
+    if user is not None and user.is_authenticated:
+        mine = ReviewFeedback.objects.filter(review_id=OuterRef("pk"), user_id=user.id)
+        qs = qs.annotate(
+            i_liked=Exists(mine.filter(action=ReviewFeedback.ACTION_HELPFUL)),
+            i_reported=Exists(mine.filter(action=ReviewFeedback.ACTION_REPORT)),
+        )
+    return qs
+
+
+def page(car_id, *, user=None, sort=None, cursor=None, per_page=FIRST_PAGE):
+    """One KeysetPage of reviews; a bad or foreign cursor restarts at the top."""
+    keys = SORTS.get(sort) or SORTS[DEFAULT_SORT]
+    paginator = pagination.KeysetPaginator(queryset(car_id, user), keys, max(1, min(per_page, MAX_PAGE)))
+    if cursor:
+        try:
+            return paginator.page(cursor)
+        except pagination.InvalidCursor:
+            pass
+    return paginator.first()
@@ -0,0 +1,218 @@
+# models/search.py
+"""
+Full-text search index for Car.
+
+SQLite  -> FTS5 virtual table `models_car_fts` (rowid = car id), ranked with bm25().
+Postgres -> side table `models_car_search` with a weighted tsvector + GIN index.
+Anything else, or SQLite built without FTS5, falls back to the old icontains scan.
+
+Querysets reach either table through the unmanaged CarSearchFts /
+CarSearchDocument models, so the join is an ordinary Django join.
+
+The index is kept in sync by the signal handlers in models/signals.py and can be
+rebuilt from scratch with `python manage.py rebuild_search_index`.
+"""
+import re
+
+from django.db import connection
+from django.db.models import F, FloatField, Func, Lookup, Q, Value
+
+from .models import CarSearchDocument, CarSearchFts
+
+FTS_TABLE = "models_car_fts"
+PG_TABLE = "models_car_search"
+
+# Field weights (title/make/model matter most, long text least).
+# Order matches the FTS5 column order below.
+WEIGHTS = {
+    "title": 10.0,
+    "make": 8.0,
+    "model_name": 8.0,
+    "overview": 2.0,
+    "history": 1.0,
+}
+# tsvector weight classes for the same fields
+PG_CLASSES = {"title": "A", "make": "A", "model_name": "B", "overview": "C", "history": "D"}
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+MAX_TERMS = 8
+
+
+_has_fts5 = {}     # database NAME -> FTS5 table exists (migration 0014 skips it without FTS5)
+
+
+def backend() -> str | None:
+    """'sqlite' / 'postgresql' when an index is available, else None."""
+    if connection.vendor == "postgresql":
+        return connection.vendor
+    if connection.vendor == "sqlite":
+        name = connection.settings_dict["NAME"]
+        if name not in _has_fts5:
+            _has_fts5[name] = FTS_TABLE in connection.introspection.table_names()
+        return connection.vendor if _has_fts5[name] else None
+    return None
+
+
+def tokenize(text: str) -> list[str]:
+    """Split user input into lowercase word tokens (punctuation is dropped)."""
+    return [t.lower() for t in _TOKEN_RE.findall(text or "")][:MAX_TERMS]
+
+
+def _fts5_query(tokens):
+    # every term must match; prefix match so "toyo" finds "toyota" while typing
+    return " ".join(f'"{t}"*' for t in tokens)
+
+
+def _tsquery(tokens):
+    return " & ".join(f"{t}:*" for t in tokens)
+
+
+def _document(car) -> dict:
+    return {
+        "title": car.title or "",
+        "make": car.make.name if car.make_id else "",
+        "model_name": car.model_name or "",
+        "overview": car.overview or "",
+        "history": car.history or "",
+    }
+
+
+# ---------- index maintenance ----------
+def index_car(car) -> None:
+    """Insert/replace the search row for one car."""
+    kind = backend()
+    if kind is None:
+        return
+    doc = _document(car)
+    with connection.cursor() as cur:
+        if kind == "sqlite":
+            cur.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [car.pk])
+            cur.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, make, model_name, overview, history) "
+                f"VALUES (%s, %s, %s, %s, %s, %s)",
+                [car.pk, doc["title"], doc["make"], doc["model_name"], doc["overview"], doc["history"]],
+            )
+        else:
+            vector = " || ".join(
+                f"setweight(to_tsvector('simple', %s), '{PG_CLASSES[f]}')" for f in WEIGHTS
+            )
+            cur.execute(
+                f"INSERT INTO {PG_TABLE} (car_id, document) VALUES (%s, {vector}) "
+                f"ON CONFLICT (car_id) DO UPDATE SET document = EXCLUDED.document",
+                [car.pk] + [doc[f] for f in WEIGHTS],
+            )
+
+
+def remove_car(car_id: int) -> None:
+    kind = backend()
+    if kind is None:
+        return
+    with connection.cursor() as cur:
+        if kind == "sqlite":
+            cur.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [car_id])
+        else:
+            cur.execute(f"DELETE FROM {PG_TABLE} WHERE car_id = %s", [car_id])
+
+
+def rebuild(batch_size: int = 1000) -> int:
+    """Drop every indexed row and re-index all cars. Returns the number indexed."""
+    from .models import Car
+
+    kind = backend()
+    if kind is None:
+        return 0
+    with connection.cursor() as cur:
+        cur.execute(f"DELETE FROM {FTS_TABLE if kind == 'sqlite' else PG_TABLE}")
+
+    n = 0
+    qs = Car.objects.select_related("make").only(
+        "id", "title", "model_name", "overview", "history", "make__name"
+    ).order_by("pk")
+    for car in qs.iterator(chunk_size=batch_size):
+        index_car(car)
+        n += 1
+    if kind == "sqlite":
+        with connection.cursor() as cur:
+            cur.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    return n
+
+
+# ---------- querying ----------
+def legacy_apply(qs, text: str):
+    """The pre-index icontains scan; kept for the benchmark and unsupported backends."""
+    text = (text or "").strip()
+    if not text:
+        return qs
+    return qs.filter(
+        Q(title__icontains=text) |
+        Q(make__name__icontains=text) |
+        Q(model_name__icontains=text) |
+        Q(overview__icontains=text) |
+        Q(history__icontains=text)
+    )
+
+
+class _Fts5Match(Lookup):
+    lookup_name = "fts5"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", (*lhs_params, *rhs_params)
+
+
+class _TsMatch(Lookup):
+    lookup_name = "tsquery"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} @@ to_tsquery('simple', {rhs})", (*lhs_params, *rhs_params)
+
+
+CarSearchFts._meta.get_field("document").register_lookup(_Fts5Match)
+CarSearchDocument._meta.get_field("document").register_lookup(_TsMatch)
+
+
+def apply(qs, text: str, *, rank: bool = True):
+    """
+    Restrict a Car queryset to rows matching `text`.
+
+    With rank=True the queryset is annotated with `search_rank` (higher = better)
+    and ordered by it; callers that sort by something else pass rank=False.
+    """
+    tokens = tokenize(text)
+    if not tokens:
+        return qs
+    kind = backend()
+    if kind is None:
+        return legacy_apply(qs, text)
+
+    # Both paths join the index table through the unmanaged CarSearchFts /
+    # CarSearchDocument models, so the match runs once over the posting
+    # lists; a correlated rank subquery per row re-runs it and goes quadratic.
+    if kind == "sqlite":
+        document = F("search_fts__document")
+        qs = qs.filter(search_fts__document__fts5=_fts5_query(tokens))
+        weights = [Value(w) for w in WEIGHTS.values()]
+        # bm25() is "lower is better", flip it so both backends sort descending
+        ranked = Func(document, *weights, function="bm25", template="-%(function)s(%(expressions)s)",
+                      output_field=FloatField())
+    else:
+        document = F("search_document__document")
+        tsq = _tsquery(tokens)
+        qs = qs.filter(search_document__document__tsquery=tsq)
+        query = Func(Value(tsq), template="to_tsquery('simple', %(expressions)s)")
+        ranked = Func(document, query, function="ts_rank_cd", output_field=FloatField())
+    if not rank:
+        return qs
+    return qs.annotate(search_rank=ranked).order_by("-search_rank", "-created", "-pk")
+
+
+def matches(car, text: str) -> bool:
+    """apply() for one in-memory car: every term is a prefix of a word of its document."""
+    tokens = tokenize(text)
+    if not tokens:
+        return True
+    words = {w.lower() for value in _document(car).values() for w in _TOKEN_RE.findall(value)}
+    return all(any(w.startswith(t) for w in words) for t in tokens)
@@ -0,0 +1,55 @@
+# models/sellers.py
+"""
+Car.seller_user: the account behind a listing's seller_email.
+
+Resolving the seller used to be a case-insensitive scan of the user table
+on every car_detail view. The link is now stored on the car, so the page
+gets the user, SellerProfile avatar and verification status from one
+select_related join.
+
+The link is kept current from both sides:
+  * Car.save() re-resolves it whenever seller_email changes;
+  * models/signals.py relinks the cars of an address when a user is
+    created, deleted, or changes email.
+When several accounts share an address the oldest one wins, the same
+rule everywhere. `manage.py link_car_sellers` recomputes every link (after
+bulk imports or queryset .update() calls, which bypass both paths).
+"""
+from django.contrib.auth import get_user_model
+from django.db.models.functions import Lower, Trim
+from django.utils import timezone
+
+
+def normalize(email) -> str:
+    return (email or "").strip().lower()
+
+
+def _with_email(qs, field, email):
+    """Rows whose `field` normalizes to `email`, the same rule as normalize()."""
+    return qs.alias(normalized_email=Lower(Trim(field))).filter(normalized_email=email)
+
+
+def user_id_for_email(email):
+    """pk of the oldest account with this address (any case), or None."""
+    email = normalize(email)
+    if not email:
+        return None
+    return (_with_email(get_user_model().objects.all(), "email", email)
+            .order_by("pk").values_list("pk", flat=True).first())
+
+
+def relink_email(email) -> int:
+    """Point every car listed under `email` at its current owner; returns rows updated."""
+    from .models import Car  # Car.save() imports this module
+    email = normalize(email)
+    if not email:
+        return 0
+    # .update() skips auto_now; Car.updated feeds Last-Modified (models/conditional.py)
+    return _with_email(Car.objects.all(), "seller_email", email).update(
+        seller_user_id=user_id_for_email(email), updated=timezone.now())
+
+
+def user_map() -> dict:
+    """normalized email -> oldest user pk, for bulk relinking."""
+    users = get_user_model().objects.exclude(email="").order_by("-pk").values_list("pk", "email")
+    return {normalize(email): pk for pk, email in users}
@@ -0,0 +1,78 @@
+# models/session_ids.py
+"""
+Car-id lists kept in the session: wishlist_ids, compare_ids and the
+payment cart (payment/cart.py).
+
+They are stored as plain integer arrays, unique and in insertion order,
+and nothing else: titles, prices and covers are read from the database
+when a page needs them. get_ids() parses a list once per request
+(memoised on the session object until the key is reassigned, so write
+through set_ids() rather than mutating the stored list), and set_ids()
+leaves the session untouched when the list did not change: a no-op
+toggle or clear does not make SessionMiddleware save the session.
+
+Older sessions may still hold string ids or cart row dicts; get_ids()
+reads both, and the next set_ids() rewrites them compactly.
+
+set_value() does the same for the scalar preferences (currency, theme):
+no write when unchanged and, given a default, nothing stored while the
+value equals the one every reader falls back to.
+"""
+
+
+def _coerce(raw) -> list:
+    out, seen = [], set()
+    for value in raw if isinstance(raw, (list, tuple)) else ():
+        if isinstance(value, dict):     # legacy payment cart row
+            value = value.get("id", value.get("pid"))
+        try:
+            pk = int(value)
+        except (TypeError, ValueError):
+            continue
+        if pk not in seen:
+            seen.add(pk)
+            out.append(pk)
+    return out
+
+
+def get_ids(session, key) -> list:
+    """The ids under `key` (a fresh list the caller may modify)."""
+    raw = session.get(key)
+    memo = getattr(session, "__dict__", {}).setdefault("_id_lists", {})
+    hit = memo.get(key)
+    if hit is None or hit[0] is not raw:
+        hit = memo[key] = (raw, _coerce(raw))
+    return list(hit[1])
+
+
+def set_ids(session, key, ids) -> list:
+    """Store `ids` under `key` if they differ from what is there; returns the stored list."""
+    ids = _coerce(ids)
+    current = session.get(key)
+    if current == ids or (current is None and not ids):
+        return ids
+    session[key] = ids
+    return ids
+
+
+def toggle(session, key, pk, *, limit=None):
+    """Add or remove one id; returns (ids, now_present), or (ids, None) if `limit` is reached."""
+    ids = get_ids(session, key)
+    if pk in ids:
+        ids.remove(pk)
+        present = False
+    elif limit is not None and len(ids) >= limit:
+        return ids, None
+    else:
+        ids.append(pk)
+        present = True
+    return set_ids(session, key, ids), present
+
+
+def set_value(session, key, value, default=None) -> None:
+    """session[key] = value, skipped when unchanged; `default` (if given) is stored as absence."""
+    if default is not None and value == default:
+        if key in session:
+            del session[key]
+    elif session.get(key) != value:
+        session[key] = value
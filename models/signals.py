@@ -0,0 +1,259 @@
+# models/signals.py
+from django.conf import settings
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import detail_cache, map_tiles, ratings, result_cache, search, sellers, suggest
+from .models import BodyType, Car, CarImage, CarReview, Make, ReviewFeedback
+
+
+# ---------- search index ----------
+@receiver(post_save, sender=Car, dispatch_uid="car_search_index")
+def car_saved_reindex(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_car(instance)
+
+
+@receiver(post_delete, sender=Car, dispatch_uid="car_search_unindex")
+def car_deleted_unindex(sender, instance, **kwargs):
+    search.remove_car(instance.pk)
+
+
+@receiver(post_save, sender=Make, dispatch_uid="make_search_reindex")
+def make_saved_reindex(sender, instance, created=False, raw=False, **kwargs):
+    # make name is part of every car document under it
+    if raw or created:
+        return
+    for car in instance.cars.select_related("make").iterator():
+        search.index_car(car)
+
+
+# ---------- inventory version (facet counts + listing result cache) ----------
+@receiver(post_save, sender=Car, dispatch_uid="car_inventory_saved")
+@receiver(post_delete, sender=Car, dispatch_uid="car_inventory_deleted")
+@receiver(post_save, sender=CarImage, dispatch_uid="carimage_inventory_saved")
+@receiver(post_delete, sender=CarImage, dispatch_uid="carimage_inventory_deleted")
+@receiver(post_save, sender=Make, dispatch_uid="make_inventory_saved")
+@receiver(post_delete, sender=Make, dispatch_uid="make_inventory_deleted")
+@receiver(post_save, sender=BodyType, dispatch_uid="bodytype_inventory_saved")
+@receiver(post_delete, sender=BodyType, dispatch_uid="bodytype_inventory_deleted")
+def inventory_written(sender, **kwargs):
+    result_cache.bump_inventory()
+
+
+# ---------- rating summaries (models/ratings.py) ----------
+@receiver(pre_save, sender=CarReview, dispatch_uid="review_rating_before")
+@receiver(pre_delete, sender=CarReview, dispatch_uid="review_rating_before_delete")
+def review_rating_before(sender, instance, raw=False, **kwargs):
+    # the stored row, not the (possibly stale) instance, is what the summary counted
+    instance._rating_before = None
+    if not raw and instance.pk:
+        instance._rating_before = sender.objects.filter(pk=instance.pk).values_list(
+            "car_id", "rating", "status").first()
+
+
+@receiver(post_save, sender=CarReview, dispatch_uid="review_rating_saved")
+def review_rating_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    ratings.review_saved(instance, getattr(instance, "_rating_before", None))
+
+
+@receiver(post_delete, sender=CarReview, dispatch_uid="review_rating_deleted")
+def review_rating_deleted(sender, instance, **kwargs):
+    ratings.review_deleted(instance, getattr(instance, "_rating_before", None))
+
+
+# ---------- review vote counters (CarReview.helpful_count / report_count) ----------
+VOTE_COUNTERS = {
+    ReviewFeedback.ACTION_HELPFUL: "helpful_count",
+    ReviewFeedback.ACTION_REPORT: "report_count",
+}
+
+
+@receiver(post_save, sender=ReviewFeedback, dispatch_uid="feedback_count_saved")
+def feedback_counted(sender, instance, created=False, raw=False, **kwargs):
+    if raw or not created:
+        return
+    field = VOTE_COUNTERS[instance.action]
+    CarReview.objects.filter(pk=instance.review_id).update(**{field: F(field) + 1})
+
+
+@receiver(post_delete, sender=ReviewFeedback, dispatch_uid="feedback_count_deleted")
+def feedback_uncounted(sender, instance, **kwargs):
+    field = VOTE_COUNTERS[instance.action]
+    # never below zero, even if the column has drifted
+    CarReview.objects.filter(pk=instance.review_id).update(**{field: Greatest(F(field) - 1, 0)})
+
+
+# ---------- seller links (Car.seller_user, models/sellers.py) ----------
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL, dispatch_uid="user_email_before")
+def user_email_before(sender, instance, raw=False, update_fields=None, **kwargs):
+    # logins save with update_fields=["last_login"]; only an email write can move links
+    instance._email_before = None
+    if not raw and instance.pk and (update_fields is None or "email" in update_fields):
+        instance._email_before = sender.objects.filter(pk=instance.pk).values_list("email", flat=True).first()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL, dispatch_uid="user_email_relink")
+def user_email_relink(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    before = getattr(instance, "_email_before", None)
+    if created:
+        sellers.relink_email(instance.email)
+    elif before is not None and sellers.normalize(before) != sellers.normalize(instance.email):
+        sellers.relink_email(before)
+        sellers.relink_email(instance.email)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL, dispatch_uid="user_deleted_relink")
+def user_deleted_relink(sender, instance, **kwargs):
+    # SET_NULL already cleared the links; hand the cars to another account with the address
+    sellers.relink_email(instance.email)
+
+
+# ---------- car_detail fragments (models/detail_cache.py) ----------
+# registered after the rating / vote receivers so a refill sees their writes
+@receiver(post_save, sender=Car, dispatch_uid="car_detail_saved")
+@receiver(post_delete, sender=Car, dispatch_uid="car_detail_deleted")
+def car_detail_written(sender, instance, **kwargs):
+    detail_cache.bump(instance.pk)
+
+
+@receiver(post_save, sender=CarImage, dispatch_uid="carimage_detail_saved")
+@receiver(post_delete, sender=CarImage, dispatch_uid="carimage_detail_deleted")
+def carimage_detail_written(sender, instance, **kwargs):
+    detail_cache.bump(instance.car_id)
+
+
+@receiver(post_save, sender=CarReview, dispatch_uid="review_detail_saved")
+@receiver(post_delete, sender=CarReview, dispatch_uid="review_detail_deleted")
+def review_detail_written(sender, instance, **kwargs):
+    before = getattr(instance, "_rating_before", None)
+    detail_cache.bump(instance.car_id, before[0] if before else None)
+
+
+@receiver(post_save, sender=ReviewFeedback, dispatch_uid="feedback_detail_saved")
+@receiver(post_delete, sender=ReviewFeedback, dispatch_uid="feedback_detail_deleted")
+def feedback_detail_written(sender, instance, **kwargs):
+    # anonymous review cards print the helpful count
+    detail_cache.bump(CarReview.objects.filter(pk=instance.review_id).values_list("car_id", flat=True).first())
+
+
+@receiver(post_save, sender=Make, dispatch_uid="make_detail_saved")
+@receiver(post_delete, sender=Make, dispatch_uid="make_detail_deleted")
+@receiver(post_save, sender=BodyType, dispatch_uid="bodytype_detail_saved")
+@receiver(post_delete, sender=BodyType, dispatch_uid="bodytype_detail_deleted")
+def taxonomy_detail_written(sender, created=False, **kwargs):
+    if not created:
+        detail_cache.bump_all()
+
+
+# ---------- map tiles (models/map_tiles.py) ----------
+@receiver(post_save, sender="marketplace.Dealer", dispatch_uid="dealer_map_saved")
+@receiver(post_delete, sender="marketplace.Dealer", dispatch_uid="dealer_map_deleted")
+def dealer_written(sender, **kwargs):
+    map_tiles.bump_dealers()
+
+
+# ---------- typeahead trie (models/suggest.py) ----------
+# registered after the inventory receivers so the version they bump is current
+@receiver(pre_save, sender=Car, dispatch_uid="car_suggest_before")
+def car_suggest_before(sender, instance, raw=False, **kwargs):
+    # (make id, make name, model) as stored; only needed while a trie is loaded
+    instance._suggest_before = None
+    if not raw and instance.pk and suggest.loaded():
+        instance._suggest_before = (
+            Car.objects.filter(pk=instance.pk).values_list("make_id", "make__name", "model_name").first()
+        )
+
+
+@receiver(post_save, sender=Car, dispatch_uid="car_suggest_saved")
+def car_suggest_saved(sender, instance, created=False, raw=False, **kwargs):
+    if raw or not suggest.loaded():
+        return
+    before = getattr(instance, "_suggest_before", None)
+    pairs = []
+    if created or (before and before[0::2] != (instance.make_id, instance.model_name)):
+        pairs.append((instance.make.name, instance.model_name))
+        if before:
+            pairs.append(before[1:])
+    suggest.car_changed(*pairs)
+
+
+@receiver(post_delete, sender=Car, dispatch_uid="car_suggest_deleted")
+def car_suggest_deleted(sender, instance, **kwargs):
+    if suggest.loaded():
+        suggest.car_changed((instance.make.name, instance.model_name))
+
+
+@receiver(post_save, sender=Make, dispatch_uid="make_suggest_saved")
+@receiver(post_delete, sender=Make, dispatch_uid="make_suggest_deleted")
+def make_suggest_changed(sender, created=False, **kwargs):
+    # a rename touches every model label under the make
+    if not created:
+        suggest.invalidate()
+
+
+@receiver(pre_save, sender="marketplace.CarListing", dispatch_uid="listing_suggest_before")
+def listing_suggest_before(sender, instance, raw=False, **kwargs):
+    instance._suggest_before = None
+    if not raw and instance.pk and suggest.loaded():
+        instance._suggest_before = (
+            sender.objects.filter(pk=instance.pk).values_list("make", "model", "is_published").first()
+        )
+
+
+@receiver(post_save, sender="marketplace.CarListing", dispatch_uid="listing_suggest_saved")
+def listing_suggest_saved(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    before = getattr(instance, "_suggest_before", None)
+    pairs = []
+    if created or (before and before != (instance.make, instance.model, instance.is_published)):
+        pairs.append((instance.make, instance.model))
+        if before:
+            pairs.append(before[:2])
+    suggest.listing_changed(*pairs)
+
+
+@receiver(post_delete, sender="marketplace.CarListing", dispatch_uid="listing_suggest_deleted")
+def listing_suggest_deleted(sender, instance, **kwargs):
+    suggest.listing_changed((instance.make, instance.model))
+
+
+# ---------- navbar state (marketplace/nav.py) ----------
+@receiver(post_save, sender="marketplace.SellerProfile", dispatch_uid="sellerprofile_nav_saved")
+@receiver(post_delete, sender="marketplace.SellerProfile", dispatch_uid="sellerprofile_nav_deleted")
+@receiver(post_save, sender="marketplace.SavedSearch", dispatch_uid="savedsearch_nav_saved")
+@receiver(post_delete, sender="marketplace.SavedSearch", dispatch_uid="savedsearch_nav_deleted")
+def nav_user_written(sender, instance, **kwargs):
+    from marketplace import nav
+    nav.bump_user(instance.user_id)
+
+
+# ---------- saved-search unread counts (marketplace/saved_searches.py) ----------
+@receiver(post_save, sender=Car, dispatch_uid="car_saved_search_listed")
+def car_saved_search_listed(sender, instance, created=False, raw=False, **kwargs):
+    if raw or not created:
+        return
+    from marketplace import saved_searches
+    saved_searches.car_listed(instance)
+
+
+@receiver(post_save, sender="marketplace.SavedSearch", dispatch_uid="savedsearch_filters_saved")
+@receiver(post_delete, sender="marketplace.SavedSearch", dispatch_uid="savedsearch_filters_deleted")
+@receiver(post_save, sender=Make, dispatch_uid="make_saved_search_filters_saved")
+@receiver(post_delete, sender=Make, dispatch_uid="make_saved_search_filters_deleted")
+@receiver(post_save, sender=BodyType, dispatch_uid="bodytype_saved_search_filters_saved")
+@receiver(post_delete, sender=BodyType, dispatch_uid="bodytype_saved_search_filters_deleted")
+def saved_search_filters_written(sender, update_fields=None, **kwargs):
+    # mark_read() and the counters do not change what a search matches
+    if update_fields and set(update_fields) <= {"last_seen_car_created_at", "new_match_count"}:
+        return
+    from marketplace import saved_searches
+    saved_searches.bump_filters()
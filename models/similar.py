@@ -0,0 +1,206 @@
+# models/similar.py
+"""
+Precomputed "similar cars" (CarSimilarity), built offline with NumPy.
+
+Every car becomes a small feature vector:
+
+  price, mileage       log-scaled and standardised over the inventory
+  make, body type,     one-hot
+  fuel, transmission
+  new / certified /    0 or 1
+  hot flags
+
+each block scaled by WEIGHTS so that one standard deviation of price,
+or a different make, costs the weight squared in squared distance. The
+K nearest cars by Euclidean distance are found in CHUNK-row slices of
+one matrix product against the whole inventory (argpartition, no full
+sort) and stored one row per car. car_detail then reads a single
+primary-key row.
+
+`manage.py build_similar_cars` refreshes incrementally: cars without a
+row or edited since their row was computed are recomputed, together with
+every existing car that one of them is now closer to than its current
+K-th neighbour (CarSimilarity.kth_distance). Neighbour lists that point
+at a car which has since moved away, and drift in the standardisation,
+are only corrected by `--full`, which is meant to run nightly.
+
+NumPy is needed by the job only; the site just reads the table.
+"""
+import math
+
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Car, CarSimilarity
+
+try:
+    import numpy as np
+except ImportError:  # only the batch job needs it
+    np = None
+
+K = 8
+CHUNK = 256             # target rows per matrix product (CHUNK x cars float32 scratch)
+UNFILLED = 1e12         # kth_distance of a row with fewer than K neighbours
+WEIGHTS = {
+    "price": 2.0,
+    "mileage": 1.0,
+    "make": 1.5,
+    "body_type": 1.0,
+    "fuel": 0.75,
+    "transmission": 0.5,
+    "flags": 0.25,
+}
+FLAGS = ("is_new", "is_certified", "is_hot")
+COLUMNS = ("id", "price", "mileage", "make_id", "body_type_id", "fuel", "transmission", *FLAGS)
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("numpy is required to build similar-car recommendations (pip install numpy)")
+
+
+# ---------- encoding ----------
+def _scaled(values, weight):
+    """log1p, standardised; unknown values sit at the mean."""
+    x = np.array([math.log1p(float(v)) if v is not None else np.nan for v in values], dtype=np.float64)
+    known = ~np.isnan(x)
+    if not known.any():
+        return np.zeros((len(x), 1), dtype=np.float32)
+    mean, std = x[known].mean(), x[known].std() or 1.0
+    x = np.where(known, (x - mean) / std, 0.0) * weight
+    return x.astype(np.float32)[:, None]
+
+
+def _one_hot(values, weight):
+    """Two different categories end up `weight` apart; None is a category of its own."""
+    _, inverse = np.unique(np.array([str(v) for v in values]), return_inverse=True)
+    out = np.zeros((len(values), int(inverse.max()) + 1 if len(values) else 0), dtype=np.float32)
+    out[np.arange(len(values)), inverse] = weight / math.sqrt(2)
+    return out
+
+
+def encode(qs=None):
+    """(ids, matrix): car pks and their feature rows, in pk order."""
+    _require_numpy()
+    rows = list((qs if qs is not None else Car.objects.all()).order_by("pk").values_list(*COLUMNS))
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 0), dtype=np.float32)
+    cols = dict(zip(COLUMNS, zip(*rows)))
+    blocks = [
+        _scaled(cols["price"], WEIGHTS["price"]),
+        _scaled(cols["mileage"], WEIGHTS["mileage"]),
+        _one_hot(cols["make_id"], WEIGHTS["make"]),
+        _one_hot(cols["body_type_id"], WEIGHTS["body_type"]),
+        _one_hot(cols["fuel"], WEIGHTS["fuel"]),
+        _one_hot(cols["transmission"], WEIGHTS["transmission"]),
+        np.array([cols[f] for f in FLAGS], dtype=np.float32).T * WEIGHTS["flags"],
+    ]
+    return np.array(cols["id"], dtype=np.int64), np.ascontiguousarray(np.hstack(blocks))
+
+
+# ---------- search ----------
+def _distances(X, sq, rows, *, ranking=False):
+    """
+    Squared distances from X[rows] to every row of X (len(rows) x len(X)).
+    With ranking=True the per-row |x|^2 term is left out: it does not change
+    the order within a row, and skipping it saves a pass over the block.
+    """
+    d = X[rows] @ X.T
+    d *= -2
+    d += sq
+    if not ranking:
+        d += sq[rows, None]
+    return d
+
+
+def nearest(X, rows, k=K):
+    """Yield (rows, neighbour indices, distances) per chunk, nearest first, self excluded."""
+    sq = np.einsum("ij,ij->i", X, X)
+    k = min(k, len(X) - 1)
+    for start in range(0, len(rows), CHUNK):
+        chunk = rows[start:start + CHUNK]
+        if k <= 0:
+            yield chunk, np.zeros((len(chunk), 0), dtype=np.int64), np.zeros((len(chunk), 0))
+            continue
+        d = _distances(X, sq, chunk, ranking=True)
+        d[np.arange(len(chunk)), chunk] = np.inf
+        part = np.argpartition(d, k - 1, axis=1)[:, :k]
+        part_d = np.take_along_axis(d, part, axis=1) + sq[chunk, None]
+        order = np.argsort(part_d, axis=1, kind="stable")
+        dist = np.sqrt(np.maximum(np.take_along_axis(part_d, order, axis=1), 0))
+        yield chunk, np.take_along_axis(part, order, axis=1), dist
+
+
+def _displaced(X, fresh, kth):
+    """Rows that some fresh row is now closer to than their stored K-th neighbour."""
+    sq = np.einsum("ij,ij->i", X, X)
+    closest = np.full(len(X), np.inf, dtype=np.float32)
+    for start in range(0, len(fresh), CHUNK):
+        chunk = fresh[start:start + CHUNK]
+        d = _distances(X, sq, chunk)
+        d[np.arange(len(chunk)), chunk] = np.inf
+        np.minimum(closest, d.min(axis=0), out=closest)
+    return np.flatnonzero(np.sqrt(np.maximum(closest, 0)) < kth)
+
+
+# ---------- job ----------
+def stale_ids():
+    """Cars with no row yet, or edited since theirs was computed."""
+    return list(
+        Car.objects.filter(Q(similarity__isnull=True) | Q(updated__gt=F("similarity__computed_at")))
+        .values_list("pk", flat=True)
+    )
+
+
+def _store(ids, results, computed_at, batch_size=1000) -> int:
+    written = 0
+    for rows, idx, dist in results:
+        objs = [
+            CarSimilarity(
+                car_id=int(ids[row]),
+                neighbor_ids=ids[idx[i]].tolist(),
+                kth_distance=float(dist[i, -1]) if dist.shape[1] == K else UNFILLED,
+                computed_at=computed_at,
+            )
+            for i, row in enumerate(rows)
+        ]
+        CarSimilarity.objects.bulk_create(
+            objs, batch_size=batch_size, update_conflicts=True, unique_fields=["car"],
+            update_fields=["neighbor_ids", "kth_distance", "computed_at"],
+        )
+        written += len(objs)
+    return written
+
+
+def refresh(*, full=False) -> dict:
+    """Recompute stale rows (or all of them with full=True); returns counts."""
+    _require_numpy()
+    started = timezone.now()    # edits made while this runs count as stale next time
+    ids, X = encode()
+    if full:
+        targets = np.arange(len(ids))
+        fresh, displaced = len(ids), 0
+    else:
+        pos = {car_id: i for i, car_id in enumerate(ids.tolist())}
+        fresh_rows = np.array([pos[pk] for pk in stale_ids() if pk in pos], dtype=np.int64)
+        kth = np.full(len(ids), np.inf, dtype=np.float32)
+        for car_id, distance in CarSimilarity.objects.values_list("car_id", "kth_distance"):
+            if car_id in pos:
+                kth[pos[car_id]] = distance
+        kth[fresh_rows] = -1     # already being recomputed
+        moved = _displaced(X, fresh_rows, kth) if len(fresh_rows) else np.zeros(0, dtype=np.int64)
+        targets = np.union1d(fresh_rows, moved)
+        fresh, displaced = len(fresh_rows), len(moved)
+    written = _store(ids, nearest(X, targets), started) if len(targets) else 0
+    return {"cars": len(ids), "stale": fresh, "displaced": displaced, "written": written}
+
+
+# ---------- reading ----------
+def similar_cars(car_id, limit=K):
+    """The stored neighbours of one car as Car objects, nearest first."""
+    ids = CarSimilarity.objects.filter(car_id=car_id).values_list("neighbor_ids", flat=True).first()
+    if not ids:
+        return []
+    # all K, so a deleted neighbour is replaced by the next one instead of leaving a gap
+    cars = Car.objects.select_related("make").in_bulk(ids)
+    return [cars[pk] for pk in ids if pk in cars][:limit]
@@ -0,0 +1,305 @@
+# models/suggest.py
+"""
+In-process typeahead for makes and models.
+
+A prefix trie built from Make.name, the distinct (make, Car.model_name)
+pairs and published CarListing make/model values, weighted by how much
+inventory each has. Every node keeps its own top-K, so a lookup is a walk
+of len(prefix) dict hops plus a slice — no database, no cache round-trip.
+
+Models are reachable both as "corolla" and "toyota corolla".
+
+Freshness:
+  * models/signals.py calls car_changed()/listing_changed() after writes in
+    this process, which re-count just the affected make/model and repair
+    the top-K lists along their paths;
+  * at most every MIN_REBUILD_GAP seconds a lookup starts a background
+    refresh(), which compares the inventory version (models/result_cache.py)
+    and rebuilds if another process wrote, a Make was renamed or deleted,
+    or the trie is older than REBUILD_EVERY. Lookups keep answering from
+    the old trie meanwhile; only the very first one in a process builds.
+"""
+import heapq
+import logging
+import threading
+import time
+
+from django.db import connection
+from django.db.models import Count
+
+from . import result_cache
+from .models import Car, Make
+
+logger = logging.getLogger("models.suggest")
+
+TOP_K = 10
+REBUILD_EVERY = 15 * 60
+MIN_REBUILD_GAP = 30
+
+
+def _norm(text: str) -> str:
+    return " ".join((text or "").lower().split())
+
+
+class Entry:
+    __slots__ = ("ident", "kind", "label", "make", "weight")
+
+    def __init__(self, ident, kind, label, make, weight):
+        self.ident = ident
+        self.kind = kind
+        self.label = label
+        self.make = make
+        self.weight = weight
+
+    def keys(self):
+        if self.kind == "make":
+            return [_norm(self.label)]
+        return [_norm(f"{self.make} {self.label}"), _norm(self.label)]
+
+    def as_dict(self):
+        label = self.label if self.kind == "make" else f"{self.make} {self.label}"
+        return {"label": label, "kind": self.kind, "make": self.make,
+                "model": self.label if self.kind == "model" else "", "count": self.weight}
+
+
+def _rank(e: Entry):
+    return (-e.weight, e.label.lower())
+
+
+class _Node:
+    __slots__ = ("children", "entries", "top")
+
+    def __init__(self):
+        self.children = {}
+        self.entries = set()    # idents whose key ends here
+        self.top = ()
+
+
+class Trie:
+    def __init__(self):
+        self.root = _Node()
+        self.entries = {}
+
+    # ---------- build ----------
+    def _insert_keys(self, e: Entry):
+        for key in e.keys():
+            node = self.root
+            for ch in key:
+                node = node.children.setdefault(ch, _Node())
+            node.entries.add(e.ident)
+
+    def _compute_top(self, node: _Node):
+        seen, candidates = set(), []
+        for ident in node.entries:
+            e = self.entries[ident]
+            if e.weight > 0:
+                seen.add(ident)
+                candidates.append(e)
+        for child in node.children.values():
+            for e in child.top:
+                if e.ident not in seen:
+                    seen.add(e.ident)
+                    candidates.append(e)
+        node.top = tuple(heapq.nsmallest(TOP_K, candidates, key=_rank))
+
+    def finalize(self):
+        """Compute every node's top-K bottom-up (after a bulk load)."""
+        stack, order = [self.root], []
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            stack.extend(node.children.values())
+        for node in reversed(order):
+            self._compute_top(node)
+
+    def add(self, ident, kind, label, make, weight):
+        e = self.entries.get(ident)
+        if e is None:
+            e = self.entries[ident] = Entry(ident, kind, label, make, weight)
+            self._insert_keys(e)
+        else:
+            e.weight += weight
+        return e
+
+    # ---------- incremental ----------
+    def set_weight(self, ident, kind, label, make, weight):
+        e = self.entries.get(ident)
+        if e is None:
+            if weight <= 0:
+                return
+            e = self.entries[ident] = Entry(ident, kind, label, make, weight)
+            self._insert_keys(e)
+        e.weight = weight
+        for key in e.keys():
+            path, node = [self.root], self.root
+            for ch in key:
+                node = node.children[ch]
+                path.append(node)
+            for node in reversed(path):
+                self._compute_top(node)
+
+    # ---------- lookup ----------
+    def search(self, prefix, *, kind=None, limit=8):
+        node = self.root
+        for ch in _norm(prefix):
+            node = node.children.get(ch)
+            if node is None:
+                return []
+        hits = node.top if kind is None else [e for e in node.top if e.kind == kind]
+        return [e.as_dict() for e in hits[:limit]]
+
+
+# ---------- process-wide instance ----------
+_lock = threading.Lock()
+_trie = None
+_built_at = float("-inf")
+_checked_at = float("-inf")     # last comparison with the inventory version
+_version = None
+_refresher = None               # the running background refresh, if any
+
+
+def _make_ident(name):
+    return ("make", _norm(name))
+
+
+def _model_ident(make, model):
+    return ("model", _norm(make), _norm(model))
+
+
+def _listing_rows():
+    from marketplace.models import CarListing
+    return CarListing.objects.filter(is_published=True)
+
+
+def build() -> Trie:
+    trie = Trie()
+    for make in Make.objects.annotate(n=Count("cars")):
+        trie.add(_make_ident(make.name), "make", make.name, make.name, make.n)
+    for row in Car.objects.exclude(model_name="").values("make__name", "model_name").annotate(n=Count("id")).order_by():
+        trie.add(_model_ident(row["make__name"], row["model_name"]), "model",
+                 row["model_name"], row["make__name"], row["n"])
+    for row in _listing_rows().values("make", "model").annotate(n=Count("id")).order_by():
+        if row["make"]:
+            e = trie.add(_make_ident(row["make"]), "make", row["make"], row["make"], row["n"])
+            if row["model"]:
+                trie.add(_model_ident(row["make"], row["model"]), "model", row["model"], e.label, row["n"])
+    trie.finalize()
+    return trie
+
+
+def rebuild() -> Trie:
+    global _trie, _built_at, _checked_at, _version
+    version = result_cache.inventory_version()
+    trie = build()
+    with _lock:
+        _trie, _version = trie, version
+        _built_at = _checked_at = time.monotonic()
+    return trie
+
+
+def refresh() -> Trie:
+    """Rebuild if the inventory changed elsewhere or the trie is old; what the background thread runs."""
+    global _checked_at
+    if (_trie is None or time.monotonic() - _built_at > REBUILD_EVERY
+            or result_cache.inventory_version() != _version):
+        # written by another process; our signal updates only cover this one
+        return rebuild()
+    _checked_at = time.monotonic()
+    return _trie
+
+
+def invalidate() -> None:
+    """Rebuild in the background on the next lookup."""
+    global _built_at, _checked_at
+    _built_at = _checked_at = float("-inf")
+
+
+def recheck() -> None:
+    """Compare the inventory version on the next lookup instead of after MIN_REBUILD_GAP."""
+    global _checked_at
+    _checked_at = float("-inf")
+
+
+def _run_refresh():
+    global _checked_at, _refresher
+    try:
+        refresh()
+    except Exception:
+        logger.exception("typeahead refresh failed; serving the old trie")
+        _checked_at = time.monotonic()      # retry after MIN_REBUILD_GAP, not on every keystroke
+    finally:
+        _refresher = None
+        connection.close()      # this thread's own connection
+
+
+def _start_refresh() -> None:
+    global _refresher
+    with _lock:
+        if _refresher is not None:
+            return
+        _refresher = threading.Thread(target=_run_refresh, name="suggest-refresh", daemon=True)
+    _refresher.start()
+
+
+def wait_for_refresh(timeout=None) -> None:
+    """Block until a running background refresh has finished (benchmarks, tests)."""
+    refresher = _refresher
+    if refresher is not None:
+        refresher.join(timeout)
+
+
+def _current() -> Trie:
+    global _checked_at
+    if _trie is None:
+        return rebuild()
+    now = time.monotonic()
+    if now - _checked_at > MIN_REBUILD_GAP:
+        _checked_at = now       # one refresh per gap, however many lookups arrive meanwhile
+        _start_refresh()
+    return _trie
+
+
+def suggest(prefix: str, *, kind=None, limit=8) -> list:
+    if not _norm(prefix):
+        return []
+    return _current().search(prefix, kind=kind, limit=limit)
+
+
+# ---------- incremental updates (models/signals.py) ----------
+def loaded() -> bool:
+    """Whether this process holds a trie that incremental updates should keep current."""
+    return _trie is not None
+
+
+def _recount(make_name, model_name):
+    listings = _listing_rows()
+    make_n = Car.objects.filter(make__name__iexact=make_name).count() + \
+        listings.filter(make__iexact=make_name).count()
+    model_n = 0
+    if model_name:
+        model_n = Car.objects.filter(make__name__iexact=make_name, model_name__iexact=model_name).count() + \
+            listings.filter(make__iexact=make_name, model__iexact=model_name).count()
+    with _lock:
+        _trie.set_weight(_make_ident(make_name), "make", make_name, make_name, make_n)
+        if model_name:
+            _trie.set_weight(_model_ident(make_name, model_name), "model", model_name, make_name, model_n)
+
+
+def car_changed(*pairs):
+    """
+    Re-count the given (make name, model name) pairs, e.g. before/after a save.
+
+    Called with no pairs for a write that moved no counts: the inventory
+    version it bumped is still adopted, so it does not force a rebuild.
+    """
+    global _version
+    if _trie is None:
+        return
+    for make_name, model_name in set(pairs):
+        if make_name:
+            _recount(make_name, model_name)
+    with _lock:
+        _version = result_cache.inventory_version()
+
+
+listing_changed = car_changed
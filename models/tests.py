@@ -1,3 +1,1085 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.cache import SessionStore as CacheSession
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import CommandError, call_command
+from django.core.paginator import Paginator
+from django.db import connection
+from django.http import HttpResponse, QueryDict
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from automart.middleware import QueryBudgetMiddleware, fingerprint
+from automart.session_store import SessionStore
+from marketplace.models import Dealer, SellerProfile
+
+from . import (
+    bench, car_api, facets, finance, geo, map_tiles, pagination, ratings, result_cache, review_feed, search,
+    session_ids, similar, suggest,
+)
+from .filters import CarFilter
+from .management.commands import check_query_plans
+from .models import BodyType, Car, CarImage, CarRatingSummary, CarReview, CarSimilarity, Make, ReviewFeedback
+
+
+def make_car(make, **fields):
+    fields.setdefault("title", f"{make.name} car")
+    return Car.objects.create(make=make, **fields)
+
+
+class SearchIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.toyota = Make.objects.create(name="Toyota")
+        cls.corolla = make_car(cls.toyota, title="Toyota Corolla", model_name="Corolla")
+        cls.mention = make_car(cls.toyota, title="Toyota Yaris", overview="Smaller than a corolla.")
+
+    def found(self, text):
+        return list(search.apply(Car.objects.all(), text).values_list("pk", flat=True))
+
+    def test_title_match_ranks_above_overview_match(self):
+        self.assertEqual(self.found("corolla"), [self.corolla.pk, self.mention.pk])
+        self.assertEqual(self.found("coro"), [self.corolla.pk, self.mention.pk])
+        self.assertEqual(self.found("toyota corolla"), [self.corolla.pk, self.mention.pk])
+        self.assertEqual(self.found("corolla hybrid"), [])
+
+    def test_saves_and_deletes_reach_the_index(self):
+        self.corolla.title, self.corolla.model_name = "Toyota Camry", "Camry"
+        self.corolla.save()
+        self.assertEqual(self.found("corolla"), [self.mention.pk])
+        self.assertEqual(self.found("camry"), [self.corolla.pk])
+        self.mention.delete()
+        self.assertEqual(self.found("corolla"), [])
+
+    def test_make_rename_reindexes_its_cars(self):
+        self.toyota.name = "Lexus"
+        self.toyota.save()
+        self.assertEqual(self.found("lexus"), [self.corolla.pk, self.mention.pk])
+        self.assertEqual(self.found("lexus yaris"), [self.mention.pk])
+
+    def test_rebuild_matches_the_live_index(self):
+        before = self.found("toyota")
+        self.assertEqual(search.rebuild(), 2)
+        self.assertEqual(self.found("toyota"), before)
+
+    def test_matches_agrees_with_apply(self):
+        for text in ("corolla", "coro", "toyota yaris", "hybrid", ""):
+            with self.subTest(text=text):
+                self.assertEqual([c.pk for c in Car.objects.order_by("pk") if search.matches(c, text)],
+                                 sorted(search.apply(Car.objects.all(), text).values_list("pk", flat=True)))
+
+
+class FacetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        toyota, honda = Make.objects.create(name="Toyota"), Make.objects.create(name="Honda")
+        suv = BodyType.objects.create(name="SUV")
+        make_car(toyota, body_type=suv, fuel="Hybrid", price=Decimal(9000))
+        make_car(toyota, fuel="Petrol", price=Decimal(25000))
+        make_car(honda, body_type=suv, fuel="Petrol", price=Decimal(12000))
+        make_car(honda, fuel="Electric")
+
+    def setUp(self):
+        cache.clear()
+
+    def counts(self, **params):
+        return facets.get_counts(CarFilter.from_params(params))
+
+    def test_a_facet_ignores_its_own_selection(self):
+        data = self.counts(make="toyota")
+        self.assertEqual(data["total"], 2)
+        self.assertEqual(data["make"], {"toyota": 2, "honda": 2})
+        self.assertEqual(data["fuel"], {"Hybrid": 1, "Petrol": 1})
+        self.assertEqual(data["body_type"], {"suv": 1})
+
+    def test_selections_narrow_the_other_facets(self):
+        data = self.counts(fuel="Petrol", max_price="20000")
+        self.assertEqual(data["total"], 1)
+        self.assertEqual(data["make"], {"honda": 1})
+        self.assertEqual(data["fuel"], {"Petrol": 1, "Hybrid": 1})
+        self.assertEqual({b["key"]: b["count"] for b in data["price"]},
+                         {"0-10k": 0, "10k-20k": 1, "20k-35k": 1, "35k-50k": 0, "50k+": 0})
+
+    def test_counts_cost_one_query_and_follow_the_inventory(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.counts()["total"], 4)
+        with self.assertNumQueries(0):
+            self.counts()
+        Car.objects.filter(fuel="Electric").delete()
+        self.assertEqual(self.counts()["total"], 3)
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make = Make.objects.create(name="Toyota")
+        # ties and NULLs on the sort key: the id tie-breaker and the NULL
+        # side of the ordering are what the cursor has to get right
+        for price in [5000, None, 7000, 5000, None, 9000, 5000, None]:
+            make_car(make, price=None if price is None else Decimal(price))
+
+    def walk(self, sort, per_page=2):
+        keys = pagination.SORT_KEYS[sort]
+        paginator = pagination.KeysetPaginator(Car.objects.all(), keys, per_page)
+        page = paginator.first()
+        pages = [[c.pk for c in page]]
+        while page.has_next():
+            self.assertLess(len(pages), Car.objects.count(), "cursor does not advance")
+            page = paginator.page(page.next_cursor)
+            pages.append([c.pk for c in page])
+        return paginator, page, pages
+
+    def offset_ids(self, sort):
+        keys = pagination.SORT_KEYS[sort]
+        return list(Car.objects.order_by(*pagination.ordering_for(keys)).values_list("pk", flat=True))
+
+    def test_forward_cursors_match_offset_order_with_null_keys(self):
+        for sort in ("price", "-price"):
+            with self.subTest(sort=sort):
+                _, _, pages = self.walk(sort)
+                self.assertEqual([pk for ids in pages for pk in ids], self.offset_ids(sort))
+                self.assertTrue(all(len(ids) == 2 for ids in pages))
+
+    def test_previous_cursor_returns_the_page_before(self):
+        for sort in ("price", "-price"):
+            with self.subTest(sort=sort):
+                paginator, last, pages = self.walk(sort)
+                back = paginator.page(last.prev_cursor)
+                self.assertEqual([c.pk for c in back], pages[-2])
+                self.assertTrue(back.has_next())
+
+    def test_after_a_null_key_only_nulls_or_non_nulls_follow(self):
+        keys = pagination.SORT_KEYS["price"]
+        null_cars = list(Car.objects.filter(price__isnull=True).order_by("pk"))
+        first_null = null_cars[0]
+        after = Car.objects.filter(pagination._after(Car, keys, [None, first_null.pk]))
+        ids = self.offset_ids("price")
+        self.assertCountEqual(after.values_list("pk", flat=True), ids[ids.index(first_null.pk) + 1:])
+
+    def test_invalid_cursor_falls_back_to_numbered_page(self):
+        with self.assertRaises(pagination.InvalidCursor):
+            pagination.decode_cursor("not-a-cursor", pagination.SORT_KEYS["price"])
+        page = pagination.paginate(Car.objects.all(), "price", cursor="garbage", per_page=3)
+        self.assertFalse(page.cursor_mode)
+        self.assertEqual(page.number, 1)
+
+    def test_last_numbered_page_hands_over_to_a_cursor(self):
+        page = pagination.paginate(Car.objects.all(), "price", page=2, per_page=2, max_pages=2)
+        self.assertTrue(page.paginator.is_capped)
+        self.assertIsNotNone(page.next_cursor)
+        rest = pagination.paginate(Car.objects.all(), "price", cursor=page.next_cursor, per_page=2)
+        expected = Paginator(self.offset_ids("price"), 2).page(3).object_list
+        self.assertEqual([c.pk for c in rest], list(expected))
+
+
+class CarFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.toyota = Make.objects.create(name="Toyota")
+        cls.honda = Make.objects.create(name="Honda")
+        BodyType.objects.create(name="SUV")
+        BodyType.objects.create(name="Sedan")
+
+    def test_aliases_and_spellings_parse_to_one_filter(self):
+        home = CarFilter.from_params({
+            "trans": "auto", "max_price": "$20,000", "make": "Toyota", "body_type": ["SUV", "sedan"],
+            "featured": "on",
+        })
+        browse = CarFilter.from_params({
+            "transmission": "Automatic", "price_max": "20000.00", "make": "toyota",
+            "body_types": ["sedan", "suv"], "is_featured": True,
+        })
+        self.assertEqual(home, browse)
+        self.assertEqual(home.hash, browse.hash)
+        self.assertEqual(home.make, ("toyota",))
+        self.assertEqual(home.body_types, ("sedan", "suv"))
+        self.assertEqual(home.price_max, Decimal("20000.00"))
+
+    def test_partial_make_keeps_every_make_it_is_part_of(self):
+        make_car(self.toyota)
+        make_car(self.honda)
+        f = CarFilter.from_params({"make": "o"})
+        self.assertEqual(f.make, ("honda", "toyota"))
+        self.assertEqual(f.queryset().count(), 2)
+        self.assertEqual(CarFilter.from_params({"make": "Hon"}).make, ("honda",))
+        self.assertEqual(CarFilter.from_params({"make": "Tesla"}).queryset().count(), 0)
+
+    def test_querydict_and_dict_agree(self):
+        qd = QueryDict("q=Red+Corolla&body_type=SUV&body_type=Sedan&min_price=1000")
+        params = {"q": "red corolla", "body_types": ["Sedan", "SUV"], "price_min": 1000}
+        self.assertEqual(CarFilter.from_querydict(qd).hash, CarFilter.from_params(params).hash)
+
+    def test_invalid_values_are_dropped(self):
+        f = CarFilter.from_params({"price_min": "abc", "rating_min": "7", "fuel": "steam",
+                                   "mileage_max": "-5", "near": "999,0"})
+        self.assertFalse(f)
+        self.assertEqual(f.hash, CarFilter().hash)
+
+    def test_hash_changes_with_any_field_and_survives_a_round_trip(self):
+        f = CarFilter.from_params({"make": "honda", "price_max": "15000", "near": "39.7392,-104.9903"})
+        self.assertEqual(f.radius_km, 50.0)
+        self.assertEqual(CarFilter.from_params(f.to_params()), f)
+        self.assertNotEqual(CarFilter.from_params({"make": "honda", "price_max": "15001"}).hash, f.hash)
+
+    def test_apply_and_matches_agree(self):
+        cheap = make_car(self.toyota, model_name="Corolla", price=Decimal("9000"))
+        make_car(self.toyota, model_name="Camry", price=Decimal("30000"))
+        make_car(self.honda, model_name="Civic", price=Decimal("8000"))
+        f = CarFilter.from_params({"make": "toyota", "max_price": "10000"})
+        self.assertEqual(list(f.apply(Car.objects.all())), [cheap])
+        self.assertEqual([c for c in Car.objects.select_related("make") if f.matches(c)], [cheap])
+
+
+class ResultCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.toyota = Make.objects.create(name="Toyota")
+        cls.cars = [make_car(cls.toyota, price=Decimal(5000 + i)) for i in range(5)]
+
+    def setUp(self):
+        cache.clear()
+
+    def page(self, user=None, **params):
+        request = RequestFactory().get("/", params)
+        request.user = user or AnonymousUser()
+        page = result_cache.paginate(request, Car.objects.all(), CarFilter.from_params(params), "price",
+                                     namespace="test", per_page=2)
+        return [c.pk for c in page.object_list], page
+
+    def test_a_repeated_anonymous_page_is_one_hydrating_query(self):
+        first, _ = self.page(page="2")
+        with self.assertNumQueries(1):
+            again, cached = self.page(page="2")
+        self.assertEqual(again, first)
+        self.assertEqual(first, [c.pk for c in self.cars[2:4]])
+        self.assertEqual((cached.number, cached.paginator.count, cached.has_next()), (2, 5, True))
+        self.assertEqual({k: result_cache.stats()[k] for k in ("hits", "misses")}, {"hits": 1, "misses": 1})
+
+    def test_inventory_writes_drop_cached_pages(self):
+        self.page()
+        version = result_cache.inventory_version()
+        self.cars[0].delete()
+        self.assertNotEqual(result_cache.inventory_version(), version)
+        ids, page = self.page()
+        self.assertEqual(ids, [c.pk for c in self.cars[1:3]])
+        self.assertEqual(page.paginator.count, 4)
+
+    def test_signed_in_users_are_not_cached(self):
+        user = get_user_model().objects.create_user("alice")
+        self.page(user)
+        self.page(user)
+        self.assertEqual(result_cache.stats()["hits"] + result_cache.stats()["misses"], 0)
+
+
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_car(Make.objects.create(name="Toyota"), body_type=BodyType.objects.create(name="SUV"))
+
+    def test_catalogue_is_served_by_indexes(self):
+        out = StringIO()
+        call_command("check_query_plans", stdout=out)
+        self.assertNotIn("SEQ SCAN", out.getvalue())
+        self.assertEqual(out.getvalue().count("ok "), len(check_query_plans.CATALOGUE) + 1)
+
+    def test_an_unindexed_filter_is_reported(self):
+        command = check_query_plans.Command()
+        unindexed = Car.objects.filter(seller_name="Bob").order_by("title")
+        plan = command._explain(unindexed)
+        self.assertTrue(command._seq_scan(plan, Car._meta.db_table, connection.vendor))
+        command_cls = check_query_plans.Command
+        with mock.patch.object(command_cls, "_catalogue", lambda self, make, body: [("by seller", {}, "")]), \
+                mock.patch.object(command_cls, "_query", lambda self, kwargs, sort: unindexed):
+            with self.assertRaisesMessage(CommandError, "1 query regressed"):
+                call_command("check_query_plans", stdout=StringIO())
+
+
+class SuggestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.toyota = Make.objects.create(name="Toyota")
+        for model in ["Corolla", "Corolla", "Camry"]:
+            make_car(cls.toyota, model_name=model)
+
+    def setUp(self):
+        suggest.rebuild()
+        self.addCleanup(setattr, suggest, "_trie", None)
+
+    def labels(self, prefix):
+        return [r["label"] for r in suggest.suggest(prefix)]
+
+    def test_prefixes_rank_by_inventory(self):
+        self.assertEqual(self.labels("toyota c"), ["Toyota Corolla", "Toyota Camry"])
+        self.assertEqual(self.labels("cam"), ["Toyota Camry"])
+        self.assertEqual(self.labels("zzz"), [])
+
+    def test_stale_lookup_starts_a_refresh_without_touching_db_or_cache(self):
+        suggest.recheck()
+        with mock.patch.object(suggest, "_start_refresh") as start, \
+                mock.patch.object(result_cache, "inventory_version", side_effect=AssertionError), \
+                self.assertNumQueries(0):
+            for _ in range(3):
+                self.assertEqual(self.labels("toy")[0], "Toyota")
+        start.assert_called_once_with()
+
+    def test_refresh_rebuilds_only_after_a_foreign_write(self):
+        trie = suggest.refresh()
+        Car.objects.bulk_create([Car(make=self.toyota, title="Toyota car", model_name="Yaris")])   # no signals
+        self.assertIs(suggest.refresh(), trie)
+        result_cache.bump_inventory()
+        self.assertIsNot(suggest.refresh(), trie)
+        self.assertIn("Toyota Yaris", self.labels("yar"))
+
+    def test_saves_in_this_process_update_the_trie_in_place(self):
+        trie = suggest._current()
+        make_car(self.toyota, model_name="Supra")
+        self.assertIs(suggest._current(), trie)
+        self.assertIn("Toyota Supra", self.labels("sup"))
+
+
+class GeoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.make = Make.objects.create(name="Toyota")
+
+    def seller_at(self, lat, lng):
+        return make_car(self.make, seller_lat=Decimal(str(lat)), seller_lng=Decimal(str(lng)))
+
+    def near(self, lat, lng, radius_km):
+        f = CarFilter.from_params({"near": f"{lat},{lng}", "radius_km": radius_km})
+        return sorted(c.pk for c in f.apply(Car.objects.all()))
+
+    def test_parsing_rejects_and_clamps(self):
+        self.assertEqual(geo.parse_near("39.739236,-104.990251"), (39.73924, -104.99025))
+        for value in ("91,0", "0,181", "abc", "1,2,3", None):
+            with self.subTest(value=value):
+                self.assertIsNone(geo.parse_near(value))
+        self.assertEqual(geo.parse_radius("10000"), geo.MAX_RADIUS_KM)
+        for value in ("0", "-5", "nan", "inf", ""):
+            with self.subTest(value=value):
+                self.assertIsNone(geo.parse_radius(value))
+
+    def test_bbox_drops_longitude_near_the_poles(self):
+        self.assertEqual(geo.bbox(89.9, 10, 50)[2:], (None, None))
+        min_lat, max_lat, min_lng, max_lng = geo.bbox(0, 0, 111.195)
+        self.assertAlmostEqual(max_lat, 1, places=3)
+        self.assertAlmostEqual(max_lng, 1, places=3)
+
+    def test_radius_search_is_exact_and_wraps_the_antimeridian(self):
+        denver, boulder = self.seller_at(39.7392, -104.9903), self.seller_at(40.01499, -105.27055)
+        self.seller_at(38.8339, -104.8214)      # Colorado Springs, ~100 km south
+        self.assertEqual(self.near(39.7392, -104.9903, 50), [denver.pk, boulder.pk])
+        self.assertEqual(self.near(39.7392, -104.9903, 5), [denver.pk])
+        east, west = self.seller_at(-17.7, 179.95), self.seller_at(-17.7, -179.95)
+        self.assertEqual(self.near(-17.7, 179.99, 20), [east.pk, west.pk])
+
+    def test_save_stores_the_geohash(self):
+        car = self.seller_at(57.64911, 10.40744)
+        self.assertEqual(car.seller_geohash, "u4pruyd")
+        lat, lng = geo.decode_geohash(car.seller_geohash)
+        self.assertLess(geo.haversine_km(lat, lng, 57.64911, 10.40744), 0.1)
+        car.seller_lat = None
+        car.save()
+        self.assertEqual(car.seller_geohash, "")
+
+
+class MapTileTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.make = Make.objects.create(name="Toyota")
+
+    def setUp(self):
+        cache.clear()
+
+    def seller_at(self, lat, lng):
+        return make_car(self.make, seller_lat=Decimal(str(lat)), seller_lng=Decimal(str(lng)))
+
+    def tile_ids(self, z, x, y):
+        return sorted(f["id"] for f in map_tiles.build_tile(map_tiles.LAYERS["cars"], z, x, y))
+
+    def test_tiles_cover_the_bbox(self):
+        self.assertEqual(map_tiles.tiles_for_bbox(-180, -85, 180, 85, 1), [(0, 0), (0, 1), (1, 0), (1, 1)])
+        with self.assertRaises(ValueError):
+            map_tiles.tiles_for_bbox(-180, -85, 180, 85, 4, limit=map_tiles.MAX_TILES)
+        self.assertIsNone(map_tiles.parse_bbox("10,0,-10,5"))
+        self.assertEqual(map_tiles.parse_bbox("-200,-95,200,95"), (-180, -90, 180, 90))
+
+    def test_a_point_on_a_shared_edge_is_in_one_tile(self):
+        car = self.seller_at(0, 0)
+        self.assertEqual([(x, y) for x in (0, 1) for y in (0, 1) if self.tile_ids(1, x, y)], [(1, 0)])
+        self.assertEqual(self.tile_ids(1, 1, 0), [car.pk])
+
+    def test_points_on_the_top_and_east_map_edges_are_kept(self):
+        # stored with 6 decimals, MAX_LAT lands just north of the top row's edge
+        top_east = self.seller_at(map_tiles.MAX_LAT, 180)
+        bottom_west = self.seller_at(-map_tiles.MAX_LAT, -180)
+        polar = self.seller_at(89.5, 0)
+        for z in (0, 1, 3):
+            last = 2 ** z - 1
+            with self.subTest(z=z):
+                ids = [f["id"] for f in map_tiles.features_for_bbox(map_tiles.LAYERS["cars"], (-180, -90, 180, 90), z)]
+                self.assertEqual(sorted(ids), [top_east.pk, bottom_west.pk, polar.pk])
+                self.assertIn(top_east.pk, self.tile_ids(z, last, 0))
+                self.assertIn(bottom_west.pk, self.tile_ids(z, 0, last))
+
+    def test_dense_tiles_cluster_and_writes_refresh_them(self):
+        for i in range(map_tiles.POINT_LIMIT + 1):
+            self.seller_at(39.7 + i / 10000, -104.9)
+        layer = map_tiles.LAYERS["cars"]
+        features = map_tiles.features_for_bbox(layer, (-105, 39, -104, 40), 5)
+        self.assertEqual([f["properties"]["count"] for f in features], [map_tiles.POINT_LIMIT + 1])
+        with self.assertNumQueries(0):
+            map_tiles.features_for_bbox(layer, (-105, 39, -104, 40), 5)
+        Car.objects.first().delete()
+        features = map_tiles.features_for_bbox(layer, (-105, 39, -104, 40), 5)
+        self.assertEqual(len(features), map_tiles.POINT_LIMIT)
+
+
+class RatingSummaryTests(TestCase):
+    FIELDS = ("rating_count", "rating_sum", "star1", "star2", "star3", "star4", "star5",
+              "top_positive_id", "top_critical_id")
+
+    @classmethod
+    def setUpTestData(cls):
+        make = Make.objects.create(name="Toyota")
+        cls.car = make_car(make)
+        cls.other = make_car(make)
+        cls.users = [get_user_model().objects.create_user(f"reviewer{i}") for i in range(4)]
+
+    def review(self, user, rating, car=None, **fields):
+        return CarReview.objects.create(car=car or self.car, user=self.users[user], rating=rating, **fields)
+
+    def summary(self, car=None):
+        s = CarRatingSummary.objects.get(car=car or self.car)
+        return {f: getattr(s, f) for f in self.FIELDS}
+
+    def assertMatchesRebuild(self, car=None):
+        car = car or self.car
+        kept = self.summary(car)
+        rebuilt = ratings.rebuild(car.pk, bump=False)
+        self.assertEqual(kept, {f: getattr(rebuilt, f) for f in self.FIELDS})
+        car.refresh_from_db()
+        self.assertEqual(car.rating_count, rebuilt.rating_count)
+        self.assertEqual(car.rating_avg, rebuilt.rating_avg if rebuilt.rating_count else None)
+
+    def test_star_buckets_round_half_stars_down(self):
+        for rating, stars in [(5.0, 5), (4.5, 4), (3.0, 3), (2.5, 2), (1.0, 1), (0.5, 1)]:
+            with self.subTest(rating=rating):
+                self.assertEqual(ratings.star(rating), stars)
+
+    def test_creating_reviews_adds_to_the_summary(self):
+        best = self.review(0, 5.0)
+        self.review(1, 4.5)
+        worst = self.review(2, 1.0)
+        s = self.summary()
+        self.assertEqual((s["rating_count"], s["rating_sum"]), (3, 10.5))
+        self.assertEqual((s["star5"], s["star4"], s["star1"]), (1, 1, 1))
+        self.assertEqual((s["top_positive_id"], s["top_critical_id"]), (best.pk, worst.pk))
+        self.car.refresh_from_db()
+        self.assertEqual((self.car.rating_avg, self.car.rating_count), (3.5, 3))
+        self.assertMatchesRebuild()
+
+    def test_edits_hiding_and_moves_adjust_by_the_difference(self):
+        top = self.review(0, 5.0)
+        moved = self.review(1, 4.0)
+        low = self.review(2, 2.0)
+
+        top.rating = 3.5
+        top.save()
+        self.assertEqual(self.summary()["top_positive_id"], moved.pk)
+        self.assertMatchesRebuild()
+
+        low.status = False
+        low.save()
+        self.assertIsNone(self.summary()["top_critical_id"])
+        self.assertMatchesRebuild()
+
+        moved.car = self.other
+        moved.save()
+        self.assertEqual(self.summary()["top_positive_id"], top.pk)
+        self.assertEqual(self.summary(self.other)["top_positive_id"], moved.pk)
+        self.assertMatchesRebuild()
+        self.assertMatchesRebuild(self.other)
+
+        low.status = True
+        low.save()
+        self.assertEqual(self.summary()["top_critical_id"], low.pk)
+        self.assertMatchesRebuild()
+
+    def test_deleting_reviews_repicks_and_empties_the_summary(self):
+        top = self.review(0, 4.0)
+        runner_up = self.review(1, 3.0)
+        top.delete()
+        s = self.summary()
+        self.assertEqual((s["rating_count"], s["top_positive_id"]), (1, runner_up.pk))
+        self.assertMatchesRebuild()
+
+        runner_up.delete()
+        s = self.summary()
+        self.assertEqual((s["rating_count"], s["rating_sum"], s["top_positive_id"]), (0, 0.0, None))
+        self.car.refresh_from_db()
+        self.assertIsNone(self.car.rating_avg)
+        self.assertMatchesRebuild()
+
+
+class ReviewFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.car = make_car(Make.objects.create(name="Toyota"))
+        cls.users = [get_user_model().objects.create_user(f"reviewer{i}") for i in range(7)]
+        for i, user in enumerate(cls.users):
+            review = CarReview.objects.create(car=cls.car, user=user, rating=[5, 4, 4, 3, 5, 1, 4][i])
+            # ties on every sort key but id
+            CarReview.objects.filter(pk=review.pk).update(helpful_count=i % 3, created_at=review.car.created)
+
+    def walk(self, sort, limit=2):
+        url, ids, cursor = reverse("reviews_json", args=[self.car.pk]), [], ""
+        while True:
+            self.assertLess(len(ids), len(self.users), "cursor does not advance")
+            data = self.client.get(url, {"sort": sort, "limit": limit, "cursor": cursor}).json()
+            ids += [r["id"] for r in data["items"]]
+            cursor = data["next_cursor"]
+            if not cursor:
+                return ids
+
+    def test_cursor_pages_follow_each_sort(self):
+        reviews = CarReview.objects.filter(car=self.car)
+        for sort, keys in review_feed.SORTS.items():
+            with self.subTest(sort=sort):
+                expected = list(reviews.order_by(*pagination.ordering_for(keys)).values_list("pk", flat=True))
+                self.assertEqual(self.walk(sort), expected)
+
+    def test_a_page_costs_the_same_however_deep(self):
+        first = review_feed.page(self.car.pk, sort="helpful", per_page=2)
+        with self.assertNumQueries(1):
+            deeper = list(review_feed.page(self.car.pk, sort="helpful", cursor=first.next_cursor, per_page=2))
+        self.assertEqual(len(deeper), 2)
+
+    def test_a_foreign_cursor_restarts_at_the_top(self):
+        newest = review_feed.page(self.car.pk, sort="newest", per_page=2)
+        self.assertEqual(list(review_feed.page(self.car.pk, sort="newest", cursor="garbage", per_page=2)),
+                         list(newest))
+        helpful = review_feed.page(self.car.pk, sort="helpful", per_page=2)
+        self.assertEqual(list(review_feed.page(self.car.pk, sort="helpful", cursor=newest.next_cursor, per_page=2)),
+                         list(helpful))
+
+    def test_the_viewers_own_votes_are_annotated(self):
+        review = CarReview.objects.filter(car=self.car).first()
+        ReviewFeedback.objects.create(review=review, user=self.users[1], action=ReviewFeedback.ACTION_HELPFUL)
+        votes = {r.pk: (r.i_liked, r.i_reported) for r in review_feed.queryset(self.car.pk, self.users[1])}
+        self.assertEqual(votes.pop(review.pk), (True, False))
+        self.assertEqual(set(votes.values()), {(False, False)})
+
+
+class ReviewVoteCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.author, cls.voter, cls.other_voter = (User.objects.create_user(n) for n in ("author", "voter", "voter2"))
+        cls.review = CarReview.objects.create(car=make_car(Make.objects.create(name="Toyota")),
+                                              user=cls.author, rating=4.0)
+
+    def counts(self):
+        return tuple(CarReview.objects.filter(pk=self.review.pk).values_list("helpful_count", "report_count").get())
+
+    def vote(self, user, action):
+        return ReviewFeedback.objects.create(review=self.review, user=user, action=action)
+
+    def test_feedback_moves_its_own_counter(self):
+        helpful = self.vote(self.voter, ReviewFeedback.ACTION_HELPFUL)
+        self.vote(self.other_voter, ReviewFeedback.ACTION_HELPFUL)
+        report = self.vote(self.voter, ReviewFeedback.ACTION_REPORT)
+        self.assertEqual(self.counts(), (2, 1))
+        helpful.delete()
+        report.delete()
+        self.assertEqual(self.counts(), (1, 0))
+
+    def test_removal_never_goes_below_zero(self):
+        report = self.vote(self.voter, ReviewFeedback.ACTION_REPORT)
+        CarReview.objects.filter(pk=self.review.pk).update(report_count=0)   # drifted
+        report.delete()
+        self.assertEqual(self.counts(), (0, 0))
+
+    def test_stale_review_save_keeps_the_counters(self):
+        stale = CarReview.objects.get(pk=self.review.pk)
+        self.vote(self.voter, ReviewFeedback.ACTION_HELPFUL)
+        stale.subject = "Edited"
+        stale.save()
+        self.assertEqual(self.counts(), (1, 0))
+        self.assertEqual(CarReview.objects.get(pk=self.review.pk).subject, "Edited")
+
+    def test_reconcile_repairs_drift(self):
+        self.vote(self.voter, ReviewFeedback.ACTION_HELPFUL)
+        CarReview.objects.filter(pk=self.review.pk).update(helpful_count=7, report_count=3)
+        out = StringIO()
+        call_command("reconcile_review_counters", "--dry-run", stdout=out)
+        self.assertIn("Found 1 drifted", out.getvalue())
+        self.assertEqual(self.counts(), (7, 3))
+        call_command("reconcile_review_counters", stdout=StringIO())
+        self.assertEqual(self.counts(), (1, 0))
+
+
+class SellerLinkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.make = Make.objects.create(name="Toyota")
+
+    def linked(self, car):
+        return Car.objects.values_list("seller_user_id", flat=True).get(pk=car.pk)
+
+    def test_links_follow_both_sides(self):
+        car = make_car(self.make, seller_email=" Bob@Example.com")
+        self.assertIsNone(car.seller_user_id)
+        User = get_user_model()
+        bob = User.objects.create_user("bob", email="bob@example.com")
+        self.assertEqual(self.linked(car), bob.pk)
+        User.objects.create_user("bob2", email="BOB@example.com")
+        self.assertEqual(self.linked(car), bob.pk, "the oldest account wins")
+        bob.email = "robert@example.com"
+        bob.save()
+        self.assertEqual(self.linked(car), User.objects.get(username="bob2").pk)
+        car.seller_email = "robert@example.com"
+        car.save()
+        self.assertEqual(self.linked(car), bob.pk)
+
+    def test_link_command_repairs_bulk_updates(self):
+        bob = get_user_model().objects.create_user("bob", email="bob@example.com")
+        car = make_car(self.make)
+        Car.objects.filter(pk=car.pk).update(seller_email="bob@example.com")
+        out = StringIO()
+        call_command("link_car_sellers", stdout=out)
+        self.assertIn("Relinked 1 car(s)", out.getvalue())
+        self.assertEqual(self.linked(car), bob.pk)
+
+    def test_detail_page_reads_the_seller_through_the_car_row(self):
+        bob = get_user_model().objects.create_user("bob", email="bob@example.com")
+        SellerProfile.objects.create(user=bob, verification_status="APPROVED")
+        car = make_car(self.make, seller_email="bob@example.com")
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("car_detail", args=[car.pk]))
+        self.assertContains(response, 'aria-label="Trusted"')
+        user_table = get_user_model()._meta.db_table
+        self.assertEqual([q["sql"] for q in ctx.captured_queries if f'FROM "{user_table}"' in q["sql"]], [])
+
+
+class DetailCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.make = Make.objects.create(name="Toyota")
+        cls.car = make_car(cls.make)
+        cls.user = get_user_model().objects.create_user("alice")
+        CarReview.objects.create(car=cls.car, user=cls.user, rating=4.0, subject="Solid commuter")
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("car_detail", args=[self.car.pk]))
+        tables = {t for q in ctx.captured_queries for t in ("models_carimage", "models_carreview") if t in q["sql"]}
+        return response, tables
+
+    def test_a_repeat_anonymous_view_skips_the_shared_queries(self):
+        first, tables = self.get()
+        self.assertEqual(tables, {"models_carimage", "models_carreview"})
+        again, tables = self.get()
+        self.assertEqual(tables, set())
+        self.assertContains(again, "Solid commuter")
+
+    def test_writes_move_the_cached_fragments(self):
+        self.get()
+        review = CarReview.objects.get()
+        review.subject = "Great on fuel"
+        review.save()
+        self.assertContains(self.get()[0], "Great on fuel")
+        self.make.name = "Lexus"
+        self.make.save()
+        self.assertContains(self.get()[0], "<strong>Make:</strong> Lexus", html=False)
+
+    def test_signed_in_viewers_get_their_own_review_feed(self):
+        self.get()
+        self.client.force_login(self.user)
+        _, tables = self.get()
+        self.assertIn("models_carreview", tables)
+
+
+class CarApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make = Make.objects.create(name="Toyota")
+        cls.cars = [make_car(make, price=Decimal(1000 * (i + 1))) for i in range(3)]
+        for car in cls.cars:
+            CarImage.objects.bulk_create([CarImage(car=car, image=f"cars/gallery/{car.pk}-{n}.jpg") for n in range(2)])
+
+    def get(self, **params):
+        return self.client.get(reverse("cars_json"), params)
+
+    def test_cars_come_back_in_request_order_with_only_the_asked_fields(self):
+        a, b, c = self.cars
+        data = self.get(ids=f"{c.pk},{a.pk},999999,{c.pk}", fields="price,make").json()
+        self.assertEqual(data["cars"], [{"id": c.pk, "price": 3000.0, "make": "Toyota"},
+                                        {"id": a.pk, "price": 1000.0, "make": "Toyota"}])
+        self.assertEqual(data["missing"], [999999])
+
+    def test_a_batch_costs_two_queries_however_many_cars(self):
+        ids = ",".join(str(c.pk) for c in self.cars)
+        with self.assertNumQueries(2):
+            data = self.get(ids=ids, fields="title,images").json()
+        self.assertEqual([len(c["images"]) for c in data["cars"]], [2, 2, 2])
+        with CaptureQueriesContext(connection) as ctx:
+            self.get(ids=ids, fields="title")
+        self.assertEqual(len(ctx), 1)
+        self.assertNotIn('"models_car"."overview"', ctx.captured_queries[0]["sql"])
+
+    def test_bad_requests_are_rejected(self):
+        ids = ",".join(str(i) for i in range(1, car_api.MAX_IDS + 2))
+        for params in ({"ids": ids}, {"ids": "1", "fields": "title,password"}):
+            with self.subTest(params=params):
+                self.assertEqual(self.get(**params).status_code, 400)
+        self.assertEqual(self.get().json(), {"ok": True, "cars": [], "missing": []})
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.car = make_car(Make.objects.create(name="Toyota"), seller_lat=Decimal("39.7392"),
+                           seller_lng=Decimal("-104.9903"))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_unchanged_car_detail_is_a_304_before_the_view_runs(self):
+        url = reverse("car_detail", args=[self.car.pk])
+        etag = self.client.get(url)["ETag"]
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        CarReview.objects.create(car=self.car, user=get_user_model().objects.create_user("alice"), rating=5.0)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_visitors_with_a_session_get_no_validators(self):
+        self.client.force_login(get_user_model().objects.create_user("alice"))
+        response = self.client.get(reverse("car_detail", args=[self.car.pk]))
+        self.assertFalse(response.has_header("ETag"))
+        self.assertFalse(response.has_header("Last-Modified"))
+
+    def test_review_feed_validator_varies_on_the_query(self):
+        url = reverse("reviews_json", args=[self.car.pk])
+        etag = self.client.get(url, {"sort": "newest"})["ETag"]
+        self.assertEqual(self.client.get(url, {"sort": "newest"}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(url, {"sort": "helpful"}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_car_row_endpoints_follow_car_updated(self):
+        url = reverse("car_geo", args=[self.car.pk])
+        stamp = self.client.get(url)["Last-Modified"]
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=stamp).status_code, 304)
+        Car.objects.filter(pk=self.car.pk).update(updated=self.car.updated + timedelta(seconds=5))
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=stamp).status_code, 200)
+
+    def test_dealer_feeds_move_on_dealer_writes(self):
+        Dealer.objects.create(name="Front Range Autos", lat=Decimal("40.0"), lng=Decimal("-105.2"))
+        dealer = Dealer.objects.create(name="Mile High Motors", lat=Decimal("39.7"), lng=Decimal("-104.9"))
+        for name in ("dealers_json", "dealers_geojson"):
+            with self.subTest(name=name):
+                etag = self.client.get(reverse(name))["ETag"]
+                self.assertEqual(self.client.get(reverse(name), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        etag = self.client.get(reverse("dealers_json"))["ETag"]
+        dealer.delete()
+        self.assertEqual(self.client.get(reverse("dealers_json"), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+@skipUnless(similar.np is not None, "numpy is not installed")
+class SimilarCarsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        toyota, honda = Make.objects.create(name="Toyota"), Make.objects.create(name="Honda")
+        cls.cars = [
+            make_car(toyota if i % 3 else honda, price=Decimal(8000 + 1750 * i), mileage=5000 + 3100 * i,
+                     fuel="Petrol" if i % 2 else "Hybrid")
+            for i in range(12)
+        ]
+
+    def neighbours(self, car):
+        return CarSimilarity.objects.get(car=car).neighbor_ids
+
+    def brute_force(self, car):
+        ids, X = similar.encode()
+        row = ids.tolist().index(car.pk)
+        d = ((X - X[row]) ** 2).sum(axis=1)
+        d[row] = float("inf")
+        return ids[d.argsort(kind="stable")[:similar.K]].tolist()
+
+    def test_full_build_finds_the_k_nearest(self):
+        stats = similar.refresh(full=True)
+        self.assertEqual((stats["cars"], stats["written"]), (12, 12))
+        for car in self.cars:
+            with self.subTest(car=car.pk):
+                self.assertEqual(self.neighbours(car), self.brute_force(car))
+
+    def test_incremental_refresh_adds_new_cars_where_they_are_closer(self):
+        similar.refresh(full=True)
+        twin = make_car(self.cars[4].make, price=self.cars[4].price + 1, mileage=self.cars[4].mileage + 1,
+                        fuel=self.cars[4].fuel)
+        stats = similar.refresh()
+        self.assertEqual(stats["stale"], 1)
+        self.assertGreater(stats["displaced"], 0)
+        self.assertEqual(self.neighbours(self.cars[4])[0], twin.pk)
+        self.assertEqual(self.neighbours(twin)[0], self.cars[4].pk)
+        self.assertEqual(similar.refresh()["written"], 0)
+
+    def test_reading_skips_deleted_neighbours(self):
+        similar.refresh(full=True)
+        gone = self.neighbours(self.cars[0])[0]
+        Car.objects.filter(pk=gone).delete()
+        with self.assertNumQueries(2):
+            shown = similar.similar_cars(self.cars[0].pk, limit=3)
+        self.assertEqual([c.pk for c in shown], self.neighbours(self.cars[0])[1:4])
+
+
+class FinanceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make = Make.objects.create(name="Toyota")
+        for price in [30000, None, 12000, 8000, 20000, 12000, 45000]:
+            make_car(make, price=None if price is None else Decimal(price))
+
+    def test_factor(self):
+        self.assertEqual(finance.factor(Decimal("0"), 48), Decimal(1) / 48)
+        terms = finance.Terms(apr=Decimal("6"), term=60)
+        self.assertEqual(terms.monthly(10000), Decimal("193.33"))
+        self.assertEqual(finance.Terms(down=Decimal("12000")).monthly(10000), Decimal("0.00"))
+        with self.assertRaises(ValueError):
+            finance.factor(Decimal("5"), 0)
+
+    def test_from_querydict_clamps(self):
+        cases = [
+            ("", finance.Terms()),
+            ("down=-500&apr=250&term=999", finance.Terms(Decimal(0), finance.MAX_APR, finance.MAX_TERM)),
+            ("apr=-1&term=0", finance.Terms(apr=Decimal(0), term=finance.MIN_TERM)),
+            ("down=abc&apr=NaN&term=36.9", finance.Terms(term=36)),
+            ("down=2500&apr=4.9&term=72", finance.Terms(Decimal("2500"), Decimal("4.9"), 72)),
+        ]
+        for query, expected in cases:
+            with self.subTest(query=query):
+                self.assertEqual(finance.Terms.from_querydict(QueryDict(query)), expected)
+        self.assertEqual(finance.Terms.from_querydict(QueryDict(""), term=36).term, 36)
+
+    def test_offers_sql_matches_python_and_respects_the_budget(self):
+        terms = finance.Terms(down=Decimal("2000"), apr=Decimal("7.5"), term=60)
+        budget = terms.monthly(20000)
+        cars = list(finance.offers(Car.objects.all(), terms, max_monthly=budget).order_by("price", "id"))
+        self.assertEqual([c.price for c in cars], [Decimal(p) for p in (8000, 12000, 12000, 20000)])
+        for car in cars:
+            self.assertLessEqual(terms.monthly(car.price), budget)
+            self.assertEqual(car.principal, car.price - terms.down)
+            self.assertEqual(Decimal(car.monthly).quantize(finance.CENT), terms.monthly(car.price))
+        self.assertGreater(terms.monthly(terms.max_price(budget) + 1), budget)
+        self.assertEqual(finance.offers(Car.objects.all(), terms).count(), 6)
+
+    def test_offers_page_by_cursor_cheapest_monthly_first(self):
+        terms = finance.Terms(apr=Decimal("5"), term=48)
+        qs = finance.offers(Car.objects.all(), terms)
+        page = pagination.paginate(qs, "price", per_page=2, max_pages=1)
+        monthly = [c.monthly for c in page]
+        while page.next_cursor:
+            self.assertLess(len(monthly), qs.count(), "cursor does not advance")
+            page = pagination.paginate(qs, "price", cursor=page.next_cursor, per_page=2)
+            monthly += [c.monthly for c in page]
+        self.assertEqual(len(monthly), 6)
+        self.assertEqual(monthly, sorted(monthly))
+
+
+class FinanceGridTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.car = make_car(Make.objects.create(name="Toyota"), price=Decimal("20000"))
+
+    def test_matrix_agrees_with_terms(self):
+        downs, aprs, months = finance.grid_axes(QueryDict("downs=0,5000&aprs=0,6&terms=36,60"),
+                                                Decimal("20000"), finance.Terms())
+        grid = finance.matrix(Decimal("20000"), downs, aprs, months)
+        for i, down in enumerate(downs):
+            for j, apr in enumerate(aprs):
+                for k, term in enumerate(months):
+                    self.assertEqual(grid[i][j][k], finance.Terms(down, apr, term).monthly(Decimal("20000")))
+        with self.assertRaises(ValueError):
+            finance.grid_axes(QueryDict("aprs=abc"), Decimal("20000"), finance.Terms())
+
+    def test_grid_endpoint_defaults_around_the_calculator(self):
+        url = reverse("car_finance_json", args=[self.car.pk])
+        with self.assertNumQueries(2):      # Last-Modified, then the price
+            data = self.client.get(url, {"down": "3000", "apr": "6"}).json()
+        self.assertIn(3000.0, data["downs"])
+        self.assertIn(6.0, data["aprs"])
+        self.assertEqual(data["terms"], list(finance.GRID_TERMS))
+        i, j, k = data["downs"].index(3000.0), data["aprs"].index(6.0), data["terms"].index(60)
+        terms = finance.Terms(Decimal(3000), Decimal(6), 60)
+        self.assertEqual(data["monthly"][i][j][k], float(terms.monthly(self.car.price)))
+
+    def test_grid_endpoint_rejects_bad_or_huge_grids(self):
+        url = reverse("car_finance_json", args=[self.car.pk])
+        downs = ",".join(str(n) for n in range(0, 20000, 100))     # x 5 aprs x 73 terms > MAX_CELLS
+        for params in ({"aprs": "abc"}, {"downs": "25000"}, {"downs": downs}):
+            with self.subTest(params=list(params)):
+                self.assertEqual(self.client.get(url, params).status_code, 400)
+        self.assertEqual(self.client.get(reverse("car_finance_json", args=[999999])).status_code, 404)
+
+
+@override_settings(REQUEST_PROFILING=True,
+                   MIDDLEWARE=["automart.middleware.QueryBudgetMiddleware", *settings.MIDDLEWARE])
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make = Make.objects.create(name="Toyota")
+        cls.cars = [make_car(make) for _ in range(3)]
+
+    def test_responses_carry_server_timing(self):
+        response = self.client.get(reverse("car_json", args=[self.cars[0].pk]))
+        self.assertRegex(response["Server-Timing"],
+                         r'^db;dur=[\d.]+;desc="2 queries", tpl;dur=[\d.]+, total;dur=[\d.]+$')
+        self.assertRegex(self.client.get(reverse("home"))["Server-Timing"], r"tpl;dur=(?!0\.0,)")
+
+    def test_over_budget_requests_log_their_repeated_sql(self):
+        def n_plus_one(request):
+            return HttpResponse(",".join(c.make.name for c in Car.objects.all()))
+
+        middleware = QueryBudgetMiddleware(n_plus_one)
+        middleware.budgets["*"] = (2, None)
+        with self.assertLogs("automart.budget", "WARNING") as logs:
+            middleware(RequestFactory().get("/n+1/"))
+        self.assertIn("4 > 2 queries", logs.output[0])
+        self.assertIn("3x", logs.output[0])
+        self.assertIn('FROM "models_make" WHERE "models_make"."id" = %s', logs.output[0])
+
+    def test_within_budget_is_quiet(self):
+        with self.assertNoLogs("automart.budget"):
+            self.client.get(reverse("car_json", args=[self.cars[0].pk]))
+
+    def test_fingerprint_collapses_literals_and_in_lists(self):
+        self.assertEqual(fingerprint("SELECT * FROM t WHERE a = 'x''y' AND b IN (%s, %s, %s) LIMIT 21"),
+                         "SELECT * FROM t WHERE a = ? AND b IN (...) LIMIT ?")
+
+    @override_settings(REQUEST_PROFILING=False)
+    def test_off_by_default(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            QueryBudgetMiddleware(lambda request: HttpResponse())
+        self.assertFalse(self.client.get(reverse("car_json", args=[self.cars[0].pk])).has_header("Server-Timing"))
+
+
+class SessionIdsTests(TestCase):
+    def session(self, **data):
+        session = CacheSession()
+        session.update(data)
+        session.modified = False
+        return session
+
+    def test_reads_legacy_string_ids_and_cart_rows(self):
+        session = self.session(
+            wishlist_ids=["3", "1", "3", "junk", None],
+            cart=[{"id": 7, "title": "Corolla"}, {"pid": "9"}, {"price": 100}],
+        )
+        self.assertEqual(session_ids.get_ids(session, "wishlist_ids"), [3, 1])
+        self.assertEqual(session_ids.get_ids(session, "cart"), [7, 9])
+        self.assertEqual(session_ids.get_ids(session, "compare_ids"), [])
+        self.assertFalse(session.modified)
+
+        session_ids.set_ids(session, "cart", session_ids.get_ids(session, "cart"))
+        self.assertEqual(session["cart"], [7, 9])    # rewritten compactly
+
+    def test_unchanged_lists_leave_the_session_clean(self):
+        session = self.session(compare_ids=[1, 2])
+        session_ids.set_ids(session, "compare_ids", ["1", 2])
+        session_ids.set_ids(session, "wishlist_ids", [])
+        self.assertFalse(session.modified)
+        self.assertNotIn("wishlist_ids", session)
+
+    def test_get_ids_returns_a_copy(self):
+        session = self.session(wishlist_ids=[1])
+        session_ids.get_ids(session, "wishlist_ids").append(2)
+        self.assertEqual(session_ids.get_ids(session, "wishlist_ids"), [1])
+
+    def test_toggle_respects_the_limit(self):
+        session = self.session(compare_ids=[1, 2])
+        self.assertEqual(session_ids.toggle(session, "compare_ids", 3, limit=2), ([1, 2], None))
+        self.assertFalse(session.modified)
+        self.assertEqual(session_ids.toggle(session, "compare_ids", 1, limit=2), ([2], False))
+        self.assertEqual(session_ids.toggle(session, "compare_ids", 3, limit=2), ([2, 3], True))
+        self.assertEqual(session["compare_ids"], [2, 3])
+
+    def test_set_value(self):
+        session = self.session(currency="USD")
+        session_ids.set_value(session, "currency", "USD")
+        self.assertFalse(session.modified)
+        session_ids.set_value(session, "theme", "auto", default="auto")
+        self.assertNotIn("theme", session)
+        self.assertFalse(session.modified)
+        session_ids.set_value(session, "theme", "dark", default="auto")
+        session_ids.set_value(session, "theme", "auto", default="auto")
+        self.assertNotIn("theme", session)
+        self.assertTrue(session.modified)
+
+
+@override_settings(SESSION_DB_WRITE_INTERVAL=60)
+class SessionStoreTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.counter = bench.WriteCounter("django_session")
+        self.enterContext(connection.execute_wrapper(self.counter))
+        session = SessionStore()
+        session["wishlist_ids"] = [1]
+        session.save()
+        self.key = session.session_key
+
+    def visit(self, **changes):
+        session = SessionStore(self.key)
+        session.update(changes)
+        if changes:
+            session.modified = True
+        session.save()
+        return session
+
+    def stored(self):
+        row = SessionStore.get_model_class().objects.get(session_key=self.key)
+        return SessionStore().decode(row.session_data)
+
+    def test_new_session_is_written_at_once(self):
+        self.assertEqual(self.counter.total, 1)
+        self.assertEqual(self.stored(), {"wishlist_ids": [1]})
+
+    def test_preference_changes_are_coalesced(self):
+        for i in range(2, 12):
+            self.visit(wishlist_ids=list(range(1, i)), currency="EUR")
+        self.assertEqual(self.counter.total, 1)
+        self.assertEqual(SessionStore(self.key)["wishlist_ids"], list(range(1, 11)))
+        self.assertEqual(self.stored(), {"wishlist_ids": [1]})
+
+    def test_unchanged_save_is_dropped(self):
+        self.visit()
+        self.visit(wishlist_ids=[1])
+        self.assertEqual(self.counter.total, 1)
+
+    def test_login_is_written_at_once(self):
+        self.visit(_auth_user_id="5")
+        self.assertEqual(self.counter.total, 2)
+        self.assertEqual(self.stored()["_auth_user_id"], "5")
+
+    @override_settings(SESSION_DB_WRITE_INTERVAL=0)
+    def test_due_interval_reaches_the_database(self):
+        self.visit(currency="EUR")
+        self.assertEqual(self.counter.total, 2)
+        self.assertEqual(self.stored()["currency"], "EUR")
+
+    def test_cache_loss_falls_back_to_the_database(self):
+        self.visit(_auth_user_id="5", currency="EUR")
+        cache.clear()
+        session = SessionStore(self.key)
+        self.assertEqual(session["_auth_user_id"], "5")
+        self.assertEqual(session["currency"], "EUR")
+        self.assertIsNotNone(cache.get(session.cache_key))
@@ -0,0 +1,41 @@
+# models/versions.py
+"""
+Version counters kept in the cache, for keys that must change on writes.
+
+The listing result cache, car_detail fragments, map tiles, the navbar and
+the saved-search filters embed one of these in their cache keys; bumping
+it makes every old entry unreachable, and they expire on their own TTL.
+
+Counters are seeded from the clock rather than 1, so a flushed cache
+never hands out a version (or an ETag built on it) that was already used
+for different content.
+"""
+import time
+
+from django.core.cache import cache
+
+
+def _seed() -> int:
+    return int(time.time() * 1000)
+
+
+def get(key) -> int:
+    return cache.get_or_set(key, _seed, None)
+
+
+def get_many(keys) -> dict:
+    """{key: version} for all `keys`, seeding the missing ones in one write."""
+    found = cache.get_many(keys)
+    missing = {key: _seed() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return found
+
+
+def bump(*keys) -> None:
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _seed(), None)
@@ -1,29 +1,35 @@
 # views.py (full corrected)
 
-from decimal import Decimal, InvalidOperation
 from types import SimpleNamespace
 import re
 
 from django.conf import settings
 from django.contrib import messages
-from django.contrib.auth import authenticate, login, get_user_model
+from django.contrib.auth import authenticate, login
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import ValidationError
 from django.core.mail import send_mail, EmailMessage
-from django.core.paginator import Paginator
 from django.core.validators import validate_email
-from django.db.models import Count, Q, Exists, OuterRef
+from django.db import transaction
 from django.http import (
-    JsonResponse, Http404, HttpResponseBadRequest, HttpResponseRedirect
+    HttpResponse, JsonResponse, Http404, HttpResponseBadRequest, HttpResponseRedirect
 )
 from django.shortcuts import render, get_object_or_404, redirect
+from django.template.loader import render_to_string
 from django.urls import reverse
+from django.utils.functional import SimpleLazyObject
 from django.utils.translation import gettext as _
 from django.views.decorators.csrf import ensure_csrf_cookie
-from django.views.decorators.http import require_GET, require_POST, require_http_methods
+from django.views.decorators.http import condition, require_GET, require_POST, require_http_methods
 
 from marketplace.models import SellerProfile
 from . import models as m
+from . import (
+    car_api, conditional, detail_cache, facets, finance, pagination, result_cache, review_feed, session_ids, similar,
+    suggest,
+)
+from .filters import CarFilter
 from .forms import SignUpForm, TestDriveForm
 from .models import Car
 
@@ -54,60 +60,22 @@ def index(request):
     )
 
     # ---------- Filters (hero + sidebar) ----------
-    make_slug = request.GET.get("make")
-    if make_slug:
-        cars_qs = cars_qs.filter(make__slug=make_slug)
-
-    model = request.GET.get("model")
-    if model:
-        cars_qs = cars_qs.filter(model_name__icontains=model)
-
-    location = request.GET.get("location")
-    if location:
-        cars_qs = cars_qs.filter(seller_meta__icontains=location)
-
-    max_price = request.GET.get("max_price")
-    if max_price:
-        try:
-            cars_qs = cars_qs.filter(price__lte=float(max_price))
-        except ValueError:
-            pass
-
-    min_price = request.GET.get("min_price")
-    if min_price:
-        try:
-            cars_qs = cars_qs.filter(price__gte=float(min_price))
-        except ValueError:
-            pass
-
-    body_slugs = request.GET.getlist("body_types")
-    if body_slugs:
-        cars_qs = cars_qs.filter(body_type__slug__in=body_slugs)
-
-    fuel = request.GET.get("fuel")
-    if fuel:
-        cars_qs = cars_qs.filter(fuel=fuel)
-
-    transmission = request.GET.get("transmission")
-    if transmission:
-        cars_qs = cars_qs.filter(transmission=transmission)
-
-    if request.GET.get("featured") == "1":
-        cars_qs = cars_qs.filter(is_featured=True)
-
-    # ---------- Sorting ----------
+    # one canonical spec shared with browse_listings, saved searches and facets
+    car_filter = CarFilter.from_querydict(request.GET)
     sort = request.GET.get("sort")
-    if sort in {"-created", "price", "-price", "mileage"}:
-        cars_qs = cars_qs.order_by(sort)
+    if sort not in pagination.SORT_KEYS or (sort == "distance" and not car_filter.near):
+        sort = None
 
-    # ---------- Pagination ----------
-    paginator = Paginator(cars_qs, 12)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    # ---------- Sorting + pagination ----------
+    # numbered pages up to pagination.MAX_PAGES, then keyset cursors;
+    # anonymous pages come from the versioned result cache
+    page_obj = result_cache.paginate(request, cars_qs, car_filter, sort, namespace="cars")
+    paginator = page_obj.paginator
 
-    # Build querystring for pagination (keep filters, drop page)
+    # Build querystring for pagination (keep filters, drop page/cursor)
     qs = request.GET.copy()
     qs.pop("page", None)
+    qs.pop("cursor", None)
     querystring = qs.urlencode()
 
     # ---------- Active car & seller image ----------
@@ -122,42 +90,62 @@ def index(request):
     else:
         userprofile = None
 
+    # ---------- Facet counts (one grouped query, cached) ----------
+    facet_counts = facets.get_counts(car_filter)
+    makes = list(m.Make.objects.all())
+    for mk in makes:
+        mk.facet_count = facet_counts["make"].get(mk.slug, 0)
+    body_types = list(m.BodyType.objects.all())
+    for bt in body_types:
+        bt.facet_count = facet_counts["body_type"].get(bt.slug, 0)
+
     context = {
         "hero_slides": hero_slides,
         "featured_cars": featured_cars,
         "cars": page_obj.object_list,
-        "is_paginated": page_obj.has_other_pages(),
+        "is_paginated": page_obj.has_other_pages() or bool(page_obj.next_cursor),
         "paginator": paginator,
         "page_obj": page_obj,
         "querystring": querystring,
         "sort": sort,
-        "makes": m.Make.objects.all(),
+        "makes": makes,
         "userprofile": userprofile,
-        "body_types": m.BodyType.objects.all(),
-        # Choice tuples: (code, label) → template shows translated label but submits code
+        "body_types": body_types,
+        # Choice tuples: (code, label, count) → template shows translated label but submits code
         "fuel_choices": [
-            ("Petrol", _("Petrol")),
-            ("Diesel", _("Diesel")),
-            ("Hybrid", _("Hybrid")),
-            ("Electric", _("Electric")),
+            (code, label, facet_counts["fuel"].get(code, 0))
+            for code, label in [
+                ("Petrol", _("Petrol")),
+                ("Diesel", _("Diesel")),
+                ("Hybrid", _("Hybrid")),
+                ("Electric", _("Electric")),
+            ]
         ],
         "transmission_choices": [
-            ("Automatic", _("Automatic")),
-            ("Manual", _("Manual")),
-            ("CVT", _("CVT")),
+            (code, label, facet_counts["transmission"].get(code, 0))
+            for code, label in [
+                ("Automatic", _("Automatic")),
+                ("Manual", _("Manual")),
+                ("CVT", _("CVT")),
+            ]
         ],
+        "facets": facet_counts,
         "active_car": active_car,
         "seller_image": seller_image,
         "q": {
-            "make": make_slug or "",
-            "model": model or "",
-            "location": location or "",
-            "min_price": min_price or "",
+            "q": (request.GET.get("q") or "").strip(),
+            "make": request.GET.get("make") or "",
+            "model": request.GET.get("model") or "",
+            "location": request.GET.get("location") or "",
+            "min_price": request.GET.get("min_price") or "",
             "max_price": request.GET.get("max_price") or "",
-            "body_types": body_slugs,
-            "fuel": fuel or "",
-            "transmission": transmission or "",
+            "body_types": request.GET.getlist("body_types"),
+            "fuel": car_filter.fuel,
+            "transmission": car_filter.transmission,
             "featured": request.GET.get("featured", ""),
+            "near": (request.GET.get("near") or "").strip() if car_filter.near else "",
+            "radius_km": car_filter.radius_km or "",
+            "rating_min": car_filter.rating_min or "",
         },
         "quick_chips": [
             {"title": _("New arrivals")},
@@ -170,6 +158,47 @@ def index(request):
     return render(request, "index.html", context)
 
 
+@require_GET
+def facets_json(request):
+    """Sidebar counts for the current filter set (same params as the home page)."""
+    return JsonResponse({"ok": True, **facets.get_counts(CarFilter.from_querydict(request.GET))})
+
+
+@require_GET
+def suggest_json(request):
+    """Make/model typeahead from the in-process trie (models/suggest.py); no DB on the hot path."""
+    q = (request.GET.get("q") or "")[:64]
+    kind = request.GET.get("kind")
+    try:
+        limit = min(max(int(request.GET.get("limit", 8)), 1), suggest.TOP_K)
+    except ValueError:
+        limit = 8
+    results = suggest.suggest(q, kind=kind if kind in ("make", "model") else None, limit=limit)
+    return JsonResponse({"ok": True, "q": q, "results": results})
+
+
+@require_GET
+def cars_json(request):
+    """Many cars in one round trip: ?ids=1,2,3&fields=title,price,cover (models/car_api.py)."""
+    try:
+        ids = car_api.parse_ids(request.GET.get("ids"))
+        fields = car_api.parse_fields(request.GET.get("fields"))
+    except ValueError as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=400)
+    payload = {"ok": True, **car_api.cars(ids, fields)} if ids else {"ok": True, "cars": [], "missing": []}
+    return HttpResponse(car_api.dumps(payload), content_type="application/json")
+
+
+@staff_member_required
+@require_GET
+def listing_cache_stats(request):
+    """Hit rate and hydration time of the anonymous listing cache (?reset=1 zeroes it)."""
+    data = result_cache.stats()
+    if request.GET.get("reset") == "1":
+        result_cache.reset_stats()
+    return JsonResponse({"ok": True, **data})
+
+
 # ---- wishlist page ----
 def wishlist_page(request):
     ids = _session_ids(request, "wishlist_ids")
@@ -191,15 +220,7 @@ def nav_counters(request):
 def toggle_wishlist(request, pk):
     get_object_or_404(m.Car, pk=pk)
 
-    ids = _session_ids(request, "wishlist_ids")
-    if pk in ids:
-        ids.remove(pk)
-        in_wishlist = False
-    else:
-        ids.append(pk)
-        in_wishlist = True
-
-    request.session["wishlist_ids"] = ids
+    ids, in_wishlist = session_ids.toggle(request.session, "wishlist_ids", pk)
 
     if request.headers.get("x-requested-with") == "XMLHttpRequest":
         return JsonResponse({"ok": True, "in_wishlist": in_wishlist, "count": len(ids)})
@@ -231,21 +252,12 @@ def _compare_items(ids):
 def toggle_compare(request, pk: int):
     get_object_or_404(m.Car, pk=pk)
 
-    ids = request.session.get("compare_ids", [])
-    in_compare = False
+    ids, in_compare = session_ids.toggle(request.session, "compare_ids", pk, limit=4)
+    if in_compare is None:
+        if request.headers.get("X-Requested-With") == "XMLHttpRequest":
+            return JsonResponse({"ok": False, "error": "max_4"}, status=400)
+        return redirect(reverse("compare_page"))
 
-    if pk in ids:
-        ids.remove(pk)
-        in_compare = False
-    else:
-        if len(ids) >= 4:
-            if request.headers.get("X-Requested-With") == "XMLHttpRequest":
-                return JsonResponse({"ok": False, "error": "max_4"}, status=400)
-            return redirect(reverse("compare_page"))
-        ids.append(pk)
-        in_compare = True
-
-    request.session["compare_ids"] = ids
     payload = {"ok": True, "in_compare": in_compare, "count": len(ids), "items": _compare_items(ids)}
 
     if request.headers.get("X-Requested-With") == "XMLHttpRequest":
@@ -260,97 +272,88 @@ def toggle_compare(request, pk: int):
     return redirect(next_url)
 
 
+@require_GET
 def car_json(request, pk: int):
-    try:
-        car = (
-            m.Car.objects.select_related("make", "body_type")
-            .prefetch_related("images")
-            .get(pk=pk)
-        )
-    except m.Car.DoesNotExist:
+    data = car_api.cars([pk], list(car_api.FIELDS))["cars"]
+    if not data:
         raise Http404(_("Car not found"))
-
-    data = {
-        "id": car.id,
-        "title": car.title,
-        "make": car.make.name if car.make_id else "",
-        "model_name": car.model_name or "",
-        "body_type": car.body_type.name if car.body_type_id else "",
-        "price": float(car.price) if car.price is not None else None,
-        "mileage": car.mileage,
-        "transmission": car.get_transmission_display() if car.transmission else "",
-        "fuel": car.get_fuel_display() if car.fuel else "",
-        "overview": car.overview or "",
-        "history": car.history or "",
-        "seller_name": car.seller_name or "",
-        "seller_meta": car.seller_meta or "",
-        "cover": car.cover.url if car.cover else "",
-        "images": [img.image.url for img in car.images.all()],
-        "is_new": car.is_new,
-        "is_certified": car.is_certified,
-        "is_hot": car.is_hot,
-        "is_featured": getattr(car, "is_featured", False),
-    }
-    return JsonResponse(data)
+    return HttpResponse(car_api.dumps(data[0]), content_type="application/json")
 
 
-# ---------- finance helpers ----------
-def _to_decimal(val, default=None):
-    try:
-        if val in ("", None):
-            return default
-        return Decimal(str(val))
-    except (InvalidOperation, TypeError, ValueError):
-        return default
+# ---------- finance ----------
+FINANCE_PER_PAGE = 24
+CALC_DEFAULTS = {"down": 3000, "apr": 6}    # car_detail calculator
 
 
-def _monthly_payment(price, down, apr_pct, months):
+@require_GET
+@condition(last_modified_func=conditional.car_row_last_modified)
+def car_finance_json(request, pk: int):
     """
-    monthly = P * r / (1 - (1+r)^-n), r = apr/12
+    Monthly payments for one car over a grid of down payments x APRs x terms
+    (models/finance.py: matrix, grid_axes), so the car_detail calculator
+    updates without reloading the page. monthly[i][j][k] is downs[i],
+    aprs[j], terms[k].
     """
-    price = _to_decimal(price, Decimal("0"))
-    down = _to_decimal(down, Decimal("0"))
-    months = int(months or 60)
-    if months <= 0:
-        months = 60
-
-    principal = price - down
-    if principal < 0:
-        principal = Decimal("0")
-
-    r = _to_decimal(apr_pct, Decimal("0")) / Decimal("1200")  # APR% -> monthly rate
-    if r == 0:
-        m = (principal / months) if months > 0 else Decimal("0")
-    else:
-        m = principal * r / (1 - (1 + r) ** Decimal(-months))
-    return principal, m
-
-
-def finance_offers(request):
-    # params: ?max_price=&down=&apr=&term=
-    max_price = _to_decimal(request.GET.get("max_price"), None)
-    down = _to_decimal(request.GET.get("down"), Decimal("0"))
-    apr = _to_decimal(request.GET.get("apr"), Decimal("0"))
+    row = m.Car.objects.filter(pk=pk).values("price").first()
+    if row is None:
+        raise Http404(_("Car not found"))
+    price = row["price"] or 0
+    terms = finance.Terms.from_querydict(request.GET, **CALC_DEFAULTS)
     try:
-        term = int(request.GET.get("term") or 60)
-    except (TypeError, ValueError):
-        term = 60
+        downs, aprs, months = finance.grid_axes(request.GET, price, terms)
+    except ValueError as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=400)
+    payload = {
+        "ok": True,
+        "id": pk,
+        "price": float(price),
+        "downs": [float(d) for d in downs],
+        "aprs": [float(a) for a in aprs],
+        "terms": months,
+        "monthly": [[[float(v) for v in row] for row in plane] for plane in finance.matrix(price, downs, aprs, months)],
+    }
+    return HttpResponse(car_api.dumps(payload), content_type="application/json")
 
-    qs = m.Car.objects.all().select_related("make", "body_type").prefetch_related("images")
-    if max_price is not None:
-        qs = qs.filter(price__isnull=False, price__lte=max_price)
 
-    offers = []
-    for car in qs:
-        principal, monthly = _monthly_payment(car.price or 0, down, apr, term)
-        offers.append({"car": car, "principal": principal, "monthly": monthly})
+def finance_offers(request):
+    """
+    ?down=&apr=&term= plus an optional ?max_monthly= budget and the usual
+    listing filters (max_price, make, ...). Payment maths, budget and order
+    all run in SQL (models/finance.py); results are paginated.
+    """
+    terms = finance.Terms.from_querydict(request.GET)
+    car_filter = CarFilter.from_querydict(request.GET)
+    max_monthly = finance.to_decimal(request.GET.get("max_monthly"))
+    if max_monthly is not None and max_monthly < 0:
+        max_monthly = None
+
+    qs = finance.offers(
+        car_filter.apply(m.Car.objects.select_related("make", "body_type").prefetch_related("images")),
+        terms,
+        max_monthly=max_monthly,
+    )
+    # cheapest price first == lowest monthly first
+    page_obj = pagination.paginate(
+        qs, "price", page=request.GET.get("page"), cursor=request.GET.get("cursor"), per_page=FINANCE_PER_PAGE,
+    )
 
-    # lowest monthly first
-    offers.sort(key=lambda x: (x["monthly"] if x["monthly"] is not None else Decimal("0")))
+    querydict = request.GET.copy()
+    querydict.pop("page", None)
+    querydict.pop("cursor", None)
 
     context = {
-        "offers": offers,
-        "params": {"max_price": max_price, "down": down, "apr": apr, "term": term},
+        "offers": page_obj.object_list,
+        "page_obj": page_obj,
+        "paginator": page_obj.paginator,
+        "is_paginated": page_obj.has_other_pages() or bool(page_obj.next_cursor),
+        "querystring": querydict.urlencode(),
+        "params": {
+            "max_price": car_filter.price_max,
+            "max_monthly": max_monthly,
+            "down": terms.down,
+            "apr": terms.apr,
+            "term": terms.term,
+        },
         "makes": m.Make.objects.all(),
         "body_types": m.BodyType.objects.all(),
         "fuel_choices": m.Car.FUEL_CHOICES,
@@ -360,7 +363,7 @@ def finance_offers(request):
 
 
 def _cmp_session(request):
-    return request.session.setdefault("compare_ids", [])
+    return session_ids.get_ids(request.session, "compare_ids")
 
 
 def _cmp_payload(ids):
@@ -395,72 +398,24 @@ def _extract_phone_from_text(text: str) -> str:
     return digits
 
 
+@condition(etag_func=conditional.car_detail_etag, last_modified_func=conditional.car_detail_last_modified)
 def car_detail(request, pk: int):
-    car = get_object_or_404(m.Car, pk=pk)
+    car = get_object_or_404(m.Car.objects.select_related("seller_user__seller_profile"), pk=pk)
 
     # ----- finance inputs
-    dp_default, apr_default, term_default = 3000, 6, 60
-
-    def to_number(val, default):
-        try:
-            return float(val)
-        except (TypeError, ValueError):
-            return float(default)
-
-    down = to_number(request.GET.get("down"), dp_default)
-    apr = to_number(request.GET.get("apr"), apr_default)
-    term = int(to_number(request.GET.get("term"), term_default))
-
-    base_price = float(car.price or 0)
-    principal = max(0.0, base_price - max(0.0, down))
-    r = (apr / 100.0) / 12.0
-    if r == 0:
-        monthly = principal / max(1, term)
-    else:
-        f = pow(1 + r, term)
-        monthly = principal * (r * f) / (f - 1)
-    calc_input = {"down": int(down), "apr": apr, "term": term}
-    calc_monthly = round(monthly, 0)
+    terms = finance.Terms.from_querydict(request.GET, **CALC_DEFAULTS)
+    calc_input = {"down": int(terms.down), "apr": float(terms.apr), "term": terms.term}
+    calc_monthly = round(terms.monthly(car.price))
 
     # ----- reviews
-    agg = m.CarReview.aggregate_for_car(pk)
-    rating_avg = agg["rating_avg"]
-    rating_count = agg["rating_count"]
-    rating_dist = agg["rating_dist"]
-    top_positive = agg["top_positive"]
-    top_critical = agg["top_critical"]
-    rating_full_stars = int(rating_avg // 1)
-
-    qs = (
-        m.CarReview.objects.filter(car_id=pk, status=True)
-        .select_related("user")
-        .annotate(
-            helpful_count=Count(
-                "feedback", filter=Q(feedback__action=m.ReviewFeedback.ACTION_HELPFUL)
-            ),
-            report_count=Count(
-                "feedback", filter=Q(feedback__action=m.ReviewFeedback.ACTION_REPORT)
-            ),
-        )
-    )
-    if request.user.is_authenticated:
-        qs = qs.annotate(
-            i_liked=Exists(
-                m.ReviewFeedback.objects.filter(
-                    review_id=OuterRef("pk"),
-                    user_id=request.user.id,
-                    action=m.ReviewFeedback.ACTION_HELPFUL,
-                )
-            ),
-            i_reported=Exists(
-                m.ReviewFeedback.objects.filter(
-                    review_id=OuterRef("pk"),
-                    user_id=request.user.id,
-                    action=m.ReviewFeedback.ACTION_REPORT,
-                )
-            ),
-        )
-    reviews = qs.order_by("-created_at")
+    # counts ride on the car row; the rest is only read when a cached fragment
+    # misses (models/detail_cache.py), so the lookups stay lazy
+    rating_avg = round(car.rating_avg or 0.0, 1)
+    rating_count = car.rating_count
+    review_summary = SimpleLazyObject(lambda: m.CarReview.aggregate_for_car(pk))
+
+    # first few reviews only; the rest load from reviews_json on demand
+    reviews_page = SimpleLazyObject(lambda: review_feed.page(pk, user=request.user))
 
     existing_review = None
     if request.user.is_authenticated:
@@ -476,22 +431,17 @@ def car_detail(request, pk: int):
         "title": car.title or _("this car")
     }
 
-    # ===== Seller avatar for template
-    User = get_user_model()
+    # ===== Seller avatar + badge, from the stored seller_user link (models/sellers.py)
     userprofile = None
-
-    # Try: find seller by email and use their SellerProfile.avatar
-    if car.seller_email:
-        seller_user = User.objects.filter(email__iexact=car.seller_email).first()
-        sp = getattr(seller_user, "seller_profile", None) if seller_user else None
-        if sp and getattr(sp, "avatar", None):
-            userprofile = SimpleNamespace(profile_picture=sp.avatar)
+    sp = getattr(car.seller_user, "seller_profile", None) if car.seller_user_id else None
+    if sp and sp.avatar:
+        userprofile = SimpleNamespace(profile_picture=sp.avatar)
 
     # Fallback: use car.seller_image
     if userprofile is None and getattr(car, "seller_image", None):
         userprofile = SimpleNamespace(profile_picture=car.seller_image)
 
-    seller_verified = bool(getattr(car, "is_certified", False))
+    seller_verified = bool(car.is_certified or (sp and sp.is_verified))
 
     return render(
         request,
@@ -499,13 +449,13 @@ def car_detail(request, pk: int):
         {
             "seller_verified": seller_verified,
             "car": car,
-            "reviews": reviews,
-            "top_positive": top_positive,
-            "top_critical": top_critical,
+            "detail_vary": detail_cache.vary(pk, request),
+            "detail_ttl": detail_cache.TTL,
+            "reviews_page": reviews_page,
+            "review_sorts": review_feed.SORTS,
+            "review_summary": review_summary,
             "rating_avg": rating_avg,
             "rating_count": rating_count,
-            "rating_full_stars": rating_full_stars,
-            "rating_dist": rating_dist,
             "existing_review": existing_review,
             "calc_input": calc_input,
             "calc_monthly": calc_monthly,
@@ -515,10 +465,14 @@ def car_detail(request, pk: int):
             "seller_has_phone": seller_has_phone,
             "whatsapp_text": whatsapp_text,
 
+            "similar_cars": SimpleLazyObject(lambda: similar.similar_cars(pk)),
             "seller_point": car.seller_point(),  # None or dict {lat,lng,name,address,phone}
             "default_center": [37.0902, -95.7129, 4],
         },
     )
+
+
+@condition(last_modified_func=conditional.car_row_last_modified)
 def car_geo(request, pk: int):
     car = get_object_or_404(Car, pk=pk)
     if car.seller_lat is None or car.seller_lng is None:
@@ -608,16 +562,7 @@ def share_car(request, pk: int):
 
 # ---- helpers ----
 def _session_ids(request, key: str):
-    raw = request.session.get(key, [])
-    out = []
-    for x in raw:
-        try:
-            ix = int(x)
-        except (TypeError, ValueError):
-            continue
-        if ix not in out:
-            out.append(ix)
-    return out
+    return session_ids.get_ids(request.session, key)
 
 
 def compare_page(request):
@@ -630,7 +575,7 @@ def compare_page(request):
 @require_POST
 def clear_wishlist(request):
     # fix: use unified key
-    request.session["wishlist_ids"] = []
+    session_ids.set_ids(request.session, "wishlist_ids", [])
     return redirect(reverse("wishlist_page"))
 
 
@@ -696,21 +641,39 @@ def signup(request):
 
 
 @require_GET
+@condition(etag_func=conditional.reviews_etag)
 def reviews_json(request, pk: int):
-    car = get_object_or_404(m.Car, pk=pk)
-
-    agg = m.CarReview.aggregate_for_car(pk)
-    items = [
-        {
-            "user": r.user.get_username(),
-            "rating": r.rating,
-            "subject": r.subject,
-            "review": r.review,
-            "created": r.created_at.isoformat(timespec="seconds"),
-        }
-        for r in car.reviews.filter(status=True).select_related("user")[:50]
-    ]
-    return JsonResponse({"ok": True, "aggregate": agg, "items": items})
+    """?sort=newest|helpful|highest|lowest&cursor=&limit= ; html=1 adds rendered cards for the lazy loader."""
+    get_object_or_404(m.Car.objects.only("pk"), pk=pk)
+    try:
+        limit = int(request.GET.get("limit", review_feed.MAX_PAGE))
+    except ValueError:
+        limit = review_feed.MAX_PAGE
+    page = review_feed.page(
+        pk, user=request.user, sort=request.GET.get("sort"), cursor=request.GET.get("cursor"), per_page=limit,
+    )
+    payload = {
+        "ok": True,
+        "aggregate": m.CarReview.aggregate_for_car(pk, with_reviews=False),
+        "items": [
+            {
+                "id": r.id,
+                "user": r.user.get_username(),
+                "rating": r.rating,
+                "subject": r.subject,
+                "review": r.review,
+                "helpful_count": r.helpful_count,
+                "created": r.created_at.isoformat(timespec="seconds"),
+            }
+            for r in page.object_list
+        ],
+        "next_cursor": page.next_cursor,
+    }
+    if request.GET.get("html"):
+        payload["html"] = render_to_string(
+            "includes/review_card_list.html", {"reviews": page.object_list}, request=request
+        )
+    return JsonResponse(payload)
 
 
 @login_required
@@ -734,7 +697,7 @@ def add_review(request, pk: int):
         user=request.user,
         defaults={"rating": rating, "subject": subject, "review": review_text},
     )
-    agg = m.CarReview.aggregate_for_car(pk)
+    agg = m.CarReview.aggregate_for_car(pk, with_reviews=False)
     return JsonResponse({"ok": True, "created": created, "aggregate": agg})
 
 
@@ -766,17 +729,21 @@ def add_review_form(request, pk: int):
 @require_POST
 def review_mark_helpful(request, rid: int):
     review = get_object_or_404(m.CarReview, pk=rid, status=True)
-    fb, created = m.ReviewFeedback.objects.get_or_create(
-        review=review, user=request.user, action=m.ReviewFeedback.ACTION_HELPFUL
-    )
+    # one transaction: the feedback row and the F() counter updates its signals make
+    with transaction.atomic():
+        fb, created = m.ReviewFeedback.objects.get_or_create(
+            review=review, user=request.user, action=m.ReviewFeedback.ACTION_HELPFUL
+        )
+        if created:
+            # Optional: remove a previous report so a user can't both like & report
+            m.ReviewFeedback.objects.filter(
+                review=review, user=request.user, action=m.ReviewFeedback.ACTION_REPORT
+            ).delete()
+        else:
+            fb.delete()
     if created:
-        # Optional: remove a previous report so a user can't both like & report
-        m.ReviewFeedback.objects.filter(
-            review=review, user=request.user, action=m.ReviewFeedback.ACTION_REPORT
-        ).delete()
         messages.success(request, _("Marked helpful."))
     else:
-        fb.delete()
         messages.info(request, _("Removed your like."))
 
     return redirect(
@@ -789,17 +756,20 @@ def review_mark_helpful(request, rid: int):
 @require_POST
 def review_report(request, rid: int):
     review = get_object_or_404(m.CarReview, pk=rid, status=True)
-    fb, created = m.ReviewFeedback.objects.get_or_create(
-        review=review, user=request.user, action=m.ReviewFeedback.ACTION_REPORT
-    )
+    with transaction.atomic():
+        fb, created = m.ReviewFeedback.objects.get_or_create(
+            review=review, user=request.user, action=m.ReviewFeedback.ACTION_REPORT
+        )
+        if created:
+            # Optional symmetry: remove a previous like
+            m.ReviewFeedback.objects.filter(
+                review=review, user=request.user, action=m.ReviewFeedback.ACTION_HELPFUL
+            ).delete()
+        else:
+            fb.delete()
     if created:
-        # Optional symmetry: remove a previous like
-        m.ReviewFeedback.objects.filter(
-            review=review, user=request.user, action=m.ReviewFeedback.ACTION_HELPFUL
-        ).delete()
         messages.warning(request, _("Reported."))
     else:
-        fb.delete()
         messages.info(request, _("Removed your report."))
 
     return redirect(
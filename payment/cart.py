@@ -1,85 +1,77 @@
 # payment/cart.py
+"""
+Session cart: only the car ids live in the session (models/session_ids.py);
+title, make, price and cover are read from the database when the rows are
+needed, so the session stays a few bytes per item and always shows current
+prices.
+"""
 from typing import Dict, List
 
+from models import session_ids
 from models.models import Car
 from payment.utils import _to_cents
 
 SESSION_KEY = "cart"
 
-def _get_cart(request) -> List[Dict]:
-    return list(request.session.get(SESSION_KEY, []))
+def ids(request) -> List[int]:
+    return session_ids.get_ids(request.session, SESSION_KEY)
 
-def _save_cart(request, cart: List[Dict]) -> None:
-    # normalize by id; single-quantity cart (only 1 per car)
-    seen = {}
-    for r in cart:
-        key = str(r.get("id"))
-        if not key:
-            continue
-        # keep the last version for the same id
-        seen[key] = {
-            "id": key,
-            "title": r.get("title", "Car"),
-            "make": r.get("make", ""),
-            "model_name": r.get("model_name", ""),
-            "unit_cents": int(r.get("unit_cents", 0) or 0),
-            "cover_url": r.get("cover_url") or None,
-        }
-    request.session[SESSION_KEY] = list(seen.values())
-    request.session.modified = True
+def _car_to_session_row(car: Car) -> dict:
+    # convert Decimal price to cents (handles 200,000 correctly)
+    unit_cents = _to_cents(car.price)
+    cover_url = None
+    if getattr(car, "cover", None):
+        try:
+            cover_url = car.cover.url
+        except Exception:
+            cover_url = None
+    return {
+        "id": str(car.pk),
+        "title": car.title,
+        "make": str(car.make) if car.make_id else "",
+        "model_name": car.model_name or "",
+        "unit_cents": unit_cents,
+        "cover_url": cover_url,
+    }
+
+def rows(request) -> List[Dict]:
+    """Cart rows in the order added, hydrated with one query (memoised per request)."""
+    current = ids(request)
+    memo = getattr(request, "_session_cart_rows", None)
+    if memo is None or memo[0] != current:
+        cars = Car.objects.select_related("make").in_bulk(current)
+        memo = (current, [_car_to_session_row(cars[pk]) for pk in current if pk in cars])
+        request._session_cart_rows = memo
+    return memo[1]
 
 def in_cart(request, pid: str) -> bool:
-    pid = str(pid)
-    return any(str(r.get("id")) == pid for r in _get_cart(request))
+    try:
+        return int(pid) in ids(request)
+    except (TypeError, ValueError):
+        return False
 
-def add_item(request, *, pid: str, title: str, make: str, model_name: str, unit_cents: int, cover_url: str | None) -> bool:
+def add_item(request, *, pid: str, **_details) -> bool:
     """
     Returns True if newly added, False if it was already in the cart.
-    Single-quantity: if car exists, we don't add again.
+    Single-quantity: if car exists, we don't add again. Row details
+    (title, price, ...) are no longer stored; they come from the Car.
     """
-    pid = str(pid)
-    cart = _get_cart(request)
-    if any(str(r.get("id")) == pid for r in cart):
+    current = ids(request)
+    pk = int(pid)
+    if pk in current:
         return False  # already there
-    cart.append({
-        "id": pid,
-        "title": title,
-        "make": make,
-        "model_name": model_name or "",
-        "unit_cents": int(unit_cents or 0),
-        "cover_url": cover_url or None,
-    })
-    _save_cart(request, cart)
+    session_ids.set_ids(request.session, SESSION_KEY, current + [pk])
     return True
 
 def remove_item(request, *, pid: str) -> None:
-    pid = str(pid)
-    cart = [r for r in _get_cart(request) if str(r.get("id")) != pid]
-    _save_cart(request, cart)
+    pk = int(pid)
+    session_ids.set_ids(request.session, SESSION_KEY, [i for i in ids(request) if i != pk])
 
 def clear(request) -> None:
-    request.session[SESSION_KEY] = []
-    request.session.modified = True
+    session_ids.set_ids(request.session, SESSION_KEY, [])
 
 def count(request) -> int:
-    return len(_get_cart(request))
+    return len(ids(request))
 
 def total_cents(request) -> int:
-    return sum(int(r.get("unit_cents", 0) or 0) for r in _get_cart(request))
-def _car_to_session_row(car: Car) -> dict:
-    # convert Decimal price to cents (handles 200,000 correctly)
-    unit_cents = _to_cents(car.price)
-    cover_url = None
-    if getattr(car, "cover", None):
-        try:
-            cover_url = car.cover.url
-        except Exception:
-            cover_url = None
-    return {
-        "pid": str(car.pk),
-        "title": car.title,
-        "make": str(car.make),
-        "model_name": car.model_name or "",
-        "unit_cents": unit_cents,
-        "cover_url": cover_url,
-    }
\ No newline at end of file
+    return sum(r["unit_cents"] for r in rows(request))
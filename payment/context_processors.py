@@ -1,10 +1,22 @@
 # payment/context_processors.py
+from functools import partial
+
+from django.utils.functional import SimpleLazyObject
+
+from marketplace.context_processors import legacy
+
+from . import cart as checkout_cart
+
+_cart_nav = legacy("cart_ids", "cart_total_cents")
+
+
 def cart_meta(request):
-    cart = list(request.session.get("cart", []))
-    return {
-        "cart_count": len(cart),
-        "cart_total_cents": sum(int(r.get("unit_cents", 0) or 0) for r in cart),
-        "cart_ids": [str(r.get("id")) for r in cart],
-    }
+    """Replaced by marketplace.context_processors.nav (nav.cart_ids, nav.cart_total_cents)."""
+    context = _cart_nav(request)
+    # the checkout cart's size, not the Cart badge nav.cart_count shows
+    context["cart_count"] = SimpleLazyObject(partial(checkout_cart.count, request))
+    return context
+
+
 def currency_meta(request):
-    return {"currency": request.session.get("currency", "USD")}
\ No newline at end of file
+    return {"currency": request.session.get("currency", "USD")}
@@ -9,11 +9,13 @@ def _to_cents(amount) -> int:
 def collect_checkout_items(request) -> Tuple[List[Dict], int]:
     """
     Map session cart rows to payment line items.
-    Each row stored with 'unit_cents' and qty=1 (single-car).
+    Each row carries 'unit_cents' and qty=1 (single-car).
     """
+    from .cart import rows  # cart.py imports this module
+
     items: List[Dict] = []
     total = 0
-    for r in request.session.get("cart", []):
+    for r in rows(request):
         unit = int(r.get("unit_cents", 0) or 0)
         title = r.get("title", "Car")
         make = r.get("make", "")
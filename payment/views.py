@@ -22,6 +22,8 @@ from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 
+from models import session_ids
+
 from .models import Order, OrderItem
 from .utils import collect_checkout_items
 
@@ -785,7 +787,7 @@ def set_currency(request):
     Accepts POST or GET (?currency=USD).
     """
     cur = (request.POST.get("currency") or request.GET.get("currency") or "USD").upper()
-    request.session["currency"] = cur
+    session_ids.set_value(request.session, "currency", cur)
     return redirect(request.META.get("HTTP_REFERER") or "/")
 
 
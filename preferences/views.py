@@ -5,6 +5,7 @@ from django.utils.translation import get_language
 from django.views.decorators.http import require_http_methods
 from django.utils.translation import activate
 
+from models import session_ids
 
 
 CURRENCY_CHOICES = ["USD", "BDT", "EUR"]
@@ -30,7 +31,7 @@ def update_settings(request):
     currency = (request.POST.get("currency") or "USD").upper()
     if currency not in CURRENCY_CHOICES:
         currency = "USD"
-    request.session["currency"] = currency
+    session_ids.set_value(request.session, "currency", currency)
     return HttpResponseRedirect(request.META.get("HTTP_REFERER") or "/settings/")
 
 
@@ -71,8 +72,8 @@ def update_settings(request):
         language = settings.LANGUAGE_CODE
 
     # Save to session
-    request.session["theme"] = theme
-    request.session["currency"] = currency
+    session_ids.set_value(request.session, "theme", theme, "auto")
+    session_ids.set_value(request.session, "currency", currency)
 
     # Set language cookie so LocaleMiddleware picks it up
     resp = HttpResponseRedirect(request.META.get("HTTP_REFERER") or "/settings/")
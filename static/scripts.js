@@ -76,32 +76,6 @@ function setCompareCount(n){
     });
   })();
 
-  // Detail finance (inside car modal)
-  (function wireDetailFinance(){
-    const form = $('#calcForm');
-    if (!form) return;
-
-    const downI = $('#downPayment'), aprI = $('#apr'), termI = $('#term'), out = $('#monthly');
-
-    function update(){
-      const price = toNumber($('#detailPrice')?.textContent);
-      const down  = toNumber(downI?.value);
-      const apr   = toNumber(aprI?.value);
-      const term  = Math.min(84, Math.max(12, Math.round(toNumber(termI?.value, 60))));
-      const m = monthlyPayment(Math.max(0, price - down), apr, term);
-      if (out) out.textContent = money(m);
-    }
-    ['input','change'].forEach(evt => [downI, aprI, termI].forEach(el => el && el.addEventListener(evt, update)));
-    update();
-
-    form.addEventListener('submit', (e) => {
-      e.preventDefault();
-      const price = toNumber($('#detailPrice')?.textContent);
-      goToOffers(price, toNumber(downI?.value), toNumber(aprI?.value), toNumber(termI?.value, 60));
-    });
-  })();
-
-
   /* ---------------- Compare (AJAX + drawer + modal) ---------------- */
   let compareItems = []; // server is the source of truth
 
@@ -149,6 +123,23 @@ function setCompareCount(n){
     return data;
   }
 
+  // Cars already in the session: one batch request instead of one per car
+  (async function hydrateCompare(){
+    const ids = $('#compareThumbs')?.dataset.ids;
+    if (!ids) return;
+    try{
+      const params = new URLSearchParams({ ids, fields: 'title,price,mileage,fuel,transmission,body_type,cover' });
+      const res = await fetch(`/api/cars/?${params}`, { credentials: 'same-origin' });
+      if (!res.ok) return;
+      const data = await res.json();
+      if (compareItems.length) return; // a toggle answered first
+      compareItems = (data.cars || []).map(c => ({ ...c, body: c.body_type }));
+      paintCompareDrawer();
+    }catch(err){
+      console.error('Compare load error:', err);
+    }
+  })();
+
   // Toggle from any ".add-compare" link
   document.addEventListener('click', async (e) => {
     const btn = e.target.closest('.add-compare');
@@ -333,6 +324,102 @@ function setCompareCount(n){
   }
 })();
 
+// FACET COUNTS (home sidebar) — refresh counts from /api/facets/ as filters change
+(() => {
+  const form = document.getElementById('filtersForm');
+  if (!form) return;
+
+  function paint(data){
+    form.querySelectorAll('[data-facet]').forEach(el => {
+      const facet = data[el.dataset.facet];
+      let n = 0;
+      if (Array.isArray(facet)) {
+        const hit = facet.find(b => b.key === el.dataset.value);
+        n = hit ? hit.count : 0;
+      } else if (facet) {
+        n = facet[el.dataset.value] || 0;
+      }
+      if (el.tagName === 'OPTION') el.textContent = `${el.dataset.label} (${n})`;
+      else el.textContent = `(${n})`;
+    });
+  }
+
+  let timer = null, ctrl = null;
+  function refresh(){
+    clearTimeout(timer);
+    timer = setTimeout(async () => {
+      if (ctrl) ctrl.abort();
+      ctrl = new AbortController();
+      const params = new URLSearchParams(new FormData(form));
+      params.delete('sort');
+      try {
+        const res = await fetch('/api/facets/?' + params.toString(), { credentials: 'same-origin', signal: ctrl.signal });
+        if (res.ok) paint(await res.json());
+      } catch (_) {}
+    }, 150);
+  }
+
+  form.addEventListener('change', refresh);
+  form.querySelectorAll('input[type="number"]').forEach(el => el.addEventListener('input', refresh));
+  form.querySelectorAll('.js-price-bucket').forEach(btn => btn.addEventListener('click', () => {
+    form.querySelector('[name="min_price"]').value = btn.dataset.min || '';
+    form.querySelector('[name="max_price"]').value = btn.dataset.max || '';
+    refresh();
+  }));
+})();
+
+// TYPEAHEAD — make/model suggestions from /api/suggest/ for inputs marked data-suggest="all|make|model"
+(() => {
+  document.querySelectorAll('input[data-suggest]').forEach((input, i) => {
+    const kind = input.dataset.suggest;
+    const list = document.createElement('datalist');
+    list.id = `suggest-list-${i}`;
+    input.after(list);
+    input.setAttribute('list', list.id);
+    input.setAttribute('autocomplete', 'off');
+
+    let timer = null, ctrl = null;
+    input.addEventListener('input', () => {
+      clearTimeout(timer);
+      const q = input.value.trim();
+      if (!q) { list.replaceChildren(); return; }
+      timer = setTimeout(async () => {
+        if (ctrl) ctrl.abort();
+        ctrl = new AbortController();
+        const params = new URLSearchParams({ q });
+        if (kind === 'make' || kind === 'model') params.set('kind', kind);
+        try {
+          const res = await fetch('/api/suggest/?' + params.toString(), { signal: ctrl.signal });
+          if (!res.ok) return;
+          const data = await res.json();
+          list.replaceChildren(...data.results.map(r => {
+            const opt = document.createElement('option');
+            opt.value = kind === 'make' ? r.make : kind === 'model' ? r.model : r.label;
+            opt.label = `${r.label} (${r.count})`;
+            return opt;
+          }));
+        } catch (_) {}
+      }, 60);
+    });
+  });
+})();
+
+// NEAR ME — fill the form's hidden "near" input from the browser location and submit
+(() => {
+  document.querySelectorAll('[data-near-me]').forEach(btn => {
+    const form = btn.closest('form');
+    const near = form && form.querySelector('input[name="near"]');
+    if (!near || !navigator.geolocation) { btn.disabled = true; return; }
+    btn.addEventListener('click', () => {
+      btn.disabled = true;
+      navigator.geolocation.getCurrentPosition(pos => {
+        near.value = `${pos.coords.latitude.toFixed(4)},${pos.coords.longitude.toFixed(4)}`;
+        form.submit();
+      }, () => { btn.disabled = false; }, { maximumAge: 10 * 60 * 1000, timeout: 10000 });
+    });
+  });
+})();
+
 document.addEventListener('DOMContentLoaded', function () {
   var btn = document.getElementById('start360Btn');
   var el  = document.getElementById('cdCarousel');
@@ -373,16 +460,37 @@ document.addEventListener('DOMContentLoaded', function () {
   const $ = (s, r=document) => r.querySelector(s);
   const moneyFmt = new Intl.NumberFormat('en-US',{style:'currency',currency:'USD',maximumFractionDigits:0});
 
-  // Finance calc
+  // Finance calc: payments come from /api/cars/<pk>/finance/ (models/finance.py) as
+  // a down x APR x term grid, looked up here while the inputs stay on it. mp() only
+  // covers the moment before a grid arrives.
   const priceEl = $('#detailPrice');
   const basePrice = parseFloat(priceEl?.dataset.price || '0') || 0;
   const dp=$('#downPayment'), apr=$('#apr'), term=$('#term'), out=$('#monthly'), form=$('#calcForm');
   const mp = (P, aprPct, n) => { const r=(Number(aprPct||0)/100)/12, N=Math.max(1,parseInt(n||60,10)); if(!r) return P/N; const f=Math.pow(1+r,N); return P*(r*f)/(f-1); };
+  let grid = null, requested = '', timer = null;
+  const lookup = (d, a, n) => {
+    if (!grid) return null;
+    const i = grid.downs.indexOf(d), j = grid.aprs.indexOf(a), k = grid.terms.indexOf(n);
+    return (i < 0 || j < 0 || k < 0) ? null : grid.monthly[i][j][k];
+  };
+  const load = (d, a) => {
+    const url = form?.dataset.financeUrl, key = `${d}|${a}`;
+    if (!url || key === requested) return;
+    requested = key;
+    clearTimeout(timer);
+    timer = setTimeout(() => {
+      fetch(`${url}?${new URLSearchParams({down: String(d), apr: String(a)})}`, {headers: {'Accept': 'application/json'}})
+        .then(r => r.ok ? r.json() : null)
+        .then(data => { if (data?.ok) { grid = data; update(); } })
+        .catch(() => {});
+    }, 250);
+  };
   const update = () => {
-    const d=Math.max(0, parseFloat(dp?.value||'0')||0);
+    const d=Math.min(basePrice, Math.max(0, parseFloat(dp?.value||'0')||0));
     const a=parseFloat(apr?.value||'0')||0;
     const n=parseInt(term?.value||'60',10);
-    const m=mp(Math.max(0, basePrice-d), a, n);
+    let m = lookup(d, a, n);
+    if (m === null) { m = mp(Math.max(0, basePrice-d), a, n); load(d, a); }
     if(out) out.textContent = moneyFmt.format(isFinite(m)?m:0);
   };
   ['input','change'].forEach(evt => [dp,apr,term].forEach(x => x && x.addEventListener(evt, update)));
@@ -601,6 +709,49 @@ document.addEventListener('DOMContentLoaded', function () {
   });
 })();
 
+// REVIEW FEED — car_detail renders the first reviews; the rest page in from reviews_json by cursor
+(() => {
+  const list = document.getElementById('reviewList');
+  const more = document.getElementById('reviewMore');
+  const sortSel = document.getElementById('reviewSort');
+  if (!list || !more) return;
+
+  let cursor = list.dataset.nextCursor || '';
+  let loading = false;
+
+  const load = async (reset) => {
+    if (loading || (!reset && !cursor)) return;
+    loading = true;
+    more.disabled = true;
+    const params = new URLSearchParams({ html: '1', limit: '10' });
+    if (sortSel) params.set('sort', sortSel.value);
+    if (!reset) params.set('cursor', cursor);
+    try {
+      const res = await fetch(`${list.dataset.feedUrl}?${params}`, { headers: { 'X-Requested-With': 'XMLHttpRequest' } });
+      if (!res.ok) return;
+      const data = await res.json();
+      if (reset) list.replaceChildren();
+      list.insertAdjacentHTML('beforeend', data.html || '');
+      cursor = data.next_cursor || '';
+      more.classList.toggle('d-none', !cursor);
+    } catch (_) {
+    } finally {
+      loading = false;
+      more.disabled = false;
+    }
+  };
+
+  more.addEventListener('click', () => load(false));
+  sortSel?.addEventListener('change', () => load(true));
+
+  // keep reading without clicking once the button scrolls into view
+  if ('IntersectionObserver' in window) {
+    new IntersectionObserver(entries => {
+      if (entries.some(e => e.isIntersecting)) load(false);
+    }, { rootMargin: '200px' }).observe(more);
+  }
+})();
+
 // 360 SPIN (carSpin)
 document.addEventListener('DOMContentLoaded', function () {
   var btn = document.getElementById('spinBtn');